@@ -0,0 +1,121 @@
+import argparse
+import os
+import re
+
+import numpy as np
+
+# ============================================================
+# SYNTHETIC TELEMETRY EXPORT
+# ============================================================
+#
+# Writes a JSONL export shaped like our CouchDB exports: the same three
+# message types, record layout and nesting as sample.jsonl, mixed 40/30/30
+# in random order, one record every 5-40 ms (uniform, millisecond resolution)
+# starting at 2026-01-26T07:47:20+01:00. The values follow the sample too,
+# so the configs in ../data select, filter and plot the same way on any size.
+# The same seed always gives the same file.
+
+HEARTBEAT = "PipelineManagerHeartbeatAndStateTransitions.Heartbeat"
+REMOTE_TRAIN_CONTROL = "rse.ato.communication.ss139.extension.telegrams.RemoteTrainControlTelegram"
+OUTSIDE_CONTROL = "Remoot.SS139OutsideControlMessage"
+
+# Share of the records per message type
+MIX = {OUTSIDE_CONTROL: 0.40, REMOTE_TRAIN_CONTROL: 0.30, HEARTBEAT: 0.30}
+
+START = np.datetime64("2026-01-26T07:47:20.000", "ms")
+UTC_OFFSET = "+01:00"
+GAP_MS = (5, 40)
+
+# Records generated and written per batch
+BATCH = 100_000
+
+# Generator version, bumped when the output changes so cached files are rebuilt
+VERSION = 1
+
+TEMPLATES = {
+    OUTSIDE_CONTROL: (
+        '{"_id":"%d","messageContentType":"' + OUTSIDE_CONTROL + '","timestamp":"%s' + UTC_OFFSET + '",'
+        '"message":{"OutsideControlData":{"ActivateHornHigh":%s},"ActiveCabInfo":{"Cab1":true}}}\n'
+    ),
+    REMOTE_TRAIN_CONTROL: (
+        '{"_id":"%d","messageContentType":"' + REMOTE_TRAIN_CONTROL + '","timestamp":"%s' + UTC_OFFSET + '",'
+        '"message":{"MessagePayload":{"SystemControlOverrideSwitchActivated":%s,"ThreewaySwitchState":"%s","Speed":%r}}}\n'
+    ),
+    HEARTBEAT: (
+        '{"_id":"%d","messageContentType":"' + HEARTBEAT + '","timestamp":"%s' + UTC_OFFSET + '",'
+        '"message":{"ExpirationTime":{"HasNanos":%s,"Nanos":%d,"HasSeconds":true,"Seconds":%d}}}\n'
+    ),
+}
+
+SIZE_UNITS = {"": 1, "B": 1, "KB": 1024, "MB": 1024 ** 2, "GB": 1024 ** 3}
+
+
+def parse_size(text):
+    """Byte count of a size like 10MB or 1GB"""
+    match = re.fullmatch(r"\s*(\d+(?:\.\d+)?)\s*([KMG]?B?)\s*", text.upper())
+    if match is None:
+        raise ValueError(f"Invalid size: {text}")
+    return int(float(match.group(1)) * SIZE_UNITS[match.group(2)])
+
+
+def records(rng, first_id, start, count):
+    """Lines of count records from first_id on, the first one gap after start (ms datetime64)"""
+    types = rng.choice(len(MIX), size=count, p=list(MIX.values()))
+    gaps = rng.integers(GAP_MS[0], GAP_MS[1] + 1, size=count)
+    times = np.datetime_as_string(start + np.cumsum(gaps).astype("timedelta64[ms]"), unit="ms")
+
+    flags = rng.random(count)
+    switch = rng.random(count) < 0.5
+    states = rng.choice(np.array(["A", "B", "C"]), size=count)
+    speeds = rng.random(count) * 100
+    nanos = rng.integers(0, 1_000_000_000, size=count)
+    seconds = rng.integers(0, 200, size=count)
+
+    outside, remote, heartbeat = (TEMPLATES[name] for name in MIX)
+    lines = []
+    for i, kind in enumerate(types.tolist()):
+        record_id = first_id + i
+        if kind == 0:
+            lines.append(outside % (record_id, times[i], "true" if flags[i] < 0.105 else "false"))
+        elif kind == 1:
+            lines.append(remote % (
+                record_id, times[i], "true" if switch[i] else "false", states[i], float(speeds[i])
+            ))
+        else:
+            lines.append(heartbeat % (
+                record_id, times[i], "true" if flags[i] < 0.5 else "false", nanos[i], seconds[i]
+            ))
+    return lines, start + gaps.sum().astype("timedelta64[ms]")
+
+
+def generate(path, size, seed=0):
+    """Write a synthetic export of at least size bytes, returns the number of lines"""
+    rng = np.random.default_rng(seed)
+    start = START
+    written = 0
+    count = 0
+    with open(path, "wb") as f:
+        while written < size:
+            lines, start = records(rng, count, start, BATCH)
+            data = "".join(lines).encode("utf-8")
+            if written + len(data) > size:
+                # Only the lines needed to reach size from the last batch
+                lengths = np.cumsum([len(line) for line in lines])
+                keep = int(np.searchsorted(lengths, size - written)) + 1
+                data = "".join(lines[:keep]).encode("utf-8")
+                lines = lines[:keep]
+            f.write(data)
+            written += len(data)
+            count += len(lines)
+    return count
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Write a synthetic telemetry JSONL export for benchmarks")
+    parser.add_argument("output", help="Path of the JSONL file to write")
+    parser.add_argument("--size", default="10MB", help="Size of the file, e.g. 10MB, 1GB, 10GB (default: 10MB)")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed (default: 0)")
+    args = parser.parse_args()
+
+    lines = generate(args.output, parse_size(args.size), args.seed)
+    print(f"Wrote {lines:,} records ({os.path.getsize(args.output):,} bytes) to {args.output}")
@@ -0,0 +1,359 @@
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import redirect_stdout
+from datetime import datetime, timezone
+
+import generate_telemetry
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# ============================================================
+# BENCHMARK HARNESS
+# ============================================================
+#
+# Every script runs its own main() on synthetic exports of each size, in a
+# fresh process so imports and peak memory are measured per run. The stages
+# are the ones the scripts report with --timings (see instrumentation),
+# collected with the line timing points of the chunks turned on. Figures are
+# written with Agg instead of being shown.
+#
+#   import        importing the script module and the libraries it imports
+#                 lazily (matplotlib, pandas, plotly)
+#   scan          the whole pass over the file in parallel chunks, merging
+#                 the chunk results included
+#   read, filter, decode, extract
+#                 the scan's chunks split by step: reading lines, the type
+#                 prefilter, JSON decoding and the rest of the chunk. Busy
+#                 time summed over the worker processes
+#   frame, parse, on_change, sort, downsample, statistics
+#                 the script steps after the scan, where the script has them
+#   write         CSV export
+#   render        figures drawn with Agg, or built and written as HTML
+#   other         everything else in main()
+#
+# Startup is measured apart from the runs: the wall time of "<script> --help"
+# in a fresh interpreter, which is what every batch job call pays before any
+# work. It has to stay within STARTUP_BUDGET.
+#
+# The results are written as JSON so runs of different commits can be
+# compared with --compare.
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+SRC_DIR = os.path.normpath(os.path.join(BENCH_DIR, "..", "src"))
+CONFIG_FILE = os.path.normpath(os.path.join(BENCH_DIR, "..", "data", "config.json"))
+DATA_DIR = os.path.join(BENCH_DIR, "data")
+RESULTS_DIR = os.path.join(BENCH_DIR, "results")
+
+SCRIPTS = ("generic_values", "boolean_values", "plot_data_plotly", "analyze_message_types")
+DEFAULT_SIZES = ("10MB",)
+
+# Fields plotted by plot_data_plotly: booleans, numbers and strings of all three message types
+PLOTLY_FIELDS = ["SystemControlOverrideSwitchActivated", "Speed", "ThreewaySwitchState", "ActivateHornHigh", "Cab1"]
+PLOTLY_FIELD_PATHS = ["message.ExpirationTime.Nanos"]
+
+# Libraries the scripts import on first use, imported with the script for the import stage
+LIBRARIES = {
+    "generic_values": ["matplotlib.pyplot"],
+    "boolean_values": ["matplotlib.pyplot"],
+    "plot_data_plotly": ["pandas", "plotly.graph_objects", "plotly.subplots"],
+    "analyze_message_types": ["pandas", "plotly.graph_objects"],
+}
+
+# Seconds "<script> --help" may take in a fresh interpreter
+STARTUP_BUDGET = 0.5
+
+# Version of the result file layout
+RESULT_VERSION = 3
+
+
+# ============================================================
+# SCRIPT RUNS (in the child process)
+# ============================================================
+
+
+def run_generic_values(module, path, out_dir, workers):
+    with open(CONFIG_FILE) as f:
+        config = json.load(f)
+    for axis in config["axes"]:
+        axis["sourceFile"] = os.path.basename(path)
+    module.DATA_PATH = out_dir + os.sep
+    module.main(config, workers, output=os.path.join(out_dir, "generic_values.png"))
+
+
+def run_boolean_values(module, path, out_dir, workers):
+    module.DATA_PATH = out_dir + os.sep
+    module.main(
+        os.path.basename(path), module.Y_PATH, module.TARGET_TYPE, False, workers,
+        output=os.path.join(out_dir, "boolean_values.png"),
+    )
+
+
+def run_plot_data_plotly(module, path, out_dir, workers):
+    sys.argv = [
+        "plot_data_plotly.py", path, "--output-dir", out_dir, "--workers", str(workers),
+        "--fields", *PLOTLY_FIELDS, "--field-paths", *PLOTLY_FIELD_PATHS,
+    ]
+    module.main()
+
+
+def run_analyze_message_types(module, path, out_dir, workers):
+    sys.argv = ["analyze_message_types.py", path, "--output-dir", out_dir, "--workers", str(workers)]
+    module.main()
+
+
+RUNS = {
+    "generic_values": run_generic_values,
+    "boolean_values": run_boolean_values,
+    "plot_data_plotly": run_plot_data_plotly,
+    "analyze_message_types": run_analyze_message_types,
+}
+
+
+def run_child(script, path, workers, backend, output):
+    """Run one script once and write its stage timings as JSON to output"""
+    sys.path.insert(0, SRC_DIR)
+    os.environ.setdefault("MPLBACKEND", "Agg")
+
+    with open(os.devnull, "w") as devnull, redirect_stdout(devnull):
+        start = time.perf_counter()
+        module = __import__(script)
+        for library in LIBRARIES[script]:
+            __import__(library)
+        imported = time.perf_counter() - start
+
+        import instrumentation
+        import json_backend
+
+        json_backend.select(backend)
+        with tempfile.TemporaryDirectory() as out_dir:
+            os.symlink(os.path.abspath(path), os.path.join(out_dir, os.path.basename(path)))
+            instrumentation.open_session(script)
+            RUNS[script](module, path, out_dir, workers)
+            summary = instrumentation.close_session()
+
+    stages = {name: stage["wall_seconds"] for name, stage in summary["stages"].items()}
+    result = {
+        "total": summary["wall_seconds"],
+        "stages": {"import": imported, **stages},
+        "peak_rss_mb": peak_rss_mb(children=False),
+        "peak_worker_rss_mb": peak_rss_mb(children=True),
+    }
+    with open(output, "w") as f:
+        json.dump(result, f)
+
+
+# ============================================================
+# BENCHMARK RUNS
+# ============================================================
+
+
+def export_file(size, seed=0):
+    """Synthetic export of a size in DATA_DIR, generated when it is missing or outdated"""
+    os.makedirs(DATA_DIR, exist_ok=True)
+    path = os.path.join(DATA_DIR, f"telemetry_{size}_{seed}.jsonl")
+    meta_path = path + ".json"
+    meta = {"size": size, "seed": seed, "generator": generate_telemetry.VERSION}
+
+    if os.path.exists(path) and os.path.exists(meta_path):
+        with open(meta_path) as f:
+            stored = json.load(f)
+        if {key: stored.get(key) for key in meta} == meta and stored.get("bytes") == os.path.getsize(path):
+            return path, stored
+
+    print(f"Generating {size} export...", flush=True)
+    meta["lines"] = generate_telemetry.generate(path, generate_telemetry.parse_size(size), seed)
+    meta["bytes"] = os.path.getsize(path)
+    with open(meta_path, "w") as f:
+        json.dump(meta, f)
+    return path, meta
+
+
+def peak_rss_mb(children):
+    """Peak resident memory of this process or of its finished children, 0 without the resource module"""
+    if resource is None:
+        return 0.0
+    return resource.getrusage(resource.RUSAGE_CHILDREN if children else resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def startup_time(script, repeat):
+    """Fastest wall time of "<script> --help" in a fresh interpreter"""
+    command = [sys.executable, os.path.join(SRC_DIR, script + ".py"), "--help"]
+    env = dict(os.environ, MPLBACKEND="Agg")
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run(command, check=True, env=env, cwd=SRC_DIR, stdout=subprocess.DEVNULL)
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def measure_startup(scripts, repeat):
+    """Startup time per script, printed against STARTUP_BUDGET"""
+    startup = {}
+    print(f"Startup (--help, budget {STARTUP_BUDGET:.2f}s)")
+    for script in scripts:
+        startup[script] = startup_time(script, repeat)
+        over = "  over budget" if startup[script] > STARTUP_BUDGET else ""
+        print(f"  {script:<24} {startup[script]:7.3f}s{over}")
+    return startup
+
+
+def run_once(script, path, workers, backend):
+    """Run a script in a fresh process, returns its result dict"""
+    with tempfile.TemporaryDirectory() as tmp:
+        output = os.path.join(tmp, "result.json")
+        env = dict(os.environ, MPLBACKEND="Agg")
+        subprocess.run(
+            [sys.executable, os.path.abspath(__file__), "--child", script, path,
+             "--workers", str(workers), "--json-backend", backend, "--child-output", output],
+            check=True, env=env, stdout=subprocess.DEVNULL,
+        )
+        with open(output) as f:
+            return json.load(f)
+
+
+def best_of(runs):
+    """Fastest time of every stage and of the whole run over repeated runs"""
+    stages = sorted({stage for run in runs for stage in run["stages"]})
+    return {
+        "total": min(run["total"] for run in runs),
+        "stages": {stage: min(run["stages"].get(stage, 0.0) for run in runs) for stage in stages},
+        "peak_rss_mb": max(run["peak_rss_mb"] for run in runs),
+        "peak_worker_rss_mb": max(run["peak_worker_rss_mb"] for run in runs),
+    }
+
+
+def git_commit():
+    """(commit hash, uncommitted changes) of the repository, (None, None) outside of git"""
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "HEAD"], cwd=BENCH_DIR, capture_output=True, text=True, check=True
+        ).stdout.strip()
+        status = subprocess.run(
+            ["git", "status", "--porcelain", "--untracked-files=no"], cwd=BENCH_DIR, capture_output=True, text=True, check=True
+        ).stdout
+    except (OSError, subprocess.CalledProcessError):
+        return None, None
+    return commit, bool(status.strip())
+
+
+def benchmark(scripts, sizes, repeat, workers, backend, seed):
+    commit, dirty = git_commit()
+    results = {
+        "version": RESULT_VERSION,
+        "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "commit": commit,
+        "dirty": dirty,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "workers": workers,
+        "json_backend": backend,
+        "startup_budget": STARTUP_BUDGET,
+        "startup": measure_startup(scripts, repeat),
+        "files": {},
+        "runs": [],
+    }
+
+    for size in sizes:
+        path, meta = export_file(size, seed)
+        results["files"][size] = meta
+        for script in scripts:
+            print(f"{script} on {size} ({meta['lines']:,} lines)...", flush=True)
+            runs = [run_once(script, path, workers, backend) for _ in range(repeat)]
+            results["runs"].append({"script": script, "size": size, "repeat": repeat, **best_of(runs)})
+            print_run(results["runs"][-1], meta["bytes"])
+
+    return results
+
+
+# ============================================================
+# REPORTING
+# ============================================================
+
+
+def print_run(run, size_bytes):
+    print(f"  total {run['total']:.3f}s ({size_bytes / run['total'] / 1024 ** 2:,.1f} MB/s), "
+          f"peak RSS {run['peak_rss_mb']:,.0f} MB, workers {run['peak_worker_rss_mb']:,.0f} MB")
+    for stage, seconds in run["stages"].items():
+        print(f"    {stage:<12} {seconds:9.3f}s")
+
+
+def compare(old, new):
+    """Print the stage times of two result files side by side"""
+    if old.get("version") != new.get("version"):
+        print(f"Result versions differ ({old.get('version')} and {new.get('version')}), the stages are not measured the same way")
+    print(f"old: {old.get('commit')} ({old.get('created')})")
+    print(f"new: {new.get('commit')} ({new.get('created')})")
+    startup = [(script, old.get("startup", {}).get(script), seconds) for script, seconds in new.get("startup", {}).items()]
+    if any(before is not None for _, before, _ in startup):
+        print("\nstartup")
+        for script, a, b in startup:
+            if a is not None:
+                print(f"  {script:<24} {a:8.3f}s {b:8.3f}s {(b - a) / a * 100:+7.1f}%")
+
+    old_runs = {(run["script"], run["size"]): run for run in old["runs"]}
+
+    for run in new["runs"]:
+        before = old_runs.get((run["script"], run["size"]))
+        if before is None:
+            continue
+        print(f"\n{run['script']} {run['size']}")
+        print(f"  {'stage':<12} {'old':>9} {'new':>9} {'change':>8}")
+        rows = [("total", before["total"], run["total"])]
+        for stage in sorted(set(before["stages"]) | set(run["stages"])):
+            rows.append((stage, before["stages"].get(stage, 0.0), run["stages"].get(stage, 0.0)))
+        for stage, a, b in rows:
+            change = f"{(b - a) / a * 100:+7.1f}%" if a > 0 else "     n/a"
+            print(f"  {stage:<12} {a:8.3f}s {b:8.3f}s {change}")
+
+
+def default_output(results):
+    commit = (results["commit"] or "nogit")[:10] + ("-dirty" if results["dirty"] else "")
+    stamp = results["created"].replace(":", "").replace("-", "")
+    return os.path.join(RESULTS_DIR, f"{stamp}_{commit}.json")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Time every stage of the analysis scripts on synthetic exports")
+    parser.add_argument("--sizes", nargs="+", default=list(DEFAULT_SIZES), help="Export sizes, e.g. 10MB 1GB 10GB (default: 10MB)")
+    parser.add_argument("--scripts", nargs="+", default=list(SCRIPTS), choices=SCRIPTS, help="Scripts to run (default: all)")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per script and size, the fastest counts (default: 3)")
+    parser.add_argument("--workers", type=int, default=0, help="Decoding processes of the scripts (default: one per CPU)")
+    parser.add_argument("--json-backend", default="auto", help="JSON decoder of the scripts (default: auto)")
+    parser.add_argument("--seed", type=int, default=0, help="Seed of the synthetic exports (default: 0)")
+    parser.add_argument("--output", default=None, help=f"Result file (default: {RESULTS_DIR}/<time>_<commit>.json)")
+    parser.add_argument("--baseline", default=None, help="Result file to compare this run with")
+    parser.add_argument("--compare", nargs=2, metavar=("OLD", "NEW"), help="Only compare two result files")
+    parser.add_argument("--startup", action="store_true", help=f"Only measure the startup times, exit with status 1 when one is over {STARTUP_BUDGET}s")
+    parser.add_argument("--child", nargs=2, metavar=("SCRIPT", "FILE"), help=argparse.SUPPRESS)
+    parser.add_argument("--child-output", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_child(*args.child, args.workers, args.json_backend, args.child_output)
+    elif args.compare:
+        with open(args.compare[0]) as old, open(args.compare[1]) as new:
+            compare(json.load(old), json.load(new))
+    elif args.startup:
+        startup = measure_startup(args.scripts, args.repeat)
+        sys.exit(1 if max(startup.values()) > STARTUP_BUDGET else 0)
+    else:
+        results = benchmark(args.scripts, args.sizes, args.repeat, args.workers, args.json_backend, args.seed)
+        output = args.output or default_output(results)
+        os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+        with open(output, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"\nResults written to {output}")
+        if args.baseline:
+            with open(args.baseline) as f:
+                compare(json.load(f), results)
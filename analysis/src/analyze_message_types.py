@@ -1,317 +1,703 @@
 import json
-import pandas as pd
-import plotly.graph_objects as go
 import argparse
+import hashlib
 import os
-from datetime import datetime
 from collections import defaultdict
 
+import instrumentation
+import json_backend
+import jsonl_reader
+import timestamps
+
+# pandas, plotly and NumPy (with jsonl_index and telemetry_cache, which import
+# it) are imported by the steps that use them, so --help and argument errors
+# do not pay for importing them
+
 # ============================================================
 # COMMAND LINE ARGUMENT PARSING
 # ============================================================
 
-parser = argparse.ArgumentParser(
-    description="Analyze messageContentType distribution and timing in JSONL telemetry data"
-)
-
-parser.add_argument("jsonl_file", type=str, help="Path to the JSONL file")
-parser.add_argument(
-    "--output-dir",
-    type=str,
-    default=".",
-    help="Output directory for generated files (default: current directory)",
-)
-parser.add_argument(
-    "--encoding",
-    type=str,
-    default="auto",
-    choices=["auto", "utf-8", "utf-16", "utf-16-le"],
-    help="File encoding (default: auto-detect)",
-)
-parser.add_argument("--png", action="store_true", help="Skip PNG generation")
-
-args = parser.parse_args()
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="Analyze messageContentType distribution and timing in JSONL telemetry data"
+    )
+
+    parser.add_argument(
+        "jsonl_file", type=str, help="Path to the JSONL file, may be compressed (.jsonl.gz, .jsonl.zst)"
+    )
+    parser.add_argument(
+        "--output-dir",
+        type=str,
+        default=".",
+        help="Output directory for generated files (default: current directory)",
+    )
+    parser.add_argument(
+        "--encoding",
+        type=str,
+        default="auto",
+        choices=["auto", "utf-8", "utf-16", "utf-16-le"],
+        help="File encoding (default: auto-detect)",
+    )
+    parser.add_argument("--png", action="store_true", help="Skip PNG generation")
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=0,
+        help="Number of decoding processes (default: one per CPU)",
+    )
+    parser.add_argument(
+        "--cache",
+        action="store_true",
+        help="Read through a columnar cache stored next to the JSONL file (needs pyarrow)",
+    )
+    parser.add_argument(
+        "--index",
+        action="store_true",
+        help="Take counts and timestamps from a type index stored next to the JSONL "
+        "file without decoding it (UTF-8 files only)",
+    )
+    parser.add_argument(
+        "--json-backend",
+        type=str,
+        default="auto",
+        choices=json_backend.BACKENDS,
+        help="JSON decoder: 'auto' uses orjson, then simdjson when installed, then the standard library",
+    )
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="Keep a checkpoint next to the JSONL file and only decode the lines appended "
+        "since the last run (uncompressed UTF-8 files only). The checkpoint keeps every "
+        "timestamp (10 bytes per record) and the statistics are computed over all of them "
+        "on every run, only decoding is limited to the new lines",
+    )
+    instrumentation.add_arguments(parser)
+    return parser.parse_args()
+
 
 # ============================================================
-# LOAD JSONL FILE
+# CHUNK DECODING
 # ============================================================
 
-print(f"Loading JSONL file: {args.jsonl_file}")
-
-# Determine encoding
-if args.encoding == "auto":
-    # Quick check for UTF-16 BOM
-    with open(args.jsonl_file, "rb") as f:
-        first_bytes = f.read(2)
-        if first_bytes == b"\xff\xfe":
-            encoding = "utf-16-le"
-            print(f"Detected encoding: utf-16-le (BOM found)")
-        else:
-            encoding = "utf-8"
-            print(f"Using encoding: utf-8")
-else:
-    encoding = args.encoding
-    print(f"Using specified encoding: {encoding}")
-
-# Load data and analyze
-message_type_data = defaultdict(lambda: {"count": 0, "timestamps": []})
-
-total_records = 0
-print("Processing records...")
-
-with open(args.jsonl_file, "r", encoding=encoding, errors="ignore") as f:
-    for line_num, line in enumerate(f, 1):
-        if line_num % 10000 == 0:
-            print(
-                f"  Processed {line_num} lines... ({len(message_type_data)} unique message types)"
-            )
 
-        line = line.strip()
-        if not line:
-            continue
+def add_record(type_data, timestamp_str):
+    """Count one record of a message type and keep its raw timestamp"""
+    # Update count
+    type_data["count"] += 1
+
+    # Timestamps are parsed later in one batch per message type
+    if timestamp_str:
+        type_data["timestamps"].append(timestamp_str)
+
+
+def count_cached(manifest):
+    """Same result as count_chunk over the whole file, read from the columnar cache"""
+    import telemetry_cache
+
+    message_type_data = defaultdict(lambda: {"count": 0, "timestamps": []})
+
+    cached_types = [entry["messageContentType"] for entry in manifest["types"]]
+    for msg_type, type_data in telemetry_cache.load_columns(
+        manifest, cached_types, []
+    ).items():
+        for timestamp_str in type_data[telemetry_cache.TS_COLUMN]:
+            add_record(message_type_data[msg_type], timestamp_str)
+
+    return manifest["lines"], manifest["records"], dict(message_type_data)
 
+
+def count_chunk(path, start, end, encoding, lines=None):
+    """Count records and collect timestamps per message type for one byte range"""
+    import jsonl_index
+
+    message_type_data = defaultdict(lambda: {"count": 0, "timestamps": []})
+
+    total_records = 0
+    line_num = 0
+
+    for line_num, line in enumerate(jsonl_reader.iter_lines(path, start, end, encoding, lines), 1):
         try:
-            obj = json.loads(line)
+            obj = jsonl_reader.loads(line)
             total_records += 1
 
             # Get message type and timestamp
-            msg_type = obj.get("messageContentType", "UNKNOWN")
+            msg_type = jsonl_index.type_key(obj)
             timestamp_str = obj.get("timestamp")
 
-            # Update count
-            message_type_data[msg_type]["count"] += 1
-
-            # Parse timestamp if available
-            if timestamp_str:
-                try:
-                    timestamp = pd.to_datetime(timestamp_str)
-                    message_type_data[msg_type]["timestamps"].append(timestamp)
-                except:
-                    pass
+            add_record(message_type_data[msg_type], timestamp_str)
 
-        except json.JSONDecodeError as e:
-            if line_num <= 5:
+        except ValueError as e:
+            if start == 0 and line_num <= 5:
                 print(f"Warning: Skipping invalid JSON on line {line_num}")
             continue
 
-print(f"\nLoaded {total_records} records")
-print(f"Found {len(message_type_data)} unique message types")
+    return line_num, total_records, dict(message_type_data)
 
-# ============================================================
-# CALCULATE STATISTICS
-# ============================================================
 
-print("\nCalculating statistics...")
-
-results = []
-
-for msg_type, data_dict in message_type_data.items():
-    count = data_dict["count"]
-    timestamps = data_dict["timestamps"]
-
-    # Calculate average time between appearances
-    avg_interval_seconds = None
-    avg_interval_str = "N/A"
-    first_appearance = None
-    last_appearance = None
-
-    if len(timestamps) > 0:
-        # Sort timestamps first
-        timestamps_sorted = sorted(timestamps)
-        first_appearance = timestamps_sorted[0]
-        last_appearance = timestamps_sorted[-1]
-        
-        intervals = []
-        # Calculate intervals only if we have more than one timestamp
-        if len(timestamps_sorted) > 1:
-            for i in range(1, len(timestamps_sorted)):
-                interval = (
-                    timestamps_sorted[i] - timestamps_sorted[i - 1]
-                ).total_seconds()
-                intervals.append(interval)
-
-            if intervals:
-                avg_interval_seconds = sum(intervals) / len(intervals)
-
-                # Format nicely
-                if avg_interval_seconds < 1:
-                    avg_interval_str = f"{avg_interval_seconds*1000:.2f} ms"
-                elif avg_interval_seconds < 60:
-                    avg_interval_str = f"{avg_interval_seconds:.2f} sec"
-                elif avg_interval_seconds < 3600:
-                    avg_interval_str = f"{avg_interval_seconds/60:.2f} min"
-                else:
-                    avg_interval_str = f"{avg_interval_seconds/3600:.2f} hr"
-
-    results.append(
-        {
-            "Message Type": msg_type,
-            "Count": count,
-            "Percentage": (count / total_records) * 100 if total_records > 0 else 0,
-            "Avg Interval (seconds)": avg_interval_seconds,
-            "Avg Interval": avg_interval_str,
-            "First Appearance": first_appearance,
-            "Last Appearance": last_appearance,
-            "Timestamp": timestamps_sorted,
-            "Intervals": [avg_interval_seconds] + intervals
+def count_indexed(type_index):
+    """Same result as count_chunk over the whole file, read from the type index or a checkpoint"""
+    message_type_data = {}
+    for msg_type, entry in type_index["types"].items():
+        message_type_data[msg_type] = {
+            "count": len(entry["timestamps"]),
+            "timestamps": indexed_timestamps(entry),
         }
-    )
+    return type_index["lines"], type_index["records"], message_type_data
 
-# Create DataFrame
-df_results = pd.DataFrame(results)
 
-# Sort by count (descending)
-df_results = df_results.sort_values("Count", ascending=False)
+def indexed_timestamps(entry):
+    """Sorted timestamps of one type of the type index, with the zone parse_timestamps gives"""
+    import numpy as np
+
+    import jsonl_index
+
+    valid = entry["timestamps"] != jsonl_index.NO_TIMESTAMP
+    offsets = np.unique(entry["utc_offsets"][valid])
+
+    if len(offsets) == 1 and offsets[0] == jsonl_index.NO_OFFSET:
+        minutes = None  # naive timestamps, stored as if they were UTC
+    elif len(offsets) == 1:
+        minutes = int(offsets[0])
+    else:
+        # Mixed UTC offsets cannot share one timezone, compare them in UTC
+        minutes = 0
+    return localize(entry["timestamps"][valid], minutes).sort_values()
 
-print(f"\nMessage Type Distribution:")
-print(
-    df_results[["Message Type", "Count", "Percentage", "Avg Interval"]].to_string(
-        index=False
-    )
-)
 
 # ============================================================
-# EXPORT CSV
+# INCREMENTAL CHECKPOINT
 # ============================================================
+#
+# --incremental keeps <export>.jsonl.checkpoint.npz with the byte offset the
+# export was read up to and, per message type, the UTC nanoseconds and UTC
+# offsets of its records, the columns of the type index, keyed by
+# jsonl_index.type_key() like count_chunk. The next run only decodes the bytes
+# appended since.
+#
+# The CSV lists every timestamp and interval of a type and the median and
+# percentiles need all intervals, so running sums or a sketch cannot give the
+# output of a full run: the checkpoint grows by 10 bytes per record, and the
+# statistics are computed over the whole history on every run.
+
+CHECKPOINT_SUFFIX = ".checkpoint.npz"
+CHECKPOINT_VERSION = 2
+
+# Bytes at the start of the file and before the checkpoint offset that have
+# to be unchanged, otherwise the export was replaced and is read from the start
+FINGERPRINT_SIZE = 64 * 1024
+
+
+def fingerprint(path, offset):
+    """Hash of the first and the last bytes before offset"""
+    digest = hashlib.sha1()
+    with open(path, "rb") as f:
+        digest.update(f.read(min(offset, FINGERPRINT_SIZE)))
+        f.seek(max(0, offset - FINGERPRINT_SIZE))
+        digest.update(f.read(offset - f.tell()))
+    return digest.hexdigest()
+
+
+def complete_end(path, start):
+    """End of the last newline terminated line after start"""
+    end = os.path.getsize(path)
+    with open(path, "rb") as f:
+        while end > start:
+            block_start = max(start, end - FINGERPRINT_SIZE)
+            f.seek(block_start)
+            newline = f.read(end - block_start).rfind(b"\n")
+            if newline >= 0:
+                return block_start + newline + 1
+            end = block_start
+    return start
+
+
+def load_checkpoint(path):
+    """Saved state of path, None when there is none or the file was changed other than appended to"""
+    import numpy as np
+
+    checkpoint_file = path + CHECKPOINT_SUFFIX
+    if not os.path.exists(checkpoint_file):
+        return None
+
+    with np.load(checkpoint_file, allow_pickle=False) as data:
+        state = json.loads(str(data["meta"]))
+        if state.get("version") != CHECKPOINT_VERSION:
+            return None
+        state["types"] = {
+            msg_type: {
+                "timestamps": data[f"timestamps{type_id}"],
+                "utc_offsets": data[f"utc_offsets{type_id}"],
+            }
+            for type_id, msg_type in enumerate(state["types"])
+        }
+
+    if (
+        os.path.getsize(path) < state["offset"]
+        or fingerprint(path, state["offset"]) != state["fingerprint"]
+    ):
+        print("The file changed before the checkpoint, analyzing it from the start")
+        return None
+    return state
+
+
+def save_checkpoint(path, state):
+    """Write the state through a temporary file so an interrupted run keeps the old checkpoint"""
+    import numpy as np
+
+    meta = {
+        "version": CHECKPOINT_VERSION,
+        "offset": state["offset"],
+        "fingerprint": fingerprint(path, state["offset"]),
+        "lines": state["lines"],
+        "records": state["records"],
+        "types": list(state["types"]),
+    }
+    arrays = {}
+    for type_id, entry in enumerate(state["types"].values()):
+        arrays[f"timestamps{type_id}"] = entry["timestamps"]
+        arrays[f"utc_offsets{type_id}"] = entry["utc_offsets"]
+
+    checkpoint_file = path + CHECKPOINT_SUFFIX
+    with open(checkpoint_file + ".tmp", "wb") as f:
+        np.savez(f, meta=np.array(json.dumps(meta)), **arrays)
+    os.replace(checkpoint_file + ".tmp", checkpoint_file)
+
+
+def read_range(state, path, start, end, workers=None):
+    """A new state with the records between two byte offsets added to state"""
+    import numpy as np
+
+    import jsonl_index
+
+    lines = 0
+    records = 0
+    parts = {msg_type: [entry] for msg_type, entry in state["types"].items()}
+
+    for chunk in jsonl_reader.map_chunks(
+        jsonl_index.index_chunk, path, workers=workers, start=start, end=end,
+        paths=["messageContentType", "timestamp"],
+    ):
+        lines += chunk["lines"]
+        type_ids = np.frombuffer(chunk["type_ids"], dtype=np.int32)
+        records += len(type_ids)
+        chunk_ns = np.frombuffer(chunk["timestamps"], dtype=np.int64)
+        chunk_offsets = np.frombuffer(chunk["utc_offsets"], dtype=np.int16)
+        for type_id, msg_type in enumerate(chunk["types"]):
+            rows = type_ids == type_id
+            parts.setdefault(msg_type, []).append(
+                {"timestamps": chunk_ns[rows], "utc_offsets": chunk_offsets[rows]}
+            )
+
+    return {
+        "offset": end,
+        "lines": state["lines"] + lines,
+        "records": state["records"] + records,
+        "types": {
+            msg_type: {
+                name: np.concatenate([entry[name] for entry in entries])
+                for name in ("timestamps", "utc_offsets")
+            }
+            for msg_type, entries in parts.items()
+        },
+    }
 
-base_filename = os.path.splitext(os.path.basename(args.jsonl_file))[0]
-output_dir = args.output_dir
-os.makedirs(output_dir, exist_ok=True)
 
-csv_file = os.path.join(output_dir, f"{base_filename}_message_type_analysis.csv")
-df_results.to_csv(csv_file, index=False)
-print(f"\nExported analysis to {csv_file}")
+def count_incremental(path, workers=None):
+    """Same result as count_chunk over the whole file, only the bytes after the checkpoint are decoded"""
+    state = load_checkpoint(path)
+    if state is None:
+        state = {"offset": 0, "lines": 0, "records": 0, "types": {}}
+
+    # A line the exporter is still writing is read, but left out of the checkpoint
+    end = complete_end(path, state["offset"])
+    print(f"Checkpoint at byte {state['offset']:,}, reading {os.path.getsize(path) - state['offset']:,} new bytes")
+
+    state = read_range(state, path, state["offset"], end, workers)
+    save_checkpoint(path, state)
+
+    if end < os.path.getsize(path):
+        state = read_range(state, path, end, os.path.getsize(path), workers)
+    return count_indexed(state)
+
 
 # ============================================================
-# CREATE VISUALIZATIONS
+# TIMESTAMP AND INTERVAL STATISTICS
 # ============================================================
 
-print("\nGenerating visualizations...")
-
-# Create a table figure
-fig = go.Figure(
-    data=[
-        go.Table(
-            header=dict(
-                values=["Message Type", "Count", "Percentage (%)", "Avg Interval"],
-                fill_color="paleturquoise",
-                align="left",
-                font=dict(size=12, color="black"),
-            ),
-            cells=dict(
-                values=[
-                    df_results["Message Type"],
-                    df_results["Count"],
-                    df_results["Percentage"].round(2),
-                    df_results["Avg Interval"],
-                ],
-                fill_color="lavender",
-                align="left",
-                font=dict(size=11),
-            ),
+
+def localize(ns, minutes):
+    """DatetimeIndex of UTC nanoseconds shown in a fixed UTC offset, naive for None"""
+    import numpy as np
+    import pandas as pd
+
+    index = pd.DatetimeIndex(np.asarray(ns, dtype=np.int64).view("datetime64[ns]"))
+    if minutes is None:
+        return index
+    return index.tz_localize("UTC").tz_convert(timestamps.fixed_zone(minutes))
+
+
+def parse_timestamps(timestamp_strs):
+    """Parse the raw timestamps of one message type in a single batch, sorted"""
+    import pandas as pd
+
+    # Timestamps sharing one format and UTC offset take the NumPy fast path
+    batch = timestamps.parse_ns(timestamp_strs)
+    if batch is not None:
+        return localize(*batch).sort_values()
+
+    try:
+        parsed = pd.to_datetime(
+            pd.Series(timestamp_strs, dtype=object), format="ISO8601", errors="coerce"
         )
-    ]
-)
-
-fig.update_layout(
-    title=f"Message Type Distribution - {base_filename}",
-    height=max(400, len(df_results) * 30 + 100),
-)
-
-# Save HTML
-output_file_html = os.path.join(output_dir, f"{base_filename}_message_type_table.html")
-fig.write_html(output_file_html)
-print(f"Table saved as {output_file_html}")
-
-# Create bar chart
-fig_bar = go.Figure()
-
-fig_bar.add_trace(
-    go.Bar(
-        x=df_results["Message Type"],
-        y=df_results["Count"],
-        text=df_results["Count"],
-        textposition="auto",
-        marker_color="indianred",
-    )
-)
-
-fig_bar.update_layout(
-    title=f"Message Type Count Distribution - {base_filename}",
-    xaxis_title="Message Type",
-    yaxis_title="Count",
-    height=600,
-    xaxis_tickangle=-45,
-)
-
-# Save bar chart HTML
-output_file_bar_html = os.path.join(
-    output_dir, f"{base_filename}_message_type_chart.html"
-)
-fig_bar.write_html(output_file_bar_html)
-print(f"Chart saved as {output_file_bar_html}")
-
-# Create scatter plot
-fig_scatter = go.Figure()
-
-for result in results:
-    fig_scatter.add_trace(
-        go.Scatter(
-            x=result["Timestamp"],
-            y=result["Intervals"],
-            mode='markers',
-            name=result["Message Type"]
+    except ValueError:
+        parsed = None  # newer pandas raise on mixed UTC offsets, older ones give objects
+    if parsed is None or not pd.api.types.is_datetime64_any_dtype(parsed):
+        # Mixed UTC offsets cannot share one timezone, compare them in UTC
+        parsed = pd.to_datetime(
+            pd.Series(timestamp_strs, dtype=object),
+            format="ISO8601",
+            errors="coerce",
+            utc=True,
+        )
+    return pd.DatetimeIndex(parsed.dropna()).sort_values()
+
+
+def interval_statistics(timestamps_sorted):
+    """Intervals in seconds between consecutive timestamps and their statistics"""
+    import numpy as np
+
+    ns = timestamps_sorted.as_unit("ns").asi8
+    intervals = np.diff(ns) / 1e9
+    if len(intervals) == 0:
+        return intervals, {}
+
+    return intervals, {
+        # Summing integer nanoseconds keeps the mean exact for long captures
+        "avg": float(np.sum(np.diff(ns))) / 1e9 / len(intervals),
+        "min": float(intervals.min()),
+        "max": float(intervals.max()),
+        "median": float(np.median(intervals)),
+        "p95": float(np.percentile(intervals, 95)),
+        "p99": float(np.percentile(intervals, 99)),
+        "std": float(intervals.std()),
+    }
+
+
+def main():
+    args = parse_args()
+    json_backend.select(args.json_backend)
+    instrumentation.start(args, "analyze_message_types")
+
+    # ============================================================
+    # LOAD JSONL FILE
+    # ============================================================
+
+    print(f"Loading JSONL file: {args.jsonl_file}")
+
+    # Determine encoding
+    if args.encoding == "auto":
+        # BOM and NUL byte check on the first block of the file
+        encoding = jsonl_reader.detect_encoding(args.jsonl_file)
+        print(f"Detected encoding: {encoding}")
+    else:
+        encoding = args.encoding
+        print(f"Using specified encoding: {encoding}")
+
+    # Load data and analyze, the file is decoded in parallel chunks
+    message_type_data = defaultdict(lambda: {"count": 0, "timestamps": []})
+
+    total_records = 0
+    total_lines = 0
+    print("Processing records...")
+
+    import jsonl_index
+    import telemetry_cache
+
+    if args.cache and not telemetry_cache.available():
+        print("pyarrow is not installed, reading the JSONL file without cache")
+        args.cache = False
+
+    if args.index and not jsonl_reader.seekable(args.jsonl_file, encoding):
+        print(f"The type index needs an uncompressed UTF-8 file, reading the {encoding} file without index")
+        args.index = False
+
+    if args.incremental and not jsonl_reader.seekable(args.jsonl_file, encoding):
+        print(f"Incremental mode needs an uncompressed UTF-8 file, reading the {encoding} file in full")
+        args.incremental = False
+
+    import numpy as np
+    import pandas as pd
+
+    scan = instrumentation.begin("scan", bytes=os.path.getsize(args.jsonl_file))
+    if args.incremental:
+        chunks = [count_incremental(args.jsonl_file, args.workers)]
+    elif args.index:
+        type_index = jsonl_index.open_type_index(args.jsonl_file, args.workers)
+        chunks = [count_indexed(type_index)]
+    elif args.cache:
+        manifest = telemetry_cache.open_cache(args.jsonl_file, encoding, args.workers)
+        chunks = [count_cached(manifest)]
+    else:
+        chunks = jsonl_reader.map_chunks(
+            count_chunk, args.jsonl_file, workers=args.workers, encoding=encoding,
+            paths=["messageContentType", "timestamp"],
+        )
+    for chunk_lines, chunk_records, chunk_types in chunks:
+        total_lines += chunk_lines
+        total_records += chunk_records
+        for msg_type, chunk_data in chunk_types.items():
+            message_type_data[msg_type]["count"] += chunk_data["count"]
+            if isinstance(chunk_data["timestamps"], pd.DatetimeIndex):
+                # Already parsed and sorted by the type index
+                message_type_data[msg_type]["timestamps"] = chunk_data["timestamps"]
+            else:
+                message_type_data[msg_type]["timestamps"].extend(chunk_data["timestamps"])
+        print(
+            f"  Processed {total_lines} lines... ({len(message_type_data)} unique message types)"
         )
-    )
 
-fig_scatter.update_layout(
-    title=f"Message Type Intervals - {base_filename}",
-    xaxis_title="Timestamp",
-    yaxis_title="Interval(seconds)",
-)
+    scan.records = total_lines
+    scan.end()
+
+    print(f"\nLoaded {total_records} records")
+    print(f"Found {len(message_type_data)} unique message types")
+
+    # ============================================================
+    # CALCULATE STATISTICS
+    # ============================================================
+
+    print("\nCalculating statistics...")
+
+    results = []
+
+    for msg_type, data_dict in message_type_data.items():
+        count = data_dict["count"]
+        type_timestamps = data_dict["timestamps"]
+
+        # Calculate average time between appearances
+        avg_interval_seconds = None
+        avg_interval_str = "N/A"
+        first_appearance = None
+        last_appearance = None
+        timestamps_sorted = []
+        intervals = np.array([])
+        stats = {}
+
+        if isinstance(type_timestamps, pd.DatetimeIndex):
+            timestamps_sorted = type_timestamps
+        elif len(type_timestamps) > 0:
+            # Parse and sort all timestamps of this type at once
+            with instrumentation.stage("parse", records=len(type_timestamps)):
+                timestamps_sorted = parse_timestamps(type_timestamps)
+
+        if len(timestamps_sorted) > 0:
+            first_appearance = timestamps_sorted[0]
+            last_appearance = timestamps_sorted[-1]
+
+            # Calculate intervals only if we have more than one timestamp
+            if len(timestamps_sorted) > 1:
+                with instrumentation.stage("statistics", records=len(timestamps_sorted)):
+                    intervals, stats = interval_statistics(timestamps_sorted)
+
+                if stats:
+                    avg_interval_seconds = stats["avg"]
+
+                    # Format nicely
+                    if avg_interval_seconds < 1:
+                        avg_interval_str = f"{avg_interval_seconds*1000:.2f} ms"
+                    elif avg_interval_seconds < 60:
+                        avg_interval_str = f"{avg_interval_seconds:.2f} sec"
+                    elif avg_interval_seconds < 3600:
+                        avg_interval_str = f"{avg_interval_seconds/60:.2f} min"
+                    else:
+                        avg_interval_str = f"{avg_interval_seconds/3600:.2f} hr"
+
+        results.append(
+            {
+                "Message Type": msg_type,
+                "Count": count,
+                "Percentage": (count / total_records) * 100 if total_records > 0 else 0,
+                "Avg Interval (seconds)": avg_interval_seconds,
+                "Avg Interval": avg_interval_str,
+                "Min Interval (seconds)": stats.get("min"),
+                "Max Interval (seconds)": stats.get("max"),
+                "Median Interval (seconds)": stats.get("median"),
+                "P95 Interval (seconds)": stats.get("p95"),
+                "P99 Interval (seconds)": stats.get("p99"),
+                "Std Interval (seconds)": stats.get("std"),
+                "First Appearance": first_appearance,
+                "Last Appearance": last_appearance,
+                "Timestamp": list(timestamps_sorted),
+                "Intervals": [avg_interval_seconds] + intervals.tolist()
+            }
+        )
 
-    # Save scatter plot HTML
-output_file_scatter_html = os.path.join(
-    output_dir, f"{base_filename}_message_type_scatter.html"
-)
-fig_scatter.write_html(output_file_scatter_html)
-print(f"Chart saved as {output_file_scatter_html}")
+    # Create DataFrame
+    df_results = pd.DataFrame(results)
 
+    # Sort by count (descending)
+    df_results = df_results.sort_values("Count", ascending=False)
 
-# Save PNG if requested
-if args.png:
-    print("\nGenerating PNG files...")
+    print(f"\nMessage Type Distribution:")
+    print(
+        df_results[["Message Type", "Count", "Percentage", "Avg Interval"]].to_string(
+            index=False
+        )
+    )
 
-    # Save table as PNG
-    output_file_png = os.path.join(
-        output_dir, f"{base_filename}_message_type_table.png"
+    # ============================================================
+    # EXPORT CSV
+    # ============================================================
+
+    base_filename = jsonl_reader.base_name(args.jsonl_file)
+    output_dir = args.output_dir
+    os.makedirs(output_dir, exist_ok=True)
+
+    csv_file = os.path.join(output_dir, f"{base_filename}_message_type_analysis.csv")
+    with instrumentation.stage("write", records=len(df_results)) as stage:
+        df_results.to_csv(csv_file, index=False)
+        stage.bytes = os.path.getsize(csv_file)
+    print(f"\nExported analysis to {csv_file}")
+
+    # ============================================================
+    # CREATE VISUALIZATIONS
+    # ============================================================
+
+    print("\nGenerating visualizations...")
+    render = instrumentation.begin("render", records=sum(len(result["Timestamp"]) for result in results))
+    import plotly.graph_objects as go
+
+    # Create a table figure
+    fig = go.Figure(
+        data=[
+            go.Table(
+                header=dict(
+                    values=["Message Type", "Count", "Percentage (%)", "Avg Interval"],
+                    fill_color="paleturquoise",
+                    align="left",
+                    font=dict(size=12, color="black"),
+                ),
+                cells=dict(
+                    values=[
+                        df_results["Message Type"],
+                        df_results["Count"],
+                        df_results["Percentage"].round(2),
+                        df_results["Avg Interval"],
+                    ],
+                    fill_color="lavender",
+                    align="left",
+                    font=dict(size=11),
+                ),
+            )
+        ]
     )
-    try:
-        import kaleido
 
-        fig.write_image(
-            output_file_png, width=1600, height=max(400, len(df_results) * 30 + 100)
+    fig.update_layout(
+        title=f"Message Type Distribution - {base_filename}",
+        height=max(400, len(df_results) * 30 + 100),
+    )
+
+    # Save HTML
+    output_file_html = os.path.join(output_dir, f"{base_filename}_message_type_table.html")
+    fig.write_html(output_file_html)
+    print(f"Table saved as {output_file_html}")
+
+    # Create bar chart
+    fig_bar = go.Figure()
+
+    fig_bar.add_trace(
+        go.Bar(
+            x=df_results["Message Type"],
+            y=df_results["Count"],
+            text=df_results["Count"],
+            textposition="auto",
+            marker_color="indianred",
         )
-        print(f"Table saved as {output_file_png}")
-    except Exception as e:
-        print(f"Could not save table PNG: {str(e)}")
+    )
 
-    # Save chart as PNG
-    output_file_bar_png = os.path.join(
-        output_dir, f"{base_filename}_message_type_chart.png"
+    fig_bar.update_layout(
+        title=f"Message Type Count Distribution - {base_filename}",
+        xaxis_title="Message Type",
+        yaxis_title="Count",
+        height=600,
+        xaxis_tickangle=-45,
     )
-    try:
-        import kaleido
 
-        fig_bar.write_image(output_file_bar_png, width=1920, height=1080)
-        print(f"Chart saved as {output_file_bar_png}")
-    except Exception as e:
-        print(f"Could not save chart PNG: {str(e)}")
+    # Save bar chart HTML
+    output_file_bar_html = os.path.join(
+        output_dir, f"{base_filename}_message_type_chart.html"
+    )
+    fig_bar.write_html(output_file_bar_html)
+    print(f"Chart saved as {output_file_bar_html}")
+
+    # Create scatter plot
+    fig_scatter = go.Figure()
+
+    for result in results:
+        fig_scatter.add_trace(
+            go.Scatter(
+                x=result["Timestamp"],
+                y=result["Intervals"],
+                mode='markers',
+                name=result["Message Type"]
+            )
+        )
+
+    fig_scatter.update_layout(
+        title=f"Message Type Intervals - {base_filename}",
+        xaxis_title="Timestamp",
+        yaxis_title="Interval(seconds)",
+    )
 
-print("\n=== Analysis Complete ===")
-print(f"Total records: {total_records}")
-print(f"Unique message types: {len(message_type_data)}")
-if len(df_results) > 0:
-    print(
-        f"Most common: {df_results.iloc[0]['Message Type']} ({df_results.iloc[0]['Count']} occurrences)"
+        # Save scatter plot HTML
+    output_file_scatter_html = os.path.join(
+        output_dir, f"{base_filename}_message_type_scatter.html"
     )
+    fig_scatter.write_html(output_file_scatter_html)
+    print(f"Chart saved as {output_file_scatter_html}")
+
+
+    # Save PNG if requested
+    if args.png:
+        print("\nGenerating PNG files...")
+
+        # Save table as PNG
+        output_file_png = os.path.join(
+            output_dir, f"{base_filename}_message_type_table.png"
+        )
+        try:
+            import kaleido
+
+            fig.write_image(
+                output_file_png, width=1600, height=max(400, len(df_results) * 30 + 100)
+            )
+            print(f"Table saved as {output_file_png}")
+        except Exception as e:
+            print(f"Could not save table PNG: {str(e)}")
+
+        # Save chart as PNG
+        output_file_bar_png = os.path.join(
+            output_dir, f"{base_filename}_message_type_chart.png"
+        )
+        try:
+            import kaleido
+
+            fig_bar.write_image(output_file_bar_png, width=1920, height=1080)
+            print(f"Chart saved as {output_file_bar_png}")
+        except Exception as e:
+            print(f"Could not save chart PNG: {str(e)}")
+
+    render.end()
+
+    print("\n=== Analysis Complete ===")
+    print(f"Total records: {total_records}")
+    print(f"Unique message types: {len(message_type_data)}")
+    if len(df_results) > 0:
+        print(
+            f"Most common: {df_results.iloc[0]['Message Type']} ({df_results.iloc[0]['Count']} occurrences)"
+        )
+
+
+if __name__ == "__main__":
+    main()
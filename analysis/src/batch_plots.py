@@ -0,0 +1,159 @@
+import argparse
+import os
+from pathlib import Path
+
+import batch_render
+import generic_values
+import instrumentation
+import json_backend
+import jsonl_reader
+import telemetry_cache
+
+# ============================================================
+# BATCH PLOTS
+# ============================================================
+#
+# Runs generic_values configs without opening a window. The axes of all
+# configs are planned together: every source file is scanned once, and axes
+# of any config with the same messageContentType and fieldPath share one
+# extracted field (the widest time window of them). The points are then fanned
+# out to the axes of each config, which apply their own datetimeFrom,
+# datetimeTo and onChangeOnly. As soon as all source files of a config are
+# scanned, its figure is rendered to PNG/SVG files by a pool of Agg processes
+# while the next file is scanned. With --sources every config is applied to
+# each of the source files, replacing the sourceFile of its axes.
+#
+# <output-dir>/<config>/<config>.png                   without --sources
+# <output-dir>/<config>/<source>/<config>.png          with --sources
+#
+# The CSV files of the axes (csvFileName) are written next to the figures.
+
+
+class Job:
+    """One config applied to one source file, or to the sourceFile of its axes"""
+
+    def __init__(self, configFile, config, subplots, source, target):
+        self.name = configFile if source is None else f"{configFile} on {source}"
+        self.config = config
+        self.subplots = subplots
+        self.path = os.path.join(target, Path(configFile).stem)
+        self.sources = {subplot.sourceFile for subplot in subplots}  # not scanned yet
+        self.failed = False
+
+
+def output_dir(base, configFile, source):
+    """Directory of the figures and CSV files of one config and source file"""
+    target = os.path.join(base, Path(configFile).stem)
+    if source is not None:
+        target = os.path.join(target, jsonl_reader.base_name(source))
+    os.makedirs(target, exist_ok=True)
+    return target
+
+
+def load_jobs(configFiles, sources, outputDir):
+    """The jobs of all valid configs and the names of the invalid ones"""
+    jobs = []
+    failed = []
+    for configFile in configFiles:
+        config = generic_values.configure(configFile)
+        if config is None:
+            failed.append(configFile)
+            continue
+
+        for source in sources or [None]:
+            try:
+                #load_and_validate_config() exits on an invalid config, the batch goes on
+                subplots = generic_values.load_and_validate_config(config)
+            except SystemExit:
+                print(f"Skipping {configFile}, the config is invalid")
+                failed.append(configFile)
+                break
+
+            target = output_dir(outputDir, configFile, source)
+            for subplot in subplots:
+                subplot.csvDir = target + os.sep
+                if source is not None:
+                    subplot.sourceFile = source
+            jobs.append(Job(configFile, config, subplots, source, target))
+    return jobs, failed
+
+
+def run(configFiles, sources, outputDir, formats, workers=None, renderWorkers=None, tileAxes=batch_render.TILE_AXES, cache=False, index=False):
+    """Extract and render every config for every source, returns the figure files written and the failed jobs"""
+    jobs, failed = load_jobs(configFiles, sources, outputDir)
+
+    if cache and not telemetry_cache.available():
+        print("pyarrow is not installed, reading the JSONL files without cache")
+        cache = False
+
+    plan = generic_values.plan_scans([subplot for job in jobs for subplot in job.subplots])
+    axes = sum(len(job.subplots) for job in jobs)
+    fields = sum(len(scanFields) for scanFields in plan.values())
+    print(f"{len(jobs)} plots with {axes} axes need {fields} fields from {len(plan)} source files")
+
+    with batch_render.RenderPool(renderWorkers, tileAxes) as pool:
+        for sourceFile, scanFields in plan.items():
+            print(f"\n=== {sourceFile} ===")
+            error = None
+            try:
+                generic_values.scan_file(sourceFile, scanFields, workers, cache, index)
+            except (OSError, EOFError, ValueError) as e:
+                #Missing or truncated files, invalid JSON and timestamps only fail the configs of this file
+                print(f"Skipping {sourceFile}: {type(e).__name__}: {e}")
+                error = e
+
+            for job in jobs:
+                if sourceFile not in job.sources:
+                    continue
+                job.sources.discard(sourceFile)
+                job.failed = job.failed or error is not None
+                if job.sources:
+                    continue
+                if job.failed:
+                    failed.append(job.name)
+                else:
+                    pool.submit(job.subplots, job.config, job.path, formats)
+
+        with instrumentation.stage("render"):
+            written = pool.close()
+
+    return written, failed
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Render generic_values configs to image files, without opening a window")
+    parser.add_argument("configFiles", nargs="+", help="Config files in the data directory")
+    parser.add_argument("--sources", nargs="+", default=None, help="Apply every config to each of these source files in the data directory instead of the sourceFile of its axes")
+    parser.add_argument("--data-path", default=generic_values.DATA_PATH, help=f"Directory of the config and source files (default: {generic_values.DATA_PATH})")
+    parser.add_argument("--output-dir", default=None, help="Directory of the figures and CSV files (default: plots in the data directory)")
+    parser.add_argument("--format", nargs="+", default=["png"], choices=batch_render.FORMATS, help="Image formats written (default: png)")
+    parser.add_argument("--render-workers", type=int, default=0, help="Number of rendering processes (default: one per CPU)")
+    parser.add_argument("--tile-axes", type=int, default=batch_render.TILE_AXES, help=f"Figures with at least this many axes are rendered one axis per process (default: {batch_render.TILE_AXES})")
+    parser.add_argument("--workers", type=int, default=0, help="Number of decoding processes (default: one per CPU)")
+    parser.add_argument("--cache", action="store_true", help="Read the source files through a columnar cache stored next to them (needs pyarrow)")
+    parser.add_argument("--index", action="store_true", help="Read only the lines of the configured types inside the datetimeFrom/datetimeTo windows through indexes stored next to the source files")
+    parser.add_argument("--json-backend", default="auto", choices=json_backend.BACKENDS, help="JSON decoder: 'auto' uses orjson, then simdjson when installed, then the standard library")
+    instrumentation.add_arguments(parser)
+    args = parser.parse_args()
+    json_backend.select(args.json_backend)
+    instrumentation.start(args, "batch_plots")
+
+    generic_values.DATA_PATH = os.path.join(args.data_path, "")
+    written, failed = run(
+        args.configFiles,
+        args.sources,
+        args.output_dir or os.path.join(args.data_path, "plots"),
+        args.format,
+        args.workers,
+        args.render_workers,
+        args.tile_axes,
+        args.cache,
+        args.index,
+    )
+
+    print("\n=== Summary ===")
+    print(f"{len(written)} figure files written")
+    for path in written:
+        print(f"  {path}")
+    if failed:
+        print(f"{len(failed)} failed: {', '.join(failed)}")
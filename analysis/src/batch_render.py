@@ -0,0 +1,254 @@
+import io
+import os
+import re
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+import plot_backend
+
+# ============================================================
+# BATCH RENDERING
+# ============================================================
+#
+# Figures are written to PNG or SVG files by a pool of processes with the Agg
+# backend, no window is opened. The axes are sent with the points extracted
+# already (PlotData.data), a worker only builds and saves the figure. Small
+# grids are rendered as one figure per task. Figures with TILE_AXES axes or
+# more are split: every task renders one axis as a tile of the grid, and the
+# tiles are put together into one image next to the title and the x label.
+
+FORMATS = ("png", "svg")
+
+# Inches of one grid cell, and of the title and x label rows
+CELL_SIZE = (6.4, 2.4)
+TITLE_HEIGHT = 0.5
+XLABEL_HEIGHT = 0.4
+DPI = 100
+
+# Figures with at least this many axes are rendered one axis per task
+TILE_AXES = 6
+
+# Figures rendered or queued per worker, pending figures hold their points in memory
+JOBS_PER_WORKER = 2
+
+# Root element of an SVG file, its size in pt
+SVG_ROOT = re.compile(r'<svg\b[^>]*?\bwidth="([\d.]+)pt" height="([\d.]+)pt"')
+
+
+def use_agg():
+    """Pool initializer, the workers render without a display"""
+    plot_backend.pyplot(agg=True)
+
+
+def draw_axis(axis, subplot):
+    """Draw the points of one PlotData on a matplotlib axis"""
+    if subplot.datatype == "boolean":
+        axis.step('x', 'y', subplot.style, where='post', data=subplot.data)
+        axis.set_yticks([0, 1], ['False', 'True'])
+    elif subplot.plotType == "step":
+        axis.step('x', 'y', subplot.style, where='post', data=subplot.data)
+    else:
+        axis.plot('x', 'y', subplot.style, data=subplot.data)
+
+    axis.set_ylabel(subplot.ylabel)
+
+    if subplot.title:
+        axis.set_title(subplot.title)
+
+
+def rotate_dates(axis):
+    """Slanted x tick labels like Figure.autofmt_xdate(), without changing the layout"""
+    for label in axis.get_xticklabels():
+        label.set_rotation(30)
+        label.set_horizontalalignment("right")
+
+
+def figure_size(config):
+    """Inches of the whole figure of a config"""
+    return CELL_SIZE[0] * config["columns"], CELL_SIZE[1] * config["rows"] + TITLE_HEIGHT + XLABEL_HEIGHT
+
+
+def xlabel(config):
+    return config["xlabel"] if "xlabel" in config and config["xlabel"] else "Timestamp"
+
+
+def render_figure(subplots, config, paths):
+    """Build the figure of a config with all of its axes and save it to paths (runs in a worker)"""
+    plt = plot_backend.pyplot(agg=True)
+    fig, axes = plt.subplots(
+        config["rows"], config["columns"], squeeze=False, figsize=figure_size(config), dpi=DPI, layout="constrained"
+    )
+    if "title" in config and config["title"]:
+        fig.suptitle(config["title"])
+
+    #The axes are filled row by row, like the interactive plot
+    for subplot, axis in zip(subplots, axes.flat):
+        draw_axis(axis, subplot)
+        rotate_dates(axis)
+    for axis in axes.flat[len(subplots):]:
+        axis.set_visible(False)
+    fig.supxlabel(xlabel(config))
+
+    for path in paths:
+        fig.savefig(path, dpi=DPI)
+    plt.close(fig)
+    return paths
+
+
+def finish_tile(plt, fig, fmt):
+    """RGBA pixels of a figure for png, its SVG document for svg"""
+    if fmt == "svg":
+        out = io.StringIO()
+        fig.savefig(out, format="svg", dpi=DPI)
+        tile = out.getvalue()
+    else:
+        fig.canvas.draw()
+        tile = np.asarray(fig.canvas.buffer_rgba()).copy()
+    plt.close(fig)
+    return tile
+
+
+def render_tile(subplot, fmt):
+    """One axis as a grid cell of a tiled figure (runs in a worker)"""
+    plt = plot_backend.pyplot(agg=True)
+    fig = plt.figure(figsize=CELL_SIZE, dpi=DPI, layout="constrained")
+    axis = fig.add_subplot()
+    draw_axis(axis, subplot)
+    rotate_dates(axis)
+    return finish_tile(plt, fig, fmt)
+
+
+def render_text(text, width, height, fmt, size="large"):
+    """A row of the tiled figure holding only a centered text, e.g. the title"""
+    plt = plot_backend.pyplot(agg=True)
+    fig = plt.figure(figsize=(width, height), dpi=DPI)
+    if text:
+        fig.text(0.5, 0.5, text, ha="center", va="center", fontsize=size)
+    return finish_tile(plt, fig, fmt)
+
+
+def compose_png(path, rows, columns, title, tiles, label):
+    """Write the title, the grid of tile pixels and the x label as one PNG"""
+    plt = plot_backend.pyplot(agg=True)
+    blank = np.full_like(tiles[0], 255)
+    tiles = tiles + [blank] * (rows * columns - len(tiles))
+    grid = [np.hstack(tiles[row * columns:(row + 1) * columns]) for row in range(rows)]
+    plt.imsave(path, np.vstack([title, *grid, label]), dpi=DPI)
+
+
+def compose_svg(path, rows, columns, title, tiles, label):
+    """Write the title, the grid of tile documents and the x label as one SVG"""
+    width, height = (float(size) for size in SVG_ROOT.search(tiles[0]).groups())
+    title_height = float(SVG_ROOT.search(title).group(2))
+    label_height = float(SVG_ROOT.search(label).group(2))
+    total_width = width * columns
+    total_height = title_height + height * rows + label_height
+
+    placed = [(title, 0, 0)]
+    for position, tile in enumerate(tiles):
+        row, column = divmod(position, columns)
+        placed.append((tile, column * width, title_height + row * height))
+    placed.append((label, 0, title_height + height * rows))
+
+    with open(path, "w", encoding="utf-8") as f:
+        f.write('<?xml version="1.0" encoding="utf-8" standalone="no"?>\n')
+        f.write(
+            f'<svg xmlns="http://www.w3.org/2000/svg" xmlns:xlink="http://www.w3.org/1999/xlink" version="1.1" '
+            f'width="{total_width}pt" height="{total_height}pt" viewBox="0 0 {total_width} {total_height}">\n'
+        )
+        f.write(f'<rect width="{total_width}" height="{total_height}" fill="white"/>\n')
+        for document, x, y in placed:
+            #Nested at its offset, in the user units (pt) of the outer document
+            document = document[document.index("<svg"):]
+            document = SVG_ROOT.sub(
+                lambda match: match.group(0)
+                .replace(f'width="{match.group(1)}pt"', f'x="{x}" y="{y}" width="{match.group(1)}"')
+                .replace(f'height="{match.group(2)}pt"', f'height="{match.group(2)}"'),
+                document,
+                count=1,
+            )
+            f.write(document)
+        f.write("</svg>\n")
+
+
+class TiledFigure:
+    """Tiles of one figure in one format, collected until all of them are rendered"""
+
+    def __init__(self, path, config, count, fmt):
+        self.path = path
+        self.config = config
+        self.fmt = fmt
+        self.tiles = [None] * count
+        self.waiting = count
+        width = CELL_SIZE[0] * config["columns"]
+        title = config["title"] if "title" in config and config["title"] else None
+        self.title = render_text(title, width, TITLE_HEIGHT, fmt)
+        self.label = render_text(xlabel(config), width, XLABEL_HEIGHT, fmt, "medium")
+
+    def add(self, position, tile):
+        """Store one tile, True when the figure was written"""
+        self.tiles[position] = tile
+        self.waiting -= 1
+        if self.waiting:
+            return False
+        compose = compose_svg if self.fmt == "svg" else compose_png
+        compose(self.path, self.config["rows"], self.config["columns"], self.title, self.tiles, self.label)
+        self.tiles = None
+        return True
+
+
+class RenderPool:
+    """
+    Renders figures in worker processes while the caller goes on extracting.
+    submit() returns at once unless JOBS_PER_WORKER tasks per worker are
+    pending already, close() waits for the rest.
+    """
+
+    def __init__(self, workers=None, tile_axes=TILE_AXES):
+        self.workers = workers or os.cpu_count() or 1
+        self.tile_axes = tile_axes
+        self.pool = ProcessPoolExecutor(max_workers=self.workers, initializer=use_agg)
+        self.pending = deque()
+        self.written = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def submit(self, subplots, config, path, formats=("png",)):
+        """Render the axes of a config to path.<format> for every format"""
+        if len(subplots) < self.tile_axes:
+            paths = [f"{path}.{fmt}" for fmt in formats]
+            self._add(self.pool.submit(render_figure, subplots, config, paths), None)
+            return
+
+        for fmt in formats:
+            figure = TiledFigure(f"{path}.{fmt}", config, len(subplots), fmt)
+            for position, subplot in enumerate(subplots):
+                self._add(self.pool.submit(render_tile, subplot, fmt), (figure, position))
+
+    def _add(self, future, tile):
+        self.pending.append((future, tile))
+        while len(self.pending) >= self.workers * JOBS_PER_WORKER:
+            self._collect()
+
+    def _collect(self):
+        future, tile = self.pending.popleft()
+        result = future.result()
+        if tile is None:
+            self.written.extend(result)
+            return
+        figure, position = tile
+        if figure.add(position, result):
+            self.written.append(figure.path)
+
+    def close(self):
+        """Wait for all figures, returns the paths written"""
+        while self.pending:
+            self._collect()
+        self.pool.shutdown()
+        return self.written
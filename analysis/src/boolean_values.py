@@ -1,18 +1,21 @@
 print("SCRIPT STARTED", flush=True)
 
-import json
 import csv
 import os
 import sys
+import argparse
 from pathlib import Path
 from datetime import datetime
 
-import matplotlib.pyplot as plt
+import field_access
+import instrumentation
+import json_backend
+import jsonl_reader
+import plot_backend
+import timestamps
 
-try:
-    from dateutil.parser import isoparse  # type: ignore
-except Exception:
-    isoparse = None
+#jsonl_index and series import NumPy, they are imported by the steps that use
+#them so --help and argument errors stay fast
 
 #Default Values
 DATA_PATH = "../data/"
@@ -24,118 +27,160 @@ ON_CHANGE = False
 TS_FIELD = "timestamp"
 TYPE_FIELD = "messageContentType"
 
+#The timestamp format is detected once per process, isoparse is only the fallback
+tsParser = timestamps.TimestampParser()
+
 def parse_ts(s: str) -> datetime:
     # Robust für ISO 8601 inkl. +01:00
-    if isoparse is not None:
-        return isoparse(s)
-    return datetime.fromisoformat(s)
+    return tsParser(s)
+
+#Decode one byte range of the source file (runs in a worker process).
+#onChangeOnly needs the previous value in file order, so it is applied in main()
+def extract_chunk(path, start, end, encoding, field, messageContentType, lines=None):
+    import series
+
+    points = series.Series()
+
+    total = 0
+    matched = 0
+    missing = 0
+    
+    #Lines without the wanted type are skipped before they are decoded
+    tokens = jsonl_reader.type_tokens([messageContentType])
+    
+    for line in jsonl_reader.iter_lines(path, start, end, encoding, lines):
+        total += 1
+        if not jsonl_reader.contains_any(line, tokens):
+            continue
+
+        obj = jsonl_reader.loads(line)
+        if not isinstance(obj, dict):
+            continue
+
+        if obj.get(TYPE_FIELD) != messageContentType:
+            continue
+
+        matched += 1
 
-def main(sourceFile, booleanFieldPath, messageContentType, onChangeOnly) -> None:
-    xs = []
-    ys = []
+        ts_raw = obj.get(TS_FIELD)
+        y_val = field.get(obj)
+        if ts_raw is None or y_val is None:
+            missing += 1
+            continue
+        
+        try:
+            points.append(parse_ts(str(ts_raw)), y_val)
+        except Exception:
+            missing += 1
+            continue
+
+        if matched % 50_000 == 0:
+            print(f"Matched {matched:,} records (total read {total:,})...", flush=True)
+
+    return total, matched, missing, points
+
+def main(sourceFile, booleanFieldPath, messageContentType, onChangeOnly, workers=None, index=False, output=None) -> None:
+    import jsonl_index
+    import series
+
+    parts = []
 
     total = 0
     matched = 0
     missing = 0
     
-    previous = None
     pathList = booleanFieldPath.split(".")
     boolVar = pathList[-1]
     
-    with open(DATA_PATH + sourceFile, "r", encoding="utf-8-sig") as f:
-        for line in f:
-            line = line.strip()
-            if not line:
-                continue
-
-            total += 1
-            obj = json.loads(line)
-            if not isinstance(obj, dict):
-                continue
-
-            if obj.get(TYPE_FIELD) != messageContentType:
-                continue
-
-            matched += 1
-
-            ts_raw = obj.get(TS_FIELD)
-            y_val = obj
-            for index in pathList:
-                y_val = y_val.get(index) if isinstance(y_val, dict) else None
-                #print(y_val)
-            if ts_raw is None or y_val is None:
-                missing += 1
-                continue
-
-            if onChangeOnly and previous is not None and previous == y_val:
-                continue
-            
-            try:
-                previous = y_val
-                xs.append(parse_ts(str(ts_raw)))
-                ys.append(bool(y_val))
-            except Exception:
-                missing += 1
-                continue
-
-            if matched % 50_000 == 0:
-                print(f"Matched {matched:,} records (total read {total:,})...", flush=True)
+    #With the type index only the lines of messageContentType are read
+    lines = None
+    if index and not jsonl_reader.seekable(DATA_PATH + sourceFile):
+        print(f"The type index needs an uncompressed file, reading {sourceFile} without index")
+    elif index:
+        typeIndex = jsonl_index.open_type_index(DATA_PATH + sourceFile, workers)
+        lines = jsonl_index.select_lines(typeIndex, [messageContentType])
+        print(f"Type index selected {len(lines[0]):,} of {typeIndex['lines']:,} lines")
+    
+    scan = instrumentation.begin("scan", bytes=os.path.getsize(DATA_PATH + sourceFile) if lines is None else int(lines[1].sum()))
+    chunks = jsonl_reader.map_chunks(
+        extract_chunk, DATA_PATH + sourceFile, field_access.FieldPath(booleanFieldPath), messageContentType,
+        workers=workers, encoding="utf-8-sig", lines=lines, paths=[TYPE_FIELD, TS_FIELD, booleanFieldPath]
+    )
+    for chunk_total, chunk_matched, chunk_missing, chunk_points in chunks:
+        total += chunk_total
+        matched += chunk_matched
+        missing += chunk_missing
+        parts.append(chunk_points)
+    scan.records = total
+    scan.end()
+
+    # The chunks are joined in file order, onChangeOnly drops the points
+    # repeating the raw value of the point before them in the file
+    with instrumentation.stage("on_change") as stage:
+        points = series.Series.join(parts)
+        if onChangeOnly:
+            points = points.take(points.changes())
+        stage.records = len(points)
 
     print("\n=== Summary ===")
     print(f"Total lines read: {total:,}")
     print(f"Matched type:     {matched:,}")
-    print(f"Used for plot:    {len(xs):,}")
+    print(f"Used for plot:    {len(points):,}")
     print(f"Missing/invalid:  {missing:,}")
 
-    if not xs:
+    if not len(points):
         print("\nNo data points found to plot. Check field names and contentMessageType string.")
         return
 
-    # Sort by time
-    data = sorted(zip(xs, ys), key=lambda t: t[0])
-    xs_sorted, ys_sorted = zip(*data)
-
     csv_out =  DATA_PATH + sourceFile.split(".")[0] + "_" + boolVar + ".csv"
 
-    with open(csv_out, "w", newline="", encoding="utf-8") as f:
+    with instrumentation.stage("write", records=len(points)) as stage, open(csv_out, "w", newline="", encoding="utf-8") as f:
         writer = csv.writer(f)
         writer.writerow(["timestamp", boolVar])
 
-        for ts, y in zip(xs, ys):
-            writer.writerow([ts.isoformat(), y])
+        for ts, y in points.rows():
+            writer.writerow([ts.isoformat(), bool(y)])
+        stage.bytes = f.tell()
 
     print(f"CSV written to: {csv_out}")
     
-    #Plotten des Graphen
+    #Plotten des Graphen, plt.show() waits for the window to be closed and is not timed.
+    #With output the figure is saved with Agg instead, no window is opened
+    # Sort by time for the plot, the CSV keeps the file order
+    with instrumentation.stage("sort", records=len(points)):
+        points = points.sort()
+
+    render = instrumentation.begin("render", records=len(points))
+    plt = plot_backend.pyplot(agg=bool(output))
     plt.figure()
-    plt.step(xs_sorted, ys_sorted, where='post')
+    plt.step(points.x(), points.y().astype(bool), where='post')
     plt.yticks([0, 1], ['False', 'True'])
     plt.xlabel("timestamp")
     plt.ylabel(boolVar)
     plt.title(TARGET_TYPE)
     plt.gcf().autofmt_xdate()  # x-axis labels readable
+    if output:
+        plt.savefig(output)
+        plt.close()
+        render.end()
+        print(f"Plot written to: {output}")
+        return
+    render.end()
     plt.show()
 
 if __name__ == "__main__":
-    try:
-        sourceFile = sys.argv[1]
-    except IndexError:
-        sourceFile = SOURCE_FILE
-
-    try:
-        booleanFieldPath = sys.argv[2]
-    except IndexError:
-        booleanFieldPath = Y_PATH
-
-    try:
-        messageContentType = sys.argv[3]
-    except IndexError:
-        messageContentType = TARGET_TYPE
-
-    try:
-        onChangeOnly = sys.argv[4]
-    except IndexError:
-        onChangeOnly = ON_CHANGE
-
-    main(sourceFile, booleanFieldPath, messageContentType, bool(onChangeOnly))
-
+    parser = argparse.ArgumentParser(description="Plot a boolean telemetry field from a JSONL export")
+    parser.add_argument("sourceFile", nargs="?", default=SOURCE_FILE, help=f"Source file in {DATA_PATH}")
+    parser.add_argument("booleanFieldPath", nargs="?", default=Y_PATH, help="Dot separated path of the boolean field")
+    parser.add_argument("messageContentType", nargs="?", default=TARGET_TYPE, help="messageContentType of the records to plot")
+    parser.add_argument("onChangeOnly", nargs="?", default=ON_CHANGE, help="Only keep points where the value changes")
+    parser.add_argument("--workers", type=int, default=0, help="Number of decoding processes (default: one per CPU)")
+    parser.add_argument("--index", action="store_true", help="Read only the lines of messageContentType through a type index stored next to the source file")
+    parser.add_argument("--output", default=None, help="Save the plot to this file (.png, .svg, .pdf) instead of showing it")
+    parser.add_argument("--json-backend", default="auto", choices=json_backend.BACKENDS, help="JSON decoder: 'auto' uses orjson, then simdjson when installed, then the standard library")
+    instrumentation.add_arguments(parser)
+    args = parser.parse_args()
+    json_backend.select(args.json_backend)
+    instrumentation.start(args, "boolean_values")
+
+    main(args.sourceFile, args.booleanFieldPath, args.messageContentType, bool(args.onChangeOnly), args.workers, args.index, args.output)
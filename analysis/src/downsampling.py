@@ -0,0 +1,105 @@
+import numpy as np
+
+# ============================================================
+# PER-TRACE DOWNSAMPLING
+# ============================================================
+#
+# All functions take NumPy arrays of one trace (x as int64 nanoseconds or any
+# numeric axis, y without NaN) and return the sorted indices of the points to
+# keep, so the caller can select x, y and any hover text with the same index.
+# lttb and minmax never return more than max_points indices (at least one).
+
+
+def ends(n, max_points):
+    """The first and the last point, or only the first, for budgets too small to bucket"""
+    return np.array([0, n - 1][:max(1, max_points)] if n else [], dtype=np.int64)
+
+
+def lttb(x, y, max_points):
+    """
+    Largest-Triangle-Three-Buckets: keeps the first and last point and, per
+    bucket, the point forming the largest triangle with the previously kept
+    point and the average of the next bucket. Preserves the visual shape,
+    including peaks and spikes.
+    """
+    n = len(y)
+    if max_points >= n:
+        return np.arange(n)
+    if max_points < 3:
+        return ends(n, max_points)
+
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+
+    # max_points - 2 buckets between the first and the last point
+    edges = np.linspace(1, n - 1, max_points - 1).astype(np.int64)
+    kept = np.empty(max_points, dtype=np.int64)
+    kept[0] = 0
+    kept[-1] = n - 1
+
+    a = 0
+    for i in range(max_points - 2):
+        start, end = edges[i], edges[i + 1]
+        next_start = end
+        next_end = edges[i + 2] if i + 2 < len(edges) else n
+        avg_x = x[next_start:next_end].mean()
+        avg_y = y[next_start:next_end].mean()
+
+        area = np.abs(
+            (x[a] - avg_x) * (y[start:end] - y[a])
+            - (x[a] - x[start:end]) * (avg_y - y[a])
+        )
+        a = start + int(area.argmax())
+        kept[i + 1] = a
+
+    return kept
+
+
+def minmax(x, y, max_points):
+    """
+    Min/max buckets: keeps the minimum and maximum of every bucket plus the
+    first and last point, so no extreme value is lost.
+    """
+    n = len(y)
+    if max_points >= n:
+        return np.arange(n)
+    if max_points < 4:
+        return ends(n, max_points)
+
+    y = np.asarray(y, dtype=np.float64)
+    buckets = (max_points - 2) // 2
+    edges = np.linspace(0, n, buckets + 1).astype(np.int64)
+
+    kept = [np.array([0, n - 1])]
+    for start, end in zip(edges[:-1], edges[1:]):
+        if end > start:
+            window = y[start:end]
+            kept.append(np.array([start + window.argmin(), start + window.argmax()]))
+
+    return np.unique(np.concatenate(kept))
+
+
+def state_edges(values):
+    """
+    Exact edges of a state trace: the first and last point and both points
+    around every change of value.
+    """
+    values = np.asarray(values)
+    n = len(values)
+    if n <= 2:
+        return np.arange(n)
+
+    changed = np.zeros(n, dtype=bool)
+    changed[1:] = values[1:] != values[:-1]
+
+    keep = changed.copy()
+    keep[:-1] |= changed[1:]
+    keep[0] = True
+    keep[-1] = True
+    return np.flatnonzero(keep)
+
+
+ALGORITHMS = {
+    "lttb": lttb,
+    "minmax": minmax,
+}
@@ -0,0 +1,86 @@
+# ============================================================
+# COMPILED FIELD PATHS
+# ============================================================
+#
+# Dot paths like "message.ExpirationTime.Nanos" are split once into a key
+# tuple instead of once per record, and looked up with plain indexing. A
+# missing key or a non-object on the way gives None, like walking the path
+# with isinstance(value, dict) checks.
+#
+# A failed get() costs a raised KeyError, several times a hit. FieldSearch
+# learns per message type which location holds a field and reads it with
+# get(), the locations ranked above it are only probed with find(), which
+# stops at the first missing key without raising. Every record is still
+# searched in priority order.
+
+
+class FieldPath:
+    """A dot separated path into a decoded JSON record"""
+
+    __slots__ = ("path", "keys", "name")
+
+    def __init__(self, path):
+        self.path = path
+        self.keys = tuple(path.split("."))
+        self.name = self.keys[-1]
+
+    def get(self, obj):
+        """Value at the path, None when it is missing"""
+        try:
+            for key in self.keys:
+                obj = obj[key]
+        except (KeyError, TypeError):
+            # TypeError: None, a list or a string on the way
+            return None
+        return obj
+
+    def find(self, obj):
+        """Same as get(), cheaper when the path is usually missing"""
+        for key in self.keys:
+            if not isinstance(obj, dict):
+                return None
+            obj = obj.get(key)
+        return obj
+
+    def __repr__(self):
+        return f"FieldPath({self.path!r})"
+
+
+class FieldSearch:
+    """
+    A field name searched under several locations in priority order, the
+    first one holding a value wins. Records of one message type share their
+    layout, so the location that resolved is remembered per type: the ones
+    ranked above it are probed, from it on they are read.
+    """
+
+    __slots__ = ("name", "candidates", "learned")
+
+    def __init__(self, name, locations):
+        self.name = name
+        self.candidates = [FieldPath(f"{location}.{name}") for location in locations]
+        self.learned = {}
+
+    def get(self, message_type, lookup, probe=None):
+        """
+        Value of the field for one record, lookup(field_path) reads one
+        candidate, probe(field_path) does the same for candidates that are
+        usually missing (lookup when not given).
+        """
+        if not isinstance(message_type, str):
+            message_type = None  # null or object types share one entry
+        learned = self.learned.get(message_type, 0)
+        if learned:
+            probe = probe or lookup
+            for candidate in self.candidates[:learned]:
+                value = probe(candidate)
+                if value is not None:
+                    return value
+
+        for index in range(learned, len(self.candidates)):
+            value = lookup(self.candidates[index])
+            if value is not None:
+                if index > learned:
+                    self.learned[message_type] = index
+                return value
+        return None
@@ -4,16 +4,21 @@ import json
 import csv
 import os
 import sys
-import threading
+import argparse
 from pathlib import Path
 from datetime import datetime
 
-import matplotlib.pyplot as plt
+import field_access
+import instrumentation
+import json_backend
+import jsonl_reader
+import live_dashboard
+import plot_backend
+import timestamps
 
-try:
-    from dateutil.parser import isoparse  # type: ignore
-except Exception:
-    isoparse = None
+#batch_render, jsonl_index, series and telemetry_cache import NumPy, they are
+#imported by the steps that use them so --help and argument errors stay fast.
+#live_dashboard only provides the defaults of the --live options until it runs
 
 #Default Values
 DATA_PATH = "../data/"
@@ -38,124 +43,276 @@ class PlotData:
         self.sourceFile = axis["sourceFile"]
         self.messageContentType = axis["messageContentType"]
         self.csvFileName = axis["csvFileName"].split(".")[0] if "csvFileName" in axis and axis["csvFileName"] else None
+        self.csvDir = None #Directory of the CSV file, DATA_PATH when None
         self.data = {"x": [], "y": []}
 
+#The timestamp format is detected once per process, isoparse is only the fallback
+tsParser = timestamps.TimestampParser()
+
 def parse_ts(s: str) -> datetime:
-    if isoparse is not None:
-        return isoparse(s)
-    return datetime.fromisoformat(s)
+    return tsParser(s)
 
-def main(config) -> None:
+def main(config, workers=None, cache=False, index=False, output=None) -> None:
     subplots = load_and_validate_config(config)
+    extract(subplots, workers, cache, index)
+    plot(subplots, config, output)
+
+#Fill the data of all axes, every source file is read once and its chunks are
+#decoded in parallel processes
+def extract(subplots, workers=None, cache=False, index=False):
+    import telemetry_cache
+
+    if cache and not telemetry_cache.available():
+        print("pyarrow is not installed, reading the JSONL files without cache")
+        cache = False
     
-    
-    threads = []
-    
+    for sourceFile, fields in plan_scans(subplots).items():
+        scan_file(sourceFile, fields, workers, cache, index)
+
+#Extract the fields of one source file from the file or from its cache
+def scan_file(sourceFile, fields, workers=None, cache=False, index=False):
+    if cache:
+        scan_cached(sourceFile, fields, workers)
+    else:
+        scan_source(sourceFile, fields, workers, index)
+
+#Group the axes by source file so each file is scanned once for all of its axes.
+#Axes with the same messageContentType and fieldPath share one ScanField, also
+#when they come from different configs
+def plan_scans(subplots):
+    plan = {}
     for subplot in subplots:
-        t = threading.Thread(target=extract_data, args=(subplot,))
-        threads.append(t)
+        fields = plan.setdefault(subplot.sourceFile, {})
+        fields.setdefault((subplot.messageContentType, subplot.fieldPath), []).append(subplot)
+    return {sourceFile: [ScanField(fieldSubplots) for fieldSubplots in fields.values()] for sourceFile, fields in plan.items()}
 
-    for t in threads:
-        t.start()
+#One field read from a source file for all axes plotting it. The scan keeps the
+#points of the widest datetimeFrom/datetimeTo window of the axes, each axis
+#slices its own window out of them in finish_field()
+class ScanField:
+    def __init__(self, subplots):
+        self.subplots = subplots
+        self.index = subplots[0].index
+        self.fieldPath = subplots[0].fieldPath
+        self.messageContentType = subplots[0].messageContentType
+        
+        #An axis without a limit needs the field without that limit
+        starts = [subplot.datetimeFrom for subplot in subplots]
+        ends = [subplot.datetimeTo for subplot in subplots]
+        self.datetimeFrom = None if None in starts else min(starts, key=timestamps.datetime_ns)
+        self.datetimeTo = None if None in ends else max(ends, key=timestamps.datetime_ns)
+
+#Collects the data points of one field from the records of a shared scan.
+#The time windows and onChangeOnly are applied in finish_field() to the sorted
+#arrays of the joined chunk results, so onChangeOnly compares points that follow
+#each other in time, also when the file is not in time order.
+class AxisExtractor:
+    def __init__(self, field):
+        import series
+
+        self.scanField = field
+        self.field = field_access.FieldPath(field.fieldPath)
+        self.points = series.Series()
+        self.matched = 0
+        self.missing = 0
+
+    def feed(self, obj, total):
+        self.feed_value(obj.get(TS_FIELD), self.field.get(obj), total)
 
-    for t in threads:
-        t.join()
+    def feed_value(self, ts_raw, y_val, total):
+        scanField = self.scanField
+        self.matched += 1
+            
+        if ts_raw is None or y_val is None:
+            self.missing += 1
+            return
         
-    plot(subplots, config)
+        self.points.append(parse_ts(str(ts_raw)), y_val)
 
-#Extract the data from source file     
-def extract_data(subplot):
-    xs = []
-    ys = []
-    
-    total = 0
-    matched = 0
-    missing = 0
-    
-    previous = None
-    pathList = subplot.fieldPath.split(".")
+        if self.matched % 50_000 == 0:
+            print(f"[{scanField.index}]Matched {self.matched:,} records (total read {total:,})...", flush=True)
+
+    #Compact per-chunk result sent back from the worker process, only the points
+    #inside the window of the field are sent
+    def result(self):
+        points = self.points
+        if self.scanField.datetimeFrom or self.scanField.datetimeTo:
+            points = points.take(points.between(self.scanField.datetimeFrom, self.scanField.datetimeTo))
+        return self.matched, self.missing, points
+
+#Join the AxisExtractor.result() chunks of a field, sort them once and fan the
+#points out to the axes of the field
+def finish_field(field, results, total):
+    import series
+
+    matched = sum(chunk_matched for chunk_matched, _, _ in results)
+    missing = sum(chunk_missing for _, chunk_missing, _ in results)
+
+    with instrumentation.stage("sort") as stage:
+        points = series.Series.join([chunk_points for _, _, chunk_points in results]).sort()
+        stage.records = len(points)
     
-    print(f"[{subplot.index}]Extracting {pathList[-1]} Data from {subplot.sourceFile}")
-    with open(DATA_PATH + subplot.sourceFile, "r", encoding="utf-8-sig") as f:
-        for line in f:
-            line = line.strip()
-            if not line:
-                continue
-
-            total += 1
-            obj = json.loads(line)
-            if not isinstance(obj, dict):
-                continue
-
-            if obj.get(TYPE_FIELD) != subplot.messageContentType:
-                continue
-
-            matched += 1
-
-            ts_raw = obj.get(TS_FIELD)
-            y_val = obj
-            for index in pathList:
-                y_val = y_val.get(index) if isinstance(y_val, dict) else None
-                
-            if ts_raw is None or y_val is None:
-                missing += 1
-                continue
-
-            if subplot.onChangeOnly and previous is not None and previous == y_val:
-                continue
-            
-            dt = parse_ts(str(ts_raw))
-            
-            if subplot.datetimeFrom and dt < subplot.datetimeFrom:
-                continue
-                
-            if subplot.datetimeTo and dt > subplot.datetimeTo:
-                continue
-            
-            try:
-                previous = y_val
-                xs.append(dt)
-                ys.append(y_val)
-            except Exception:
-                missing += 1
-                continue
+    for subplot in field.subplots:
+        finish_axis(subplot, points, matched, missing, total)
 
-            if matched % 50_000 == 0:
-                print(f"[{subplot.index}]Matched {matched:,} records (total read {total:,})...", flush=True)
+def finish_axis(subplot, points, matched, missing, total):
+    #The window is a slice of the sorted points, onChangeOnly a mask on it
+    with instrumentation.stage("on_change", records=len(points)):
+        points = points.window(subplot.datetimeFrom, subplot.datetimeTo)
+        if subplot.onChangeOnly:
+            points = points.take(points.changes())
 
     print("\n=== Summary ===")
     print(f"[{subplot.index}]Total lines read: {total:,}")
     print(f"[{subplot.index}]Matched type:     {matched:,}")
-    print(f"[{subplot.index}]Used for plot:    {len(xs):,}")
+    print(f"[{subplot.index}]Used for plot:    {len(points):,}")
     print(f"[{subplot.index}]Missing/invalid:  {missing:,}")
 
-    if not xs:
-        print("\n[{subplot.index}]No data points found to plot. Check field names and contentMessageType string.")
+    if not len(points):
+        print(f"\n[{subplot.index}]No data points found to plot. Check field names and contentMessageType string.")
         return
 
-    data = sorted(zip(xs, ys), key=lambda t: t[0])
-    xs_sorted, ys_sorted = zip(*data)
-
-    subplot.data["x"] = xs_sorted
-    subplot.data["y"] = ys_sorted
+    subplot.data["x"] = points.x()
+    subplot.data["y"] = points.y()
     
     if subplot.csvFileName:
-        header = ["timestamp", pathList[-1]]
-        write_to_csv(DATA_PATH + subplot.csvFileName + ".csv", data, header)
+        header = ["timestamp", subplot.fieldPath.split(".")[-1]]
+        write_to_csv((subplot.csvDir or DATA_PATH) + subplot.csvFileName + ".csv", points.rows(), header)
+
+#Decode one byte range of a source file for all fields reading it (runs in a worker process)
+def scan_chunk(path, start, end, encoding, fields, lines=None):
+    #Records are routed to the fields by messageContentType
+    extractors = [AxisExtractor(field) for field in fields]
+    routes = {}
+    for extractor in extractors:
+        routes.setdefault(extractor.scanField.messageContentType, []).append(extractor)
+    
+    #Lines without any of the wanted types are skipped before they are decoded
+    tokens = jsonl_reader.type_tokens(routes)
+    total = 0
+    
+    for line in jsonl_reader.iter_lines(path, start, end, encoding, lines):
+        total += 1
+        if not jsonl_reader.contains_any(line, tokens):
+            continue
+
+        obj = jsonl_reader.loads(line)
+        if not isinstance(obj, dict):
+            continue
+
+        targets = routes.get(obj.get(TYPE_FIELD))
+        if targets is None:
+            continue
+
+        for extractor in targets:
+            extractor.feed(obj, total)
+
+    return total, [extractor.result() for extractor in extractors]
+
+#Byte ranges of the source file that can hold records inside the datetimeFrom/datetimeTo
+#windows of the fields, None when a field without window needs the whole file
+def window_ranges(sourceFile, fields, workers=None):
+    import jsonl_index
+
+    windows = [(field.datetimeFrom, field.datetimeTo) for field in fields]
+    if any(start is None and end is None for start, end in windows):
+        return None
+    
+    index = jsonl_index.open_index(DATA_PATH + sourceFile, workers)
+    ranges = jsonl_index.window_ranges(index, windows)
+    print(f"Time index selected {len(ranges)} byte ranges ({sum(end - start for start, end in ranges):,} bytes)")
+    return ranges
+
+#Byte offsets and lengths of the lines of the field types inside the field windows
+def index_lines(sourceFile, fields, workers=None):
+    import jsonl_index
+
+    typeIndex = jsonl_index.open_type_index(DATA_PATH + sourceFile, workers)
+    lines = jsonl_index.select_lines(
+        typeIndex,
+        {field.messageContentType for field in fields},
+        window_ranges(sourceFile, fields, workers),
+    )
+    print(f"Type index selected {len(lines[0]):,} of {typeIndex['lines']:,} lines")
+    return lines
+
+#Extract the data of all fields reading the same source file in a single pass
+def scan_source(sourceFile, fields, workers=None, index=False):
+    for field in fields:
+        print(f"[{field.index}]Extracting {field.fieldPath.split('.')[-1]} Data from {sourceFile}")
+
+    #With the indexes only the lines of the wanted types inside the field windows are read
+    if index and not jsonl_reader.seekable(DATA_PATH + sourceFile):
+        print(f"The indexes need an uncompressed file, reading {sourceFile} without index")
+        index = False
+    lines = index_lines(sourceFile, fields, workers) if index else None
+
+    #Only the type, the timestamp and the field paths are decoded from each record
+    paths = [TYPE_FIELD, TS_FIELD] + [field.fieldPath for field in fields]
+    size = os.path.getsize(DATA_PATH + sourceFile) if lines is None else int(lines[1].sum())
+    with instrumentation.stage("scan", bytes=size) as stage:
+        chunks = list(jsonl_reader.map_chunks(
+            scan_chunk, DATA_PATH + sourceFile, fields, workers=workers, encoding="utf-8-sig", lines=lines, paths=paths
+        ))
+        total = stage.records = sum(chunk_total for chunk_total, _ in chunks)
+
+    for position, field in enumerate(fields):
+        finish_field(field, [results[position] for _, results in chunks], total)
+
+#Extract the data of all fields from the columnar cache of a source file, only
+#the columns of the configured field paths are loaded
+def scan_cached(sourceFile, fields, workers=None):
+    import telemetry_cache
+
+    with instrumentation.stage("scan") as stage:
+        manifest = telemetry_cache.open_cache(DATA_PATH + sourceFile, "utf-8-sig", workers)
+        columns = telemetry_cache.load_columns(
+            manifest,
+            [field.messageContentType for field in fields],
+            [field.fieldPath for field in fields],
+        )
+        total = stage.records = manifest["lines"]
+
+    for field in fields:
+        print(f"[{field.index}]Extracting {field.fieldPath.split('.')[-1]} Data from {sourceFile} (cached)")
+        extractor = AxisExtractor(field)
+        data = columns.get(field.messageContentType)
+        if data is not None:
+            with instrumentation.stage("extract", records=len(data[telemetry_cache.TS_COLUMN])):
+                for ts_raw, y_val in zip(data[telemetry_cache.TS_COLUMN], data[field.fieldPath]):
+                    extractor.feed_value(ts_raw, y_val, total)
+        finish_field(field, [extractor.result()], total)
+
+#Extract the data from source file     
+def extract_data(subplot, workers=None, index=False):
+    scan_source(subplot.sourceFile, [ScanField([subplot])], workers, index)
     
 def write_to_csv(filename, data, header):
-    with open(filename, "w", newline="", encoding="utf-8") as f:
+    with instrumentation.stage("write") as stage, open(filename, "w", newline="", encoding="utf-8") as f:
         writer = csv.writer(f)
         writer.writerow(header)
 
         for ts, y in data:
             writer.writerow([ts.isoformat(), y])
+            stage.records += 1
             
+        stage.bytes = f.tell()
         print(f"CSV written to: {filename}")
     
-#Plot the data based on config
-def plot(subplots, config):
+#Plot the data based on config, or save it to the output file without opening a window
+def plot(subplots, config, output=None):
+    import batch_render
+
     print("Plotting Data")
+    if output:
+        with instrumentation.stage("render", records=sum(len(subplot.data["x"]) for subplot in subplots)):
+            batch_render.render_figure(subplots, config, [output])
+        print(f"Plot written to: {output}")
+        return
+    
+    #Only building the figure is timed, plt.show() waits for the window to be closed
+    render = instrumentation.begin("render", records=sum(len(subplot.data["x"]) for subplot in subplots))
+    plt = plot_backend.pyplot()
     fig, axes = plt.subplots(config["rows"], config["columns"])
     if "title" in config and config["title"]:
         fig.suptitle(config["title"] )
@@ -173,18 +330,7 @@ def plot(subplots, config):
         else:
             axis = axes[row, col]
         
-        if subplot.datatype == "boolean":
-            axis.step('x', 'y', subplot.style, where='post', data=subplot.data)
-            axis.set_yticks([0, 1], ['False', 'True'])
-        elif subplot.plotType == "step":
-            axis.step('x', 'y', subplot.style, where='post', data=subplot.data)
-        else:
-            axis.plot('x', 'y', subplot.style, data=subplot.data)
-            
-        axis.set_ylabel(subplot.ylabel)
-        
-        if subplot.title:
-            axis.set_title(subplot.title)
+        batch_render.draw_axis(axis, subplot)
         
         index += 1
         col += 1
@@ -195,6 +341,7 @@ def plot(subplots, config):
     
     plt.xlabel(config["xlabel"] if "xlabel" in config and config["xlabel"] else "Timestamp")
     plt.gcf().autofmt_xdate()
+    render.end()
     plt.show()
 
 #Load config file
@@ -237,10 +384,30 @@ def load_and_validate_config(config):
     return plots
 
 if __name__ == "__main__":
-    try:
-        configFile = sys.argv[1]
-    except IndexError:
-        configFile = CONFIG_FILE
+    parser = argparse.ArgumentParser(description="Plot telemetry fields from JSONL exports as described by a config file")
+    parser.add_argument("configFile", nargs="?", default=CONFIG_FILE, help=f"Config file in {DATA_PATH} (default: {CONFIG_FILE})")
+    parser.add_argument("--workers", type=int, default=0, help="Number of decoding processes (default: one per CPU)")
+    parser.add_argument("--cache", action="store_true", help="Read the source files through a columnar cache stored next to them (needs pyarrow)")
+    parser.add_argument("--index", action="store_true", help="Read only the lines of the configured types inside the datetimeFrom/datetimeTo windows through indexes stored next to the source files")
+    parser.add_argument("--json-backend", default="auto", choices=json_backend.BACKENDS, help="JSON decoder: 'auto' uses orjson, then simdjson when installed, then the standard library")
+    parser.add_argument("--output", default=None, help="Save the plot to this file (.png, .svg, .pdf) instead of showing it")
+    parser.add_argument("--live", action="store_true", help="Follow the source files as they grow and redraw the plot continuously")
+    parser.add_argument("--source", default=None, help="With --live: read all axes from this file instead of their sourceFile, '-' reads standard input")
+    parser.add_argument("--from-start", action="store_true", help="With --live: plot the records already in the files too, not only new ones")
+    parser.add_argument("--window", type=float, default=live_dashboard.DEFAULT_WINDOW, help=f"With --live: seconds of data shown (default: {live_dashboard.DEFAULT_WINDOW})")
+    parser.add_argument("--fps", type=float, default=live_dashboard.DEFAULT_FPS, help=f"With --live: frames drawn per second (default: {live_dashboard.DEFAULT_FPS})")
+    parser.add_argument("--buffer", type=int, default=live_dashboard.DEFAULT_CAPACITY, help=f"With --live: points kept per axis (default: {live_dashboard.DEFAULT_CAPACITY:,})")
+    instrumentation.add_arguments(parser)
+    args = parser.parse_args()
+    json_backend.select(args.json_backend)
+    instrumentation.start(args, "generic_values")
     
-    main(configure(configFile))
-
+    if args.live:
+        config = configure(args.configFile)
+        source = args.source if args.source in (None, "-") else DATA_PATH + args.source
+        live_dashboard.run(
+            load_and_validate_config(config), config, DATA_PATH, source,
+            args.fps, args.window, args.buffer, args.from_start
+        )
+    else:
+        main(configure(args.configFile), args.workers, args.cache, args.index, args.output)
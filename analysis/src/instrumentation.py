@@ -0,0 +1,440 @@
+import atexit
+import json
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+try:
+    import resource
+except Exception:  # not available on Windows
+    resource = None
+
+# ============================================================
+# STAGE TIMING AND PROFILING
+# ============================================================
+#
+# The scripts wrap their steps in stage() blocks: scan is the whole pass over
+# the file, then building the DataFrame, timestamp parsing, sorting,
+# downsampling, statistics, CSV export and rendering in the main process.
+# other is the rest of the run.
+#
+# With --timings the chunks of the scan also split their time into read,
+# filter and decode at the timing points of jsonl_reader. The rest of a chunk
+# (building the records and parsing their timestamps) is extract. The workers
+# send these times back with the chunk result. Timing every line costs a few
+# percent, so it is only done when asked for. The chunk stages are busy time
+# summed over all processes, together they can exceed the wall time of the
+# scan.
+#
+# Every stage reports wall and CPU time, records and bytes per second and
+# peak RSS. --timings prints the table at exit, --timings-json writes it as
+# JSON, --profile writes a cProfile (pstats) or sampled flamegraph (collapsed
+# stacks) profile of the main process. The benchmarks collect the same stages
+# with open_session() and close_session().
+
+# Stages in report order, others are appended as they occur
+STAGES = (
+    "scan", "read", "filter", "decode", "extract", "frame",
+    "parse", "on_change", "sort", "downsample", "statistics", "write", "render", "other",
+)
+
+# Per-line stages timed in the chunk workers
+LINE_STAGES = ("read", "filter", "decode")
+
+# Sampling interval of --profile-format collapsed
+SAMPLE_INTERVAL = 0.005
+
+# Set by start()
+enabled = False
+session = None
+
+
+def peak_rss_mb():
+    """Peak resident memory of this process since the last reset_peak_rss()"""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    if resource is None:
+        return None
+    scale = 1024 * 1024 if sys.platform == "darwin" else 1024
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / scale
+
+
+def reset_peak_rss():
+    """Start a new peak RSS measurement, only supported on Linux"""
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+    except OSError:
+        pass
+
+
+def cpu_seconds():
+    """CPU time of this process and of its finished child processes"""
+    times = os.times()
+    return times.user + times.system + times.children_user + times.children_system
+
+
+class StageStats:
+    """Totals of one stage, merged from the main process and the chunk workers"""
+
+    __slots__ = ("wall", "cpu", "records", "bytes", "peak_rss_mb", "calls")
+
+    def __init__(self):
+        self.wall = 0.0
+        self.cpu = 0.0
+        self.records = 0
+        self.bytes = 0
+        self.peak_rss_mb = None
+        self.calls = 0
+
+    def add(self, wall=0.0, cpu=0.0, records=0, bytes=0, peak_rss_mb=None, calls=1):
+        self.wall += wall
+        self.cpu += cpu
+        self.records += records
+        self.bytes += bytes
+        self.calls += calls
+        if peak_rss_mb is not None:
+            self.peak_rss_mb = max(self.peak_rss_mb or 0, peak_rss_mb)
+
+    def summary(self):
+        return {
+            "wall_seconds": round(self.wall, 6),
+            "cpu_seconds": round(self.cpu, 6),
+            "records": self.records,
+            "bytes": self.bytes,
+            "records_per_second": round(self.records / self.wall, 1) if self.wall and self.records else None,
+            "bytes_per_second": round(self.bytes / self.wall, 1) if self.wall and self.bytes else None,
+            "peak_rss_mb": round(self.peak_rss_mb, 1) if self.peak_rss_mb is not None else None,
+            "calls": self.calls,
+        }
+
+
+class Session:
+    """Stage totals of one script run"""
+
+    def __init__(self, script, timings_json=None, profile=None, profile_format="pstats"):
+        self.script = script
+        self.timings_json = timings_json
+        self.profile = profile
+        self.profile_format = profile_format
+        self.stages = {}
+        self.started = time.perf_counter()
+        self.cpu_started = cpu_seconds()
+        self.profiler = None
+        # Peak RSS of the main process, each stage resets the kernel's counter
+        self.peak_rss_mb = 0.0
+        # Wall and CPU time of the main process stages, the rest of the run
+        # is other
+        self.staged_wall = 0.0
+        self.staged_cpu = 0.0
+
+    def stats(self, name):
+        stats = self.stages.get(name)
+        if stats is None:
+            stats = self.stages[name] = StageStats()
+        return stats
+
+    def ordered(self):
+        names = [name for name in STAGES if name in self.stages]
+        return names + [name for name in self.stages if name not in STAGES]
+
+    def summary(self):
+        wall = time.perf_counter() - self.started
+        cpu = cpu_seconds() - self.cpu_started
+        other = StageStats()
+        other.add(max(0.0, wall - self.staged_wall), max(0.0, cpu - self.staged_cpu))
+        stages = {name: self.stages[name].summary() for name in self.ordered()}
+        stages["other"] = other.summary()
+        return {
+            "script": self.script,
+            "argv": sys.argv[1:],
+            "wall_seconds": round(wall, 6),
+            "cpu_seconds": round(cpu, 6),
+            "peak_rss_mb": round(max(self.peak_rss_mb, peak_rss_mb() or 0), 1),
+            "stages": stages,
+        }
+
+    def report(self):
+        summary = self.summary()
+        print(f"\n=== Stage Timings ({summary['wall_seconds']:.3f}s wall, {summary['cpu_seconds']:.3f}s CPU) ===")
+        print(f"{'stage':<11} {'wall s':>9} {'cpu s':>9} {'records':>12} {'records/s':>12} {'MB/s':>9} {'peak MB':>9}")
+        for name, stage in summary["stages"].items():
+            rate = f"{stage['records_per_second']:,.0f}" if stage["records_per_second"] else "-"
+            throughput = f"{stage['bytes_per_second'] / 1024 ** 2:,.1f}" if stage["bytes_per_second"] else "-"
+            peak = f"{stage['peak_rss_mb']:,.0f}" if stage["peak_rss_mb"] is not None else "-"
+            print(
+                f"{name:<11} {stage['wall_seconds']:9.3f} {stage['cpu_seconds']:9.3f} "
+                f"{stage['records']:12,} {rate:>12} {throughput:>9} {peak:>9}"
+            )
+        if self.timings_json:
+            with open(self.timings_json, "w", encoding="utf-8") as f:
+                json.dump(summary, f, indent=2)
+            print(f"Timings written to {self.timings_json}")
+
+
+class Stage:
+    """
+    A running stage. The code inside it can set records and bytes once they
+    are known, end() adds it to the session.
+    """
+
+    __slots__ = ("name", "records", "bytes", "wall", "cpu")
+
+    def __init__(self, name, records=0, bytes=0):
+        self.name = name
+        self.records = records
+        self.bytes = bytes
+        self.wall = None
+        if session is None:
+            return
+        session.peak_rss_mb = max(session.peak_rss_mb, peak_rss_mb() or 0)
+        reset_peak_rss()
+        self.wall = time.perf_counter()
+        self.cpu = cpu_seconds()
+
+    def end(self):
+        if session is None or self.wall is None:
+            return
+        peak = peak_rss_mb()
+        wall = time.perf_counter() - self.wall
+        cpu = cpu_seconds() - self.cpu
+        session.stats(self.name).add(wall, cpu, self.records, self.bytes, peak)
+        session.staged_wall += wall
+        session.staged_cpu += cpu
+        session.peak_rss_mb = max(session.peak_rss_mb, peak or 0)
+        self.wall = None
+
+
+def begin(name, records=0, bytes=0):
+    """Start a stage that is ended with end(), for steps that are not one block"""
+    return Stage(name, records, bytes)
+
+
+@contextmanager
+def stage(name, records=0, bytes=0):
+    """Time a block as a stage of the run"""
+    running = Stage(name, records, bytes)
+    try:
+        yield running
+    finally:
+        running.end()
+
+
+def add_arguments(parser):
+    """Add the timing and profiling options to a script's argument parser"""
+    parser.add_argument("--timings", action="store_true", help="Print wall/CPU time, throughput and peak memory per stage at exit")
+    parser.add_argument("--timings-json", default=None, metavar="FILE", help="Write the stage timings as JSON to FILE (implies --timings)")
+    parser.add_argument("--profile", default=None, metavar="FILE", help="Write a profile of the main process to FILE")
+    parser.add_argument(
+        "--profile-format", default="pstats", choices=["pstats", "collapsed"],
+        help="pstats: cProfile output for pstats/snakeviz, collapsed: sampled stacks for flamegraph.pl/speedscope (default: pstats)",
+    )
+
+
+def start(args, script):
+    """Start timing and profiling as requested by the add_arguments() options, reported at exit"""
+    global enabled, session
+    timings = args.timings or args.timings_json is not None
+    if not timings and args.profile is None:
+        return
+
+    enabled = timings
+    session = Session(script, args.timings_json, args.profile, args.profile_format)
+    if args.profile is not None:
+        session.profiler = Profiler.create(args.profile_format)
+        session.profiler.start()
+    atexit.register(finish)
+
+
+def open_session(script):
+    """Start collecting the stage timings of a run without reporting them, see close_session()"""
+    global enabled, session
+    enabled = True
+    session = Session(script)
+
+
+def close_session():
+    """End the session of open_session() and return its summary"""
+    global enabled, session
+    summary = session.summary()
+    enabled = False
+    session = None
+    return summary
+
+
+def finish():
+    """Stop the profiler and report the stage timings, runs once at exit"""
+    global session
+    if session is None:
+        return
+    current, session = session, None
+
+    if current.profiler is not None:
+        current.profiler.stop(current.profile)
+        print(f"Profile written to {current.profile}")
+    if enabled:
+        current.report()
+
+
+# ============================================================
+# CHUNK WORKERS
+# ============================================================
+#
+# With --timings jsonl_reader.use_backend() turns on its line timing points:
+# iter_lines() adds to read, contains_any() to filter and loads() to decode.
+# They add to the line stage totals of their process, run_chunk() takes the
+# totals of one chunk and gives the rest of the chunk's time to extract.
+
+
+class LineStage:
+    """Time, calls and bytes of one per-line stage in this process"""
+
+    __slots__ = ("seconds", "calls", "bytes")
+
+    def __init__(self):
+        self.seconds = 0.0
+        self.calls = 0
+        self.bytes = 0
+
+
+line_stages = {name: LineStage() for name in LINE_STAGES}
+
+
+def timed(name, function):
+    """function with the time of its calls added to the line stage name"""
+    totals = line_stages[name]
+    perf_counter = time.perf_counter
+
+    def call(*args):
+        start = perf_counter()
+        try:
+            return function(*args)
+        finally:
+            totals.seconds += perf_counter() - start
+            totals.calls += 1
+
+    return call
+
+
+def timed_lines(lines):
+    """Iterate lines, adding the time spent reading them to the read stage"""
+    totals = line_stages["read"]
+    perf_counter = time.perf_counter
+    iterator = iter(lines)
+    while True:
+        start = perf_counter()
+        try:
+            line = next(iterator)
+        except StopIteration:
+            totals.seconds += perf_counter() - start
+            return
+        totals.seconds += perf_counter() - start
+        totals.calls += 1
+        totals.bytes += len(line) + 1
+        yield line
+
+
+def run_chunk(worker, path, start, end, encoding, *args, **kwargs):
+    """
+    Run a map_chunks worker and return (result, {stage: (wall, cpu, records,
+    bytes, peak RSS MB)}) with the line stages of the chunk, extract gets the
+    time of the chunk not spent in them.
+    """
+    for totals in line_stages.values():
+        totals.__init__()
+
+    wall = time.perf_counter()
+    cpu = time.process_time()
+    result = worker(path, start, end, encoding, *args, **kwargs)
+    wall = time.perf_counter() - wall
+    cpu = time.process_time() - cpu
+
+    peak = peak_rss_mb()
+    stages = {
+        name: (totals.seconds, totals.seconds, totals.calls, totals.bytes, peak)
+        for name, totals in line_stages.items()
+        if totals.calls
+    }
+    inner = sum(seconds for seconds, *_ in stages.values())
+    # Only the CPU time outside of the line stages is left for extract, they
+    # are mostly CPU bound
+    stages["extract"] = (max(0.0, wall - inner), max(0.0, cpu - inner), 0, 0, peak)
+    return result, stages
+
+
+def add_chunk(stages):
+    """Merge the stage times of one run_chunk() into the session"""
+    if session is None:
+        return
+    for name, (wall, cpu, records, bytes, peak) in stages.items():
+        session.stats(name).add(wall, cpu, records, bytes, peak, calls=0)
+
+
+# ============================================================
+# PROFILERS
+# ============================================================
+
+
+class Profiler:
+    @staticmethod
+    def create(profile_format):
+        return SamplingProfiler() if profile_format == "collapsed" else CProfiler()
+
+
+class CProfiler:
+    """Deterministic cProfile of the main process, written as pstats"""
+
+    def __init__(self):
+        import cProfile
+
+        self.profile = cProfile.Profile()
+
+    def start(self):
+        self.profile.enable()
+
+    def stop(self, path):
+        self.profile.disable()
+        self.profile.dump_stats(path)
+
+
+class SamplingProfiler:
+    """
+    Samples the main thread's stack every SAMPLE_INTERVAL seconds and writes
+    one "frame;frame;frame count" line per stack, the collapsed format of
+    flamegraph.pl and speedscope.
+    """
+
+    def __init__(self):
+        self.stacks = Counter()
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self.sample, daemon=True)
+        self.target = threading.main_thread().ident
+
+    def start(self):
+        self.thread.start()
+
+    def sample(self):
+        while not self.stopped.wait(SAMPLE_INTERVAL):
+            frame = sys._current_frames().get(self.target)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                frame = frame.f_back
+            if stack:
+                self.stacks[";".join(reversed(stack))] += 1
+
+    def stop(self, path):
+        self.stopped.set()
+        self.thread.join()
+        with open(path, "w", encoding="utf-8") as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{stack} {count}\n")
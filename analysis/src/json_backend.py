@@ -0,0 +1,170 @@
+import json
+
+try:
+    import orjson  # type: ignore
+except Exception:
+    orjson = None
+
+try:
+    import simdjson  # type: ignore
+except Exception:
+    simdjson = None
+
+# ============================================================
+# JSON DECODING BACKENDS
+# ============================================================
+#
+# stdlib    json.loads, always available
+# orjson    full decode, ~4x faster than json.loads on our exports
+# simdjson  on-demand: only the dot paths a script reads are copied out of
+#           the parsed document into a small dict with the same nesting.
+#           Every access goes through a proxy object, so this only beats
+#           orjson on records much larger than ours (~250 bytes)
+#
+# Every backend returns what json.loads would return for the parts a script
+# reads. Lines a fast backend rejects (NaN literals, invalid UTF-8, integers
+# beyond 64 bits for simdjson) are decoded again with json.loads. orjson
+# returns integers beyond 64 bits as floats, our exports have none.
+
+BACKENDS = ("auto", "stdlib", "orjson", "simdjson")
+
+# Backend requested on the command line, see select()
+preferred = "auto"
+
+
+def installed():
+    """Names of the backends that can be used"""
+    names = ["stdlib"]
+    if orjson is not None:
+        names.append("orjson")
+    if simdjson is not None:
+        names.append("simdjson")
+    return names
+
+
+def select(name):
+    """Set the backend of this run, a backend that is not installed falls back to the standard library"""
+    global preferred
+    if name != "auto" and name not in installed():
+        print(f"JSON backend {name} is not installed, using the standard library")
+        name = "stdlib"
+    preferred = name
+
+
+def resolve(name="auto"):
+    """
+    Backend used for a requested name, auto prefers orjson, then simdjson,
+    then the standard library.
+    """
+    if name == "auto":
+        if orjson is not None:
+            return "orjson"
+        if simdjson is not None:
+            return "simdjson"
+        return "stdlib"
+    if name not in installed():
+        return "stdlib"
+    return name
+
+
+def stdlib_loads(line):
+    """json.loads that tolerates invalid UTF-8 bytes like a text file opened with errors="ignore" """
+    try:
+        return json.loads(line)
+    except UnicodeDecodeError:
+        return json.loads(line.decode("utf-8", "ignore"))
+
+
+def make_decoder(name="auto", paths=None):
+    """
+    Return loads(line) for a backend. paths is the list of dot paths the
+    caller reads, None when it needs whole records.
+    """
+    name = resolve(name)
+
+    if name == "orjson":
+
+        def loads(line):
+            try:
+                return orjson.loads(line)
+            except orjson.JSONDecodeError:
+                return stdlib_loads(line)
+
+        return loads
+
+    if name == "simdjson":
+        if paths is None:
+
+            def loads(line):
+                try:
+                    return simdjson.loads(line)
+                except (ValueError, RuntimeError):
+                    return stdlib_loads(line)
+
+            return loads
+
+        return OnDemandDecoder(paths)
+
+    return stdlib_loads
+
+
+class OnDemandDecoder:
+    """
+    simdjson decoder that only materializes the requested dot paths. The
+    document proxies are released before the next line, so one parser is
+    reused for the whole run.
+    """
+
+    def __init__(self, paths):
+        self.parser = simdjson.Parser()
+        # Nested dict of the wanted keys, None marks a path whose whole value is copied
+        self.tree = {}
+        for path in sorted(paths, key=lambda path: path.count(".")):
+            node = self.tree
+            *parents, leaf = path.split(".")
+            for key in parents:
+                node = node.setdefault(key, {})
+                if node is None:
+                    break  # a shorter path already copies the whole value
+            else:
+                node[leaf] = None
+
+    def __call__(self, line):
+        if isinstance(line, str):
+            line = line.encode("utf-8")
+        try:
+            document = self.parser.parse(line)
+        except (ValueError, RuntimeError):
+            return stdlib_loads(line)
+
+        try:
+            if isinstance(document, simdjson.Object):
+                return pick(document, self.tree)
+            return plain(document)
+        finally:
+            del document
+
+
+def pick(obj, tree):
+    """Copy the keys of tree out of a simdjson object"""
+    result = {}
+    # Iterating the keys is much cheaper than looking up missing ones
+    for key in obj.keys():
+        node = tree.get(key, False)
+        if node is False:
+            continue
+        value = obj[key]
+        if node is None:
+            result[key] = plain(value)
+        elif isinstance(value, simdjson.Object):
+            result[key] = pick(value, node)
+    return result
+
+
+def plain(value):
+    """Python value of a simdjson proxy, scalars are returned as they are"""
+    if isinstance(value, simdjson.Object):
+        return value.as_dict()
+    if isinstance(value, simdjson.Array):
+        return value.as_list()
+    return value
@@ -0,0 +1,314 @@
+import json
+import os
+from array import array
+from datetime import datetime
+
+import numpy as np
+
+import jsonl_reader
+import timestamps
+
+# ============================================================
+# SIDECAR INDEXES OF JSONL EXPORTS
+# ============================================================
+#
+# Both indexes are built in one pass over the export and rebuilt when its size
+# or modification time changes.
+#
+# <export>.jsonl.tsidx holds one entry per block of BLOCK_LINES lines:
+#     [start byte, end byte, min timestamp, max timestamp]
+# with the timestamps as UTC nanoseconds (null when no line of the block has
+# one). A time window only needs the blocks whose [min, max] overlaps it, so a
+# narrow window in a day-long export reads a few blocks. Files that are only
+# roughly time ordered still work, their blocks just overlap more windows.
+#
+# <export>.jsonl.typeidx (NumPy .npz) holds per messageContentType the byte
+# offset and length of every line of that type, plus its timestamp as UTC
+# nanoseconds and UTC offset in minutes. Extractors read only the lines of the
+# types they need and record counts need no decoding at all. The types are
+# keyed like analyze_message_types counts them, see type_key().
+
+TS_INDEX_SUFFIX = ".tsidx"
+TYPE_INDEX_SUFFIX = ".typeidx"
+INDEX_VERSION = 3
+
+TS_FIELD = "timestamp"
+TYPE_FIELD = "messageContentType"
+
+# Type of the records without a messageContentType field
+UNTYPED = "UNKNOWN"
+
+# Lines per index block, smaller blocks skip more precisely but make the index larger
+BLOCK_LINES = 4096
+
+# Adjacent selected blocks are merged into ranges of at most this size so the
+# workers still get several ranges to decode in parallel
+MAX_RANGE_SIZE = jsonl_reader.MIN_CHUNK_SIZE
+
+# Type index entries of lines without a parseable timestamp / without UTC offset
+NO_TIMESTAMP = np.iinfo(np.int64).min
+NO_OFFSET = np.iinfo(np.int16).min
+
+parse_ts = timestamps.TimestampParser()
+
+
+def parse_timestamp(value):
+    """datetime of an ISO-8601 timestamp, None if invalid"""
+    if value is None or isinstance(value, datetime):
+        return value
+    try:
+        return parse_ts(str(value))
+    except ValueError:
+        return None
+
+
+def ts_ns(value):
+    """UTC nanoseconds of an ISO-8601 timestamp or datetime, naive values are taken as UTC"""
+    value = parse_timestamp(value)
+    if value is None:
+        return None
+    return timestamps.datetime_ns(value)
+
+
+def type_key(obj):
+    """
+    messageContentType of a decoded record, UNTYPED when the field is missing.
+    null and "" stay types of their own, lists and objects become JSON text.
+    """
+    message_type = obj.get(TYPE_FIELD, UNTYPED)
+    if message_type is not None and not isinstance(message_type, str):
+        message_type = json.dumps(message_type)
+    return message_type
+
+
+def file_key(path):
+    """Size and modification time the indexes were built for"""
+    stat = os.stat(path)
+    return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "version": INDEX_VERSION}
+
+
+def index_chunk(path, start, end, encoding):
+    """Time blocks and per-line type entries of one byte range (runs in a worker process)"""
+    blocks = []
+    block = None
+
+    lines = 0
+    types = {}
+    offsets = array("Q")
+    lengths = array("I")
+    type_ids = array("i")
+    line_ns = array("q")
+    utc_offsets = array("h")
+
+    for offset, length, line in jsonl_reader.iter_offsets(path, start, end):
+        lines += 1
+        if block is None:
+            block = [offset, end, None, None, 0]
+        elif block[4] == BLOCK_LINES:
+            block[1] = offset
+            blocks.append(block)
+            block = [offset, end, None, None, 0]
+        block[4] += 1
+
+        try:
+            obj = jsonl_reader.loads(line)
+        except ValueError:
+            continue
+        if not isinstance(obj, dict):
+            continue
+
+        raw = obj.get(TS_FIELD)
+        dt = parse_timestamp(raw) if raw else None
+        ns = NO_TIMESTAMP
+        minutes = NO_OFFSET
+        if dt is not None:
+            ns = ts_ns(dt)
+            if dt.tzinfo is not None:
+                minutes = int(dt.utcoffset().total_seconds() // 60)
+            if block[2] is None or ns < block[2]:
+                block[2] = ns
+            if block[3] is None or ns > block[3]:
+                block[3] = ns
+
+        offsets.append(offset)
+        lengths.append(length)
+        type_ids.append(types.setdefault(type_key(obj), len(types)))
+        line_ns.append(ns)
+        utc_offsets.append(minutes)
+
+    if block is not None:
+        blocks.append(block)
+
+    return {
+        "blocks": [b[:4] for b in blocks],
+        "lines": lines,
+        "types": list(types),
+        "offsets": offsets,
+        "lengths": lengths,
+        "type_ids": type_ids,
+        "timestamps": line_ns,
+        "utc_offsets": utc_offsets,
+    }
+
+
+def build_indexes(path, workers=None):
+    """Build the time index and the type index of path in one pass"""
+    print(f"Building indexes {path}{TS_INDEX_SUFFIX} and {path}{TYPE_INDEX_SUFFIX}")
+    key = file_key(path)
+
+    blocks = []
+    lines = 0
+    types = {}
+    parts = {name: [] for name in ("offsets", "lengths", "type_ids", "timestamps", "utc_offsets")}
+
+    for chunk in jsonl_reader.map_chunks(
+        index_chunk, path, workers=workers, paths=[TYPE_FIELD, TS_FIELD]
+    ):
+        blocks.extend(chunk["blocks"])
+        lines += chunk["lines"]
+
+        # Chunk local type ids -> ids over the whole file
+        ids = np.array(
+            [types.setdefault(message_type, len(types)) for message_type in chunk["types"]],
+            dtype=np.int32,
+        )
+        local = np.frombuffer(chunk["type_ids"], dtype=np.int32)
+        parts["type_ids"].append(ids[local])
+        for name, dtype in (("offsets", np.uint64), ("lengths", np.uint32),
+                            ("timestamps", np.int64), ("utc_offsets", np.int16)):
+            parts[name].append(np.frombuffer(chunk[name], dtype=dtype))
+
+    columns = {
+        name: np.concatenate(values) if values else np.array([], dtype=np.int64)
+        for name, values in parts.items()
+    }
+
+    # Group the lines by type, a stable sort keeps every type in file order
+    order = np.argsort(columns["type_ids"], kind="stable")
+    counts = np.bincount(columns["type_ids"], minlength=len(types))
+    arrays = {}
+    start = 0
+    for type_id, count in enumerate(counts):
+        rows = order[start:start + count]
+        start += count
+        arrays[f"offsets{type_id}"] = columns["offsets"][rows]
+        arrays[f"lengths{type_id}"] = columns["lengths"][rows]
+        arrays[f"timestamps{type_id}"] = columns["timestamps"][rows]
+        arrays[f"utc_offsets{type_id}"] = columns["utc_offsets"][rows]
+
+    meta = {
+        "file": key,
+        "lines": lines,
+        "records": int(len(columns["type_ids"])),
+        "types": [{"messageContentType": t, "rows": int(c)} for t, c in zip(types, counts)],
+    }
+    _write(path + TYPE_INDEX_SUFFIX, lambda f: np.savez(f, meta=np.array(json.dumps(meta)), **arrays))
+    _write(
+        path + TS_INDEX_SUFFIX,
+        lambda f: f.write(json.dumps({"file": key, "blockLines": BLOCK_LINES, "blocks": blocks},
+                                     separators=(",", ":")).encode("utf-8")),
+    )
+
+
+def _write(target, write):
+    """Write a sidecar file through a temporary file so readers never see half of it"""
+    tmp_file = target + ".tmp"
+    with open(tmp_file, "wb") as f:
+        write(f)
+    os.replace(tmp_file, target)
+
+
+def open_index(path, workers=None):
+    """
+    Return the time index of path, building the indexes first if there are
+    none for the current size and modification time of the file.
+    """
+    index_file = path + TS_INDEX_SUFFIX
+    if os.path.exists(index_file):
+        with open(index_file, "r", encoding="utf-8") as f:
+            index = json.load(f)
+        if index.get("file") == file_key(path):
+            return index
+
+    build_indexes(path, workers)
+    with open(index_file, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def open_type_index(path, workers=None):
+    """
+    Return the type index of path as a dict with lines, records and
+    types: {messageContentType: {offsets, lengths, timestamps, utc_offsets}}.
+    """
+    index_file = path + TYPE_INDEX_SUFFIX
+    index = _load_type_index(index_file) if os.path.exists(index_file) else None
+    if index is None or index["file"] != file_key(path):
+        build_indexes(path, workers)
+        index = _load_type_index(index_file)
+    return index
+
+
+def _load_type_index(index_file):
+    with np.load(index_file, allow_pickle=False) as data:
+        meta = json.loads(str(data["meta"]))
+        meta["types"] = {
+            entry["messageContentType"]: {
+                name: data[f"{name}{type_id}"]
+                for name in ("offsets", "lengths", "timestamps", "utc_offsets")
+            }
+            for type_id, entry in enumerate(meta["types"])
+        }
+    return meta
+
+
+def window_ranges(index, windows):
+    """
+    Byte ranges holding every line that can fall into one of the windows.
+    windows is a list of (from, to) datetimes, None for an open end.
+    """
+    bounds = [
+        (ts_ns(start) if start else None, ts_ns(end) if end else None)
+        for start, end in windows
+    ]
+
+    ranges = []
+    for start, end, low, high in index["blocks"]:
+        if low is not None:
+            overlaps = any(
+                (start_ns is None or high >= start_ns) and (end_ns is None or low <= end_ns)
+                for start_ns, end_ns in bounds
+            )
+            if not overlaps:
+                continue
+
+        if ranges and ranges[-1][1] == start and end - ranges[-1][0] <= MAX_RANGE_SIZE:
+            ranges[-1] = (ranges[-1][0], end)
+        else:
+            ranges.append((start, end))
+    return ranges
+
+
+def select_lines(type_index, message_types, ranges=None):
+    """
+    (offsets, lengths) in file order of the lines of the given message types,
+    optionally only those starting inside the byte ranges.
+    """
+    entries = [type_index["types"][t] for t in message_types if t in type_index["types"]]
+    if not entries:
+        return np.array([], dtype=np.uint64), np.array([], dtype=np.uint32)
+
+    offsets = np.concatenate([entry["offsets"] for entry in entries])
+    lengths = np.concatenate([entry["lengths"] for entry in entries])
+    order = np.argsort(offsets, kind="stable")
+    offsets = offsets[order]
+    lengths = lengths[order]
+
+    if ranges is not None:
+        starts = np.array([start for start, _ in ranges], dtype=np.uint64)
+        ends = np.array([end for _, end in ranges], dtype=np.uint64)
+        slot = np.searchsorted(starts, offsets, side="right") - 1
+        inside = (slot >= 0) & (offsets < ends[np.maximum(slot, 0)])
+        offsets = offsets[inside]
+        lengths = lengths[inside]
+
+    return offsets, lengths
@@ -0,0 +1,516 @@
+import codecs
+import gzip
+import io
+import json
+import mmap
+import os
+import sys
+import threading
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from functools import partial
+from queue import Queue
+
+try:
+    import zstandard  # type: ignore
+except Exception:
+    zstandard = None
+
+import instrumentation
+import json_backend
+
+# Encodings whose lines can be split on raw b"\n" bytes
+BYTE_SPLIT_ENCODINGS = ("utf-8", "utf-8-sig", "utf8")
+
+# Byte order marks and the encodings detect_encoding() reports for them
+BOMS = (
+    (codecs.BOM_UTF8, "utf-8-sig"),
+    (codecs.BOM_UTF16_LE, "utf-16"),
+    (codecs.BOM_UTF16_BE, "utf-16"),
+)
+
+# Compressed files are decompressed while they are read, they cannot be split into byte ranges
+COMPRESSED_SUFFIXES = (".gz", ".zst")
+
+# Compressed files and other encodings are streamed as UTF-8 blocks of about this size
+STREAM_BLOCK_SIZE = 4 * 1024 * 1024
+
+# Blocks decompressed ahead of the decoding
+READ_AHEAD_BLOCKS = 4
+
+# follow() reads at most this much per batch and waits this long for a file to grow
+FOLLOW_BLOCK_SIZE = 1024 * 1024
+FOLLOW_INTERVAL = 0.1
+
+# Chunks are at least this large so small files are not spread over the pool
+MIN_CHUNK_SIZE = 4 * 1024 * 1024
+
+# More chunks than workers keeps the pool busy when chunks decode at different speeds
+CHUNKS_PER_WORKER = 4
+
+
+def default_workers():
+    """Number of decoding processes used when none is requested"""
+    return os.cpu_count() or 1
+
+
+def chunk_ranges(path, chunks, start=0, end=None):
+    """
+    Split a file, or the part between two line aligned byte offsets, into
+    newline aligned (start, end) byte ranges. Every line belongs to exactly
+    one range.
+    """
+    size = os.path.getsize(path) if end is None else end
+    if size <= start:
+        return []
+
+    first = start
+    chunks = max(1, min(chunks, (size - first) // MIN_CHUNK_SIZE))
+    step = (size - first) // chunks
+
+    ranges = []
+    with open(path, "rb") as f:
+        for i in range(1, chunks):
+            f.seek(max(start, first + i * step))
+            f.readline()  # move to the start of the next line
+            end = f.tell()
+            if end >= size:
+                break
+            if end > start:
+                ranges.append((start, end))
+                start = end
+    ranges.append((start, size))
+    return ranges
+
+
+def is_compressed(path):
+    """True for .gz and .zst files"""
+    return str(path).endswith(COMPRESSED_SUFFIXES)
+
+
+def seekable(path, encoding="utf-8"):
+    """True when the lines of a file can be read by byte offset, needed by the indexes"""
+    return encoding in BYTE_SPLIT_ENCODINGS and not is_compressed(path)
+
+
+def base_name(path):
+    """File name without the compression suffix and the extension, used for output files"""
+    name = os.path.basename(path)
+    for suffix in COMPRESSED_SUFFIXES:
+        name = name.removesuffix(suffix)
+    return os.path.splitext(name)[0]
+
+
+@contextmanager
+def open_stream(path):
+    """Binary file object of the uncompressed content of a file"""
+    if str(path).endswith(".gz"):
+        with gzip.open(path, "rb") as f:
+            yield f
+    elif str(path).endswith(".zst"):
+        if zstandard is None:
+            raise ImportError(f"Reading {path} needs the zstandard package: pip install zstandard")
+        with open(path, "rb") as raw, zstandard.ZstdDecompressor().stream_reader(raw) as f:
+            yield f
+    else:
+        with open(path, "rb") as f:
+            yield f
+
+
+def detect_encoding(path, sample_size=4096):
+    """
+    Encoding of a JSONL file from its byte order mark, UTF-16 without BOM is
+    recognized by the NUL bytes of its ASCII characters. Reads the start of the
+    file once, compressed files are decompressed for it.
+    """
+    with open_stream(path) as f:
+        sample = f.read(sample_size)
+
+    for bom, encoding in BOMS:
+        if sample.startswith(bom):
+            return encoding
+    if sample[1::2].count(0) > len(sample) // 4:
+        return "utf-16-le"
+    if sample[0::2].count(0) > len(sample) // 4:
+        return "utf-16-be"
+    return "utf-8"
+
+
+@contextmanager
+def mapped(path):
+    """Read-only memory map of a file, None for an empty file which cannot be mapped"""
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            yield None
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+            yield buffer
+
+
+def iter_blocks(path, encoding="utf-8"):
+    """
+    Yield (start, end, block) for blocks of whole lines of a file as UTF-8
+    bytes. start and end are offsets in the uncompressed UTF-8 stream.
+    Compressed files are decompressed and other encodings transcoded on the way.
+    """
+    decoder = None
+    if encoding not in BYTE_SPLIT_ENCODINGS:
+        decoder = codecs.getincrementaldecoder(encoding)(errors="ignore")
+
+    offset = 0
+    rest = b""
+    with open_stream(path) as f:
+        while True:
+            raw = f.read(STREAM_BLOCK_SIZE)
+            data = raw
+            if decoder is not None:
+                data = decoder.decode(raw, final=not raw).encode("utf-8", "ignore")
+
+            block = rest + data
+            if raw:
+                # A line cut by the block size is completed by the next block
+                cut = block.rfind(b"\n") + 1
+                block, rest = block[:cut], block[cut:]
+            if block:
+                yield offset, offset + len(block), block
+                offset += len(block)
+            if not raw:
+                return
+
+
+def read_ahead(blocks):
+    """
+    Run a block generator in a background thread, so decompression overlaps
+    with decoding. zlib and zstandard release the GIL while they work.
+    """
+    queue = Queue(maxsize=READ_AHEAD_BLOCKS)
+    stop = threading.Event()
+    done = object()
+
+    def produce():
+        try:
+            for block in blocks:
+                if stop.is_set():
+                    return
+                queue.put(block)
+            queue.put(done)
+        except BaseException as e:
+            queue.put(e)
+
+    thread = threading.Thread(target=produce, daemon=True)
+    thread.start()
+    try:
+        while True:
+            block = queue.get()
+            if block is done:
+                return
+            if isinstance(block, BaseException):
+                raise block
+            yield block
+    finally:
+        # Unblock the producer when the consumer stops early
+        stop.set()
+        while thread.is_alive():
+            while not queue.empty():
+                queue.get_nowait()
+            thread.join(0.01)
+
+
+def block_lines(block, first=False):
+    """Non-empty, stripped lines of a block of whole lines"""
+    lines = io.BytesIO(block)
+    if first:
+        line = lines.readline().removeprefix(codecs.BOM_UTF8).strip()
+        if line:
+            yield line
+    for line in lines:
+        line = line.strip()
+        if line:
+            yield line
+
+
+def iter_lines(path, start, end, encoding="utf-8", lines=None):
+    """
+    Yield the non-empty, stripped lines between two byte offsets as bytes.
+    UTF-8 files are read from a memory map. Compressed files and other
+    encodings are streamed as UTF-8 over the whole file.
+    lines=(offsets, lengths) reads only those lines, e.g. selected by a type
+    index. lines=bytes holds a block of whole lines from iter_blocks.
+    """
+    found = _iter_lines(path, start, end, encoding, lines)
+    if _line_timings:
+        return instrumentation.timed_lines(found)
+    return found
+
+
+def _iter_lines(path, start, end, encoding, lines):
+    if isinstance(lines, bytes):
+        yield from block_lines(lines, first=start == 0)
+        return
+
+    if not seekable(path, encoding):
+        for block_start, _, block in iter_blocks(path, encoding):
+            yield from block_lines(block, first=block_start == 0)
+        return
+
+    with mapped(path) as buffer:
+        if buffer is None:
+            return
+
+        if lines is not None:
+            for offset, length in zip(*(column.tolist() for column in lines)):
+                line = buffer[offset:offset + length]
+                if offset == 0:
+                    line = line.removeprefix(codecs.BOM_UTF8)
+                line = line.strip()
+                if line:
+                    yield line
+            return
+
+        buffer.seek(start)
+        readline = buffer.readline
+        if start == 0:
+            line = readline().removeprefix(codecs.BOM_UTF8).strip()
+            if line:
+                yield line
+        while buffer.tell() < end:
+            line = readline().strip()
+            if line:
+                yield line
+
+
+def follow(path, stop, from_start=False):
+    """
+    Yield batches of the non-empty, stripped lines appended to a growing UTF-8
+    file, like tail -f, until the stop event is set. path "-" reads standard
+    input until it is closed. Starts at the end of the file unless from_start,
+    a file that is truncated or replaced is read again from its start. A line
+    the writer has not finished yet is held back until its newline arrives.
+    """
+    if path == "-":
+        stream = sys.stdin.buffer
+        rest = b""
+        first = True
+        while not stop.is_set():
+            data = stream.read1(FOLLOW_BLOCK_SIZE)
+            if not data:
+                break
+            block = rest + data
+            cut = block.rfind(b"\n") + 1
+            block, rest = block[:cut], block[cut:]
+            if block:
+                yield list(block_lines(block, first=first))
+                first = False
+        if rest.strip():
+            yield list(block_lines(rest, first=first))
+        return
+
+    f = open(path, "rb")
+    try:
+        first = from_start
+        rest = b""
+        partial = False  # started inside a line, it is skipped up to its newline
+        if not from_start:
+            f.seek(0, os.SEEK_END)
+            if f.tell() > 0:
+                f.seek(-1, os.SEEK_CUR)
+                partial = f.read(1) != b"\n"
+
+        while not stop.is_set():
+            data = f.read(FOLLOW_BLOCK_SIZE)
+            if data and partial:
+                newline = data.find(b"\n")
+                if newline < 0:
+                    continue
+                data = data[newline + 1:]
+                partial = False
+            if data:
+                block = rest + data
+                cut = block.rfind(b"\n") + 1
+                block, rest = block[:cut], block[cut:]
+                if block:
+                    yield list(block_lines(block, first=first))
+                    first = False
+                continue
+
+            stop.wait(FOLLOW_INTERVAL)
+            try:
+                current = os.stat(path)
+            except FileNotFoundError:
+                continue  # replaced, the new file is not there yet
+            if current.st_ino != os.fstat(f.fileno()).st_ino or current.st_size < f.tell():
+                f.close()
+                f = open(path, "rb")
+                first = True
+                rest = b""
+                partial = False
+    finally:
+        f.close()
+
+
+def iter_offsets(path, start, end):
+    """
+    Yield (byte offset, byte length, stripped line) for every non-empty line
+    between two byte offsets of a UTF-8 file, used to build the sidecar indexes.
+    """
+    with mapped(path) as buffer:
+        if buffer is None:
+            return
+
+        buffer.seek(start)
+        readline = buffer.readline
+        offset = start
+        while offset < end:
+            raw = readline()
+            line_start = offset
+            offset += len(raw)
+            line = raw.removeprefix(codecs.BOM_UTF8) if line_start == 0 else raw
+            line = line.strip()
+            if line:
+                yield line_start, len(raw), line
+
+
+def type_tokens(message_types, exact=True):
+    """
+    Raw UTF-8 tokens a line must contain to possibly hold one of the message types.
+    exact=True matches the quoted JSON string, otherwise any substring of the type.
+    """
+    tokens = []
+    for message_type in message_types:
+        token = json.dumps(message_type, ensure_ascii=False) if exact else message_type
+        tokens.append(token.encode("utf-8"))
+    return tuple(tokens)
+
+
+def _contains_any(line, tokens):
+    """
+    Prefilter run on the raw line before decoding. A hit is only a candidate,
+    the decoded record still has to be checked.
+    """
+    for token in tokens:
+        if token in line:
+            return True
+    return False
+
+
+# Callers look contains_any up on the module for every line, use_backend()
+# swaps in the timed version so the untimed one pays no extra call
+contains_any = _contains_any
+
+
+# Line decoder of this process, set by use_backend() before the chunks are decoded
+_decode = json_backend.stdlib_loads
+
+# Timing points of iter_lines(), contains_any() and loads() for
+# instrumentation.run_chunk(), turned on by use_backend(timings=True)
+_line_timings = False
+_timed_contains_any = instrumentation.timed("filter", _contains_any)
+
+
+def use_backend(name, paths=None, timings=False):
+    """
+    Select the JSON backend used by loads(), paths as for json_backend.make_decoder.
+    timings=True adds the line steps of this process to the instrumentation line stages.
+    """
+    global _decode, _line_timings, contains_any
+    _decode = json_backend.make_decoder(name, paths)
+    _line_timings = timings
+    contains_any = _timed_contains_any if timings else _contains_any
+    if timings:
+        _decode = instrumentation.timed("decode", _decode)
+
+
+def loads(line):
+    """Decode one line with the selected JSON backend, invalid UTF-8 bytes are ignored"""
+    return _decode(line)
+
+
+def split_lines(lines, chunks):
+    """Split selected (offsets, lengths) into (start, end, lines) batches of similar byte size"""
+    import numpy as np
+
+    offsets, lengths = lines
+    if len(offsets) == 0:
+        return []
+
+    size = int(lengths.sum(dtype=np.uint64))
+    chunks = max(1, min(chunks, size // MIN_CHUNK_SIZE, len(offsets)))
+    cuts = np.searchsorted(np.cumsum(lengths, dtype=np.uint64), np.linspace(0, size, chunks + 1)[1:-1])
+
+    batches = []
+    for batch_offsets, batch_lengths in zip(np.split(offsets, cuts), np.split(lengths, cuts)):
+        if len(batch_offsets):
+            start = int(batch_offsets[0])
+            end = int(batch_offsets[-1]) + int(batch_lengths[-1])
+            batches.append((start, end, (batch_offsets, batch_lengths)))
+    return batches
+
+
+def map_chunks(worker, path, *args, workers=None, encoding="utf-8", lines=None, paths=None, start=0, end=None):
+    """
+    Run worker(path, start, end, encoding, *args) over newline aligned chunks of
+    path in a process pool and yield the per-chunk results in file order.
+    The worker must be a module level function so it can be sent to the pool.
+    lines=(offsets, lengths) only decodes those lines, the worker then gets its
+    share as lines= keyword and passes it on to iter_lines. Compressed files
+    and other encodings than UTF-8 are streamed the same way as blocks of lines.
+    paths lists the dot paths the worker reads from loads() records, None when
+    it needs whole records. It lets json_backend skip the rest of each line.
+    start and end limit an uncompressed UTF-8 file to the lines between two
+    byte offsets. With instrumentation enabled the line timing points are on
+    and the chunks run through instrumentation.run_chunk(), which reports
+    their stage times.
+    """
+    workers = workers or default_workers()
+    decoder = (json_backend.preferred, paths, instrumentation.enabled)
+
+    call = worker
+    if instrumentation.enabled:
+        call = partial(instrumentation.run_chunk, worker)
+
+    def result(value):
+        if call is worker:
+            return value
+        value, stages = value
+        instrumentation.add_chunk(stages)
+        return value
+
+    if lines is not None:
+        calls = [
+            (start, end, {"lines": batch})
+            for start, end, batch in split_lines(lines, workers * CHUNKS_PER_WORKER)
+        ]
+    elif not seekable(path, encoding):
+        # Compressed files and multi-byte line endings cannot be split on raw
+        # bytes, they are streamed to the workers as blocks of UTF-8 lines
+        calls = (
+            (start, end, {"lines": block})
+            for start, end, block in read_ahead(iter_blocks(path, encoding))
+        )
+        encoding = "utf-8"
+    else:
+        calls = [
+            (chunk_start, chunk_end, {})
+            for chunk_start, chunk_end in chunk_ranges(path, workers * CHUNKS_PER_WORKER, start, end)
+        ]
+
+    if workers == 1 or (isinstance(calls, list) and len(calls) <= 1):
+        use_backend(*decoder)
+        for start, end, kwargs in calls:
+            yield result(call(path, start, end, encoding, *args, **kwargs))
+        return
+
+    if isinstance(calls, list):
+        workers = min(workers, len(calls))
+
+    # Only a few chunks per worker are in flight, so streamed blocks are not
+    # all held in memory at once
+    with ProcessPoolExecutor(max_workers=workers, initializer=use_backend, initargs=decoder) as pool:
+        pending = deque()
+        for start, end, kwargs in calls:
+            pending.append(pool.submit(call, path, start, end, encoding, *args, **kwargs))
+            if len(pending) >= workers * CHUNKS_PER_WORKER:
+                yield result(pending.popleft().result())
+        while pending:
+            yield result(pending.popleft().result())
@@ -0,0 +1,414 @@
+import threading
+import time
+
+import field_access
+import json_backend
+import jsonl_reader
+import plot_backend
+import timestamps
+
+# ============================================================
+# LIVE DASHBOARD
+# ============================================================
+#
+# A scanner thread tails the export and appends the points of every axis to a
+# fixed size ring buffer. The GUI thread redraws the subplots from a timer at
+# a fixed frame rate. The two threads only share the ring buffers. Each side
+# holds a buffer's lock just long enough to copy one batch into it or one
+# snapshot out of it, so neither side waits for the other. The lines are
+# animated artists that are blitted over a cached background. The axes are
+# only drawn in full when the visible window moves or a value leaves the y
+# range. NumPy and matplotlib are imported by run(), so the options of the
+# scripts can use the defaults below without importing them.
+
+# Set by load()
+np = None
+downsampling = None
+
+TS_FIELD = "timestamp"
+TYPE_FIELD = "messageContentType"
+
+# Points kept per axis, older points are overwritten
+DEFAULT_CAPACITY = 100_000
+
+# Seconds of data shown, the window jumps forward by a tenth of it
+DEFAULT_WINDOW = 300
+WINDOW_HEADROOM = 0.1
+
+# Share of the value range added above and below, so a trend does not move the y limits every frame
+Y_HEADROOM = 0.25
+
+DEFAULT_FPS = 10
+
+# Points drawn per line and frame, larger windows are downsampled
+MAX_FRAME_POINTS = 4000
+
+NS_PER_DAY = 86_400 * 1_000_000_000
+
+
+def load():
+    """Import NumPy and the downsampling functions for the dashboard"""
+    global np, downsampling
+    import numpy as np
+    import downsampling
+
+
+def date_numbers(ns):
+    """matplotlib date numbers of UTC nanoseconds"""
+    import matplotlib.dates as mdates
+
+    return ns / NS_PER_DAY + mdates.date2num(np.datetime64(0, "ns"))
+
+
+class RingBuffer:
+    """Last capacity (UTC nanoseconds, value) points of one axis in arrival order"""
+
+    def __init__(self, capacity):
+        self.ns = np.zeros(capacity, dtype=np.int64)
+        self.values = np.zeros(capacity, dtype=np.float64)
+        self.capacity = capacity
+        self.end = 0  # points written so far, the next one goes to end % capacity
+        self.lock = threading.Lock()
+
+    def __len__(self):
+        return min(self.end, self.capacity)
+
+    def extend(self, ns, values):
+        ns = np.asarray(ns, dtype=np.int64)[-self.capacity:]
+        values = np.asarray(values, dtype=np.float64)[-self.capacity:]
+        with self.lock:
+            start = self.end % self.capacity
+            first = min(len(ns), self.capacity - start)
+            self.ns[start:start + first] = ns[:first]
+            self.values[start:start + first] = values[:first]
+            self.ns[:len(ns) - first] = ns[first:]
+            self.values[:len(ns) - first] = values[first:]
+            self.end += len(ns)
+
+    def snapshot(self):
+        """Copy of the points, oldest first, and the number of points written so far"""
+        with self.lock:
+            end = self.end
+            if end <= self.capacity:
+                return self.ns[:end].copy(), self.values[:end].copy(), end
+            start = end % self.capacity
+            ns = np.concatenate((self.ns[start:], self.ns[:start]))
+            values = np.concatenate((self.values[start:], self.values[:start]))
+        return ns, values, end
+
+
+class LiveAxis:
+    """Filters the records of one axis and collects its points for the ring buffer"""
+
+    def __init__(self, subplot, capacity):
+        self.subplot = subplot
+        self.field = field_access.FieldPath(subplot.fieldPath)
+        self.buffer = RingBuffer(capacity)
+        self.parser = timestamps.TimestampParser()
+        self.boolean = subplot.datatype == "boolean"
+        self.labels = {}  # category codes of string values
+        self.previous = None
+        self.matched = 0
+        self.missing = 0
+        self.ns = []
+        self.values = []
+
+    def feed(self, obj):
+        subplot = self.subplot
+        self.matched += 1
+
+        ts_raw = obj.get(TS_FIELD)
+        y_val = self.field.get(obj)
+        if ts_raw is None or y_val is None:
+            self.missing += 1
+            return
+
+        try:
+            dt = self.parser(str(ts_raw))
+        except ValueError:
+            self.missing += 1
+            return
+
+        if subplot.datetimeFrom and dt < subplot.datetimeFrom:
+            return
+        if subplot.datetimeTo and dt > subplot.datetimeTo:
+            return
+
+        if subplot.onChangeOnly and self.previous is not None and self.previous == y_val:
+            return
+        self.previous = y_val
+
+        if isinstance(y_val, (bool, int, float)):
+            value = float(y_val)
+        elif isinstance(y_val, str):
+            value = self.labels.setdefault(y_val, len(self.labels))
+        else:
+            self.missing += 1
+            return
+
+        self.ns.append(timestamps.datetime_ns(dt))
+        self.values.append(value)
+
+    def flush(self):
+        """Move the points of the last batch into the ring buffer"""
+        if self.ns:
+            self.buffer.extend(self.ns, self.values)
+            self.ns = []
+            self.values = []
+
+
+def scan(source, axes, stop, stats, from_start=False):
+    """
+    Scanner thread: decode the lines appended to source and feed the axes.
+    Lines that are not valid JSON, e.g. half flushed ones, are skipped.
+    stats["done"] is set when the thread ends, stats["error"] when it failed.
+    """
+    routes = {}
+    for axis in axes:
+        routes.setdefault(axis.subplot.messageContentType, []).append(axis)
+    tokens = jsonl_reader.type_tokens(routes)
+
+    try:
+        for lines in jsonl_reader.follow(source, stop, from_start):
+            for line in lines:
+                if not jsonl_reader.contains_any(line, tokens):
+                    continue
+
+                try:
+                    obj = jsonl_reader.loads(line)
+                except ValueError:
+                    stats["invalid"] += 1
+                    continue
+                if not isinstance(obj, dict):
+                    continue
+
+                targets = routes.get(obj.get(TYPE_FIELD))
+                if targets is None:
+                    continue
+
+                for axis in targets:
+                    axis.feed(obj)
+
+            stats["lines"] += len(lines)
+            for axis in axes:
+                axis.flush()
+    except Exception as e:
+        stats["error"] = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        stats["done"] = True
+
+
+class LineView:
+    """Animated line of one axis and the limits its subplot was last drawn with"""
+
+    def __init__(self, axis, plot_axis, window):
+        import matplotlib.dates as mdates
+
+        subplot = axis.subplot
+        self.axis = axis
+        self.plot_axis = plot_axis
+        self.window = window
+        self.written = 0
+        self.labels = 0
+        self.step = axis.boolean or subplot.plotType == "step"
+
+        (self.line,) = plot_axis.plot([], [], subplot.style, animated=True)
+        if self.step:
+            self.line.set_drawstyle("steps-post")
+
+        if axis.boolean:
+            plot_axis.set_yticks([0, 1], ["False", "True"])
+            plot_axis.set_ylim(-0.1, 1.1)
+        plot_axis.set_ylabel(subplot.ylabel)
+        if subplot.title:
+            plot_axis.set_title(subplot.title)
+
+        locator = mdates.AutoDateLocator()
+        plot_axis.xaxis.set_major_locator(locator)
+        plot_axis.xaxis.set_major_formatter(mdates.ConciseDateFormatter(locator))
+
+    def update(self):
+        """Set the line to the newest points, True when the axes have to be drawn again"""
+        ns, values, written = self.axis.buffer.snapshot()
+        if written == self.written or not len(ns):
+            return False
+        self.written = written
+
+        if np.any(ns[1:] < ns[:-1]):
+            order = np.argsort(ns, kind="stable")
+            ns, values = ns[order], values[order]
+
+        redraw = False
+        left, right = self.plot_axis.get_xlim()
+        latest = date_numbers(ns[-1])
+        if latest > right or latest < left:
+            # Jump the window forward, the newest point sits a tenth from the right edge
+            width = self.window / 86_400
+            right = latest + width * WINDOW_HEADROOM
+            left = right - width
+            self.plot_axis.set_xlim(left, right)
+            redraw = True
+
+        # Only the points in the visible window are drawn, plus one on each side
+        first, last = (np.array([left, right]) - date_numbers(0)) * NS_PER_DAY
+        lo = max(0, int(np.searchsorted(ns, first, "left")) - 1)
+        hi = min(len(ns), int(np.searchsorted(ns, last, "right")) + 1)
+        ns, values = ns[lo:hi], values[lo:hi]
+
+        if self.step:
+            keep = downsampling.state_edges(values)
+        else:
+            finite = np.flatnonzero(~np.isnan(values))
+            keep = finite[downsampling.minmax(ns[finite], values[finite], MAX_FRAME_POINTS)]
+        x = date_numbers(ns[keep])
+        y = values[keep]
+        self.line.set_data(x, y)
+
+        labels = self.axis.labels
+        if len(labels) != self.labels:
+            names = list(labels)
+            self.plot_axis.set_yticks(range(len(names)), names)
+            self.labels = len(names)
+            redraw = True
+
+        if not self.axis.boolean and len(y):
+            bottom, top = self.plot_axis.get_ylim()
+            low, high = np.nanmin(y), np.nanmax(y)
+            if redraw or low < bottom or high > top:
+                margin = (high - low) * Y_HEADROOM or 0.5
+                self.plot_axis.set_ylim(low - margin, high + margin)
+                redraw = True
+
+        return redraw
+
+
+class Dashboard:
+    """
+    Redraws the line views from a timer of the GUI event loop, and shows
+    below the axes when a scanner thread has stopped
+    """
+
+    def __init__(self, fig, views, fps, scanners=()):
+        self.fig = fig
+        self.canvas = fig.canvas
+        self.views = views
+        self.scanners = list(scanners)
+        self.status = fig.text(0.01, 0.01, "", fontsize="small", color="tab:red")
+        self.background = None
+        self.frames = 0
+        self.full_draws = 0
+        # A resize or a full draw renders the axes without the animated lines
+        self.canvas.mpl_connect("draw_event", self.on_draw)
+        self.timer = self.canvas.new_timer(interval=max(1, int(1000 / fps)))
+        self.timer.add_callback(self.frame)
+
+    def on_draw(self, event):
+        self.background = self.canvas.copy_from_bbox(self.fig.bbox)
+        self.draw_lines()
+
+    def draw_lines(self):
+        for view in self.views:
+            self.fig.draw_artist(view.line)
+
+    def check_scanners(self):
+        """Show the scanners that stopped since the last frame, True when there is one"""
+        stopped = [stats for stats in self.scanners if stats["done"]]
+        if not stopped:
+            return False
+
+        lines = [self.status.get_text()] if self.status.get_text() else []
+        for stats in stopped:
+            self.scanners.remove(stats)
+            name = "standard input" if stats["path"] == "-" else stats["path"]
+            reason = stats["error"] or "end of input"
+            lines.append(f"Stopped following {name}: {reason}")
+            print(lines[-1])
+        self.status.set_text("\n".join(lines))
+        return True
+
+    def frame(self):
+        redraw = self.check_scanners()
+        for view in self.views:
+            redraw |= view.update()
+        self.frames += 1
+
+        if redraw or self.background is None:
+            self.full_draws += 1
+            self.canvas.draw()  # on_draw caches the background and draws the lines
+        else:
+            self.canvas.restore_region(self.background)
+            self.draw_lines()
+        self.canvas.blit(self.fig.bbox)
+        self.canvas.flush_events()
+
+
+def run(subplots, config, data_path, source=None, fps=DEFAULT_FPS, window=DEFAULT_WINDOW, capacity=DEFAULT_CAPACITY, from_start=False):
+    """
+    Plot the axes of a config while their source files in data_path grow.
+    source replaces the sourceFile of all axes, e.g. "-" for standard input.
+    Returns when the window is closed.
+    """
+    sources = {}
+    for subplot in subplots:
+        sources.setdefault(source or data_path + subplot.sourceFile, []).append(subplot)
+
+    if plot_backend.headless():
+        raise SystemExit("Live mode needs a display to open its window on")
+    load()
+
+    for path in sources:
+        if path != "-" and not jsonl_reader.seekable(path, jsonl_reader.detect_encoding(path)):
+            raise SystemExit(f"Live mode reads uncompressed UTF-8 files, pipe {path} to standard input decoded instead")
+
+    fields = [TYPE_FIELD, TS_FIELD] + [subplot.fieldPath for subplot in subplots]
+    jsonl_reader.use_backend(json_backend.preferred, fields)
+
+    plt = plot_backend.pyplot()
+    fig, grid = plt.subplots(config["rows"], config["columns"], squeeze=False)
+    if "title" in config and config["title"]:
+        fig.suptitle(config["title"])
+
+    axes = {}
+    views = []
+    for subplot, plot_axis in zip(subplots, grid.flat):
+        axis = axes[subplot.index] = LiveAxis(subplot, capacity)
+        views.append(LineView(axis, plot_axis, window))
+
+    fig.supxlabel(config["xlabel"] if "xlabel" in config and config["xlabel"] else "Timestamp")
+    fig.autofmt_xdate()
+
+    stop = threading.Event()
+    scanners = []
+    for path, fileSubplots in sources.items():
+        stats = {"path": path, "lines": 0, "invalid": 0, "done": False, "error": None}
+        thread = threading.Thread(
+            target=scan,
+            args=(path, [axes[subplot.index] for subplot in fileSubplots], stop, stats, from_start),
+            daemon=True,
+        )
+        scanners.append((thread, stats))
+        print(f"Following {'standard input' if path == '-' else path} for {len(fileSubplots)} axes")
+
+    started = time.perf_counter()
+    for thread, _ in scanners:
+        thread.start()
+
+    dashboard = Dashboard(fig, views, fps, [stats for _, stats in scanners])
+    fig.canvas.mpl_connect("close_event", lambda event: stop.set())
+    dashboard.timer.start()
+    plt.show()
+
+    stop.set()
+    for thread, _ in scanners:
+        thread.join(1)
+
+    elapsed = max(time.perf_counter() - started, 1e-9)
+    print("\n=== Summary ===")
+    for _, stats in scanners:
+        print(f"{stats['path']}: {stats['lines']:,} lines read ({stats['lines'] / elapsed:,.0f} lines/s), {stats['invalid']:,} invalid")
+    for axis in axes.values():
+        print(f"[{axis.subplot.index}]Matched type:     {axis.matched:,}")
+        print(f"[{axis.subplot.index}]In buffer:        {len(axis.buffer):,} of {axis.buffer.end:,}")
+        print(f"[{axis.subplot.index}]Missing/invalid:  {axis.missing:,}")
+    print(f"{dashboard.frames:,} frames, {dashboard.full_draws:,} full redraws")
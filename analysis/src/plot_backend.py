@@ -0,0 +1,35 @@
+import os
+import sys
+
+# ============================================================
+# MATPLOTLIB BACKEND
+# ============================================================
+#
+# matplotlib takes most of a second to import, so the scripts only import it
+# once there is something to draw. Without a display the Agg backend is
+# selected up front: the figures are rendered without a window, and
+# matplotlib does not probe the GUI toolkits first.
+
+
+def headless():
+    """True when there is no display to open a window on"""
+    if sys.platform in ("win32", "darwin"):
+        return False
+    return not (os.environ.get("DISPLAY") or os.environ.get("WAYLAND_DISPLAY"))
+
+
+def pyplot(agg=False):
+    """
+    matplotlib.pyplot, with the Agg backend when there is no display and no
+    backend was chosen. agg=True selects Agg anyway, for figures that are only
+    saved to files.
+    """
+    default = "matplotlib.pyplot" not in sys.modules and headless() and not os.environ.get("MPLBACKEND")
+    if agg or default:
+        import matplotlib
+
+        matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+
+    return plt
+
@@ -1,634 +1,1011 @@
-import json
-import pandas as pd
-import plotly.graph_objects as go
-from plotly.subplots import make_subplots
-from datetime import datetime
 import os
 from collections import defaultdict
 import argparse
+import heapq
+
+import field_access
+import instrumentation
+import json_backend
+import jsonl_reader
+import timestamps
+
+# pandas, plotly and NumPy (with downsampling, jsonl_index, telemetry_cache
+# and zoom_server, which import it) are imported by the steps that use them,
+# so --help, argument errors and runs without data do not pay for importing them
 
 # ============================================================
 # COMMAND LINE ARGUMENT PARSING
 # ============================================================
 
-parser = argparse.ArgumentParser(
-    description="Process JSONL telemetry data and create timeseries visualizations"
-)
-
-# Required arguments
-parser.add_argument("jsonl_file", type=str, help="Path to the JSONL file")
-
-# Optional arguments for filtering and field selection
-parser.add_argument(
-    "--message-types",
-    type=str,
-    nargs="+",
-    help='Message content types to filter (e.g., "Remoot.SS139OutsideControlMessage")',
-    default=[],
-)
-parser.add_argument(
-    "--fields",
-    type=str,
-    nargs="+",
-    help='Field names to extract and plot (e.g., "ActivatedHornHigh" "ThreewaySwitchState")',
-    default=[],
-)
-parser.add_argument(
-    "--field-paths",
-    type=str,
-    nargs="+",
-    help='JSON paths to fields (e.g., "message.OutsideControlData.ActivatedHornHigh" "message.MessagePayload.ThreewaySwitchState")',
-    default=[],
-)
-parser.add_argument(
-    "--max-points",
-    type=int,
-    default=1000,
-    help="Maximum number of points for visualization (default: 1000)",
-)
-parser.add_argument(
-    "--output-dir",
-    type=str,
-    default=".",
-    help="Output directory for generated files (default: current directory)",
-)
-parser.add_argument(
-    "--png", action="store_true", help="Generate PNG images (default: disabled)"
-)
-parser.add_argument("--no-csv", action="store_true", help="Skip CSV exports")
-parser.add_argument(
-    "--lightweight",
-    action="store_true",
-    help="Generate lightweight HTML (no markers, simplified features)",
-)
-parser.add_argument(
-    "--encoding",
-    type=str,
-    default="auto",
-    choices=["auto", "utf-8", "utf-16", "utf-16-le"],
-    help="File encoding (default: auto-detect)",
-)
-
-args = parser.parse_args()
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="Process JSONL telemetry data and create timeseries visualizations"
+    )
+
+    # Required arguments
+    parser.add_argument(
+        "jsonl_file", type=str, help="Path to the JSONL file, may be compressed (.jsonl.gz, .jsonl.zst)"
+    )
+
+    # Optional arguments for filtering and field selection
+    parser.add_argument(
+        "--message-types",
+        type=str,
+        nargs="+",
+        help='Message content types to filter (e.g., "Remoot.SS139OutsideControlMessage")',
+        default=[],
+    )
+    parser.add_argument(
+        "--fields",
+        type=str,
+        nargs="+",
+        help='Field names to extract and plot (e.g., "ActivatedHornHigh" "ThreewaySwitchState")',
+        default=[],
+    )
+    parser.add_argument(
+        "--field-paths",
+        type=str,
+        nargs="+",
+        help='JSON paths to fields (e.g., "message.OutsideControlData.ActivatedHornHigh" "message.MessagePayload.ThreewaySwitchState")',
+        default=[],
+    )
+    parser.add_argument(
+        "--max-points",
+        type=int,
+        default=1000,
+        help="Maximum number of points for visualization (default: 1000)",
+    )
+    parser.add_argument(
+        "--output-dir",
+        type=str,
+        default=".",
+        help="Output directory for generated files (default: current directory)",
+    )
+    parser.add_argument(
+        "--png", action="store_true", help="Generate PNG images (default: disabled)"
+    )
+    parser.add_argument("--no-csv", action="store_true", help="Skip CSV exports")
+    parser.add_argument(
+        "--lightweight",
+        action="store_true",
+        help="Generate lightweight HTML (no markers, simplified features)",
+    )
+    parser.add_argument(
+        "--encoding",
+        type=str,
+        default="auto",
+        choices=["auto", "utf-8", "utf-16", "utf-16-le"],
+        help="File encoding (default: auto-detect)",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=0,
+        help="Number of decoding processes (default: one per CPU)",
+    )
+    parser.add_argument(
+        "--cache",
+        action="store_true",
+        help="Read through a columnar cache stored next to the JSONL file (needs pyarrow)",
+    )
+    parser.add_argument(
+        "--index",
+        action="store_true",
+        help="Read only the lines of the --message-types through a type index stored "
+        "next to the JSONL file (UTF-8 files only)",
+    )
+    parser.add_argument(
+        "--json-backend",
+        type=str,
+        default="auto",
+        choices=json_backend.BACKENDS,
+        help="JSON decoder: 'auto' uses orjson, then simdjson when installed, then the standard library",
+    )
+    parser.add_argument(
+        "--downsample",
+        type=str,
+        default="state",
+        choices=["state", "lttb", "minmax"],
+        help="Downsampling: 'state' keeps shared rows around state changes, 'lttb' and "
+        "'minmax' reduce every numeric trace on its own and keep exact boolean edges "
+        "(default: state)",
+    )
+    parser.add_argument(
+        "--serve",
+        action="store_true",
+        help="Serve a zoomable plot that re-downsamples the visible time range "
+        "instead of writing HTML",
+    )
+    parser.add_argument(
+        "--port",
+        type=int,
+        default=8050,
+        help="Port of the --serve zoom server (default: 8050)",
+    )
+    instrumentation.add_arguments(parser)
+    return parser.parse_args()
+
 
 # ============================================================
 # HELPER FUNCTIONS
 # ============================================================
 
 
-def get_nested_value(obj, path):
+def parse_timestamp_column(values):
     """
-    Get value from nested dictionary using dot notation path
-    Example: get_nested_value(data, "message.OutsideControlData.ActivatedHornHigh")
+    Convert the timestamp column, in one NumPy batch when all timestamps share
+    the format and UTC offset of the first one
     """
-    keys = path.split(".")
-    value = obj
-    for key in keys:
-        if isinstance(value, dict):
-            value = value.get(key)
-            if value is None:
-                return None
+    import pandas as pd
+
+    batch = timestamps.parse_ns(values.tolist())
+    if batch is None:
+        return pd.to_datetime(values, errors="coerce")
+
+    ns, minutes = batch
+    parsed = pd.Series(ns.view("datetime64[ns]"), index=values.index, name=values.name)
+    if minutes is not None:
+        parsed = parsed.dt.tz_localize("UTC").dt.tz_convert(timestamps.fixed_zone(minutes))
+    return parsed
+
+
+def downsample_with_state_changes(df, max_points=3000, value_columns=None):
+    """
+    Downsample data while preserving state changes.
+    Both rows around a change in any value column are kept, the remaining
+    budget is filled with uniformly spaced rows. At most max_points rows
+    are returned.
+    """
+    n = len(df)
+    if n <= max_points:
+        return df
+
+    import numpy as np
+
+    print(f"Downsampling from {n} to ~{max_points} points...")
+
+    keep = np.zeros(n, dtype=bool)
+    keep[0] = True
+    keep[-1] = True
+
+    # Find state changes: compare every row with the previous one, per column
+    columns = [col for col in (value_columns or []) if col in df.columns]
+    if columns:
+        values = df[columns]
+        changed = values.ne(values.shift()).to_numpy().any(axis=1)
+        changed[0] = False
+        keep |= changed
+        keep[:-1] |= changed[1:]
+
+    # More changes than points: keep evenly spaced ones, first and last included
+    kept = np.flatnonzero(keep)
+    if len(kept) > max_points:
+        kept = np.unique(kept[np.linspace(0, len(kept) - 1, max_points).round().astype(int)])
+        keep[:] = False
+        keep[kept] = True
+
+    remaining_points = max_points - int(keep.sum())
+    if remaining_points > 0:
+        uniform = np.zeros(n, dtype=bool)
+        uniform[:: max(1, n // remaining_points)] = True
+        if int((uniform & ~keep).sum()) <= remaining_points:
+            keep |= uniform
         else:
-            return None
-    return value
+            # The plain stride overshoots the budget, spread exactly the
+            # remaining points over the rows not kept yet
+            candidates = np.flatnonzero(~keep)
+            picks = np.linspace(0, len(candidates) - 1, remaining_points)
+            keep[candidates[picks.round().astype(int)]] = True
 
+    downsampled = df.iloc[np.flatnonzero(keep)].copy()
 
-def auto_detect_encoding(filepath):
-    """Auto-detect file encoding"""
-    encodings_to_try = ["utf-16", "utf-16-le", "utf-8"]
+    print(f"Downsampled to {len(downsampled)} points")
+    return downsampled
 
-    for encoding in encodings_to_try:
-        try:
-            with open(filepath, "r", encoding=encoding, errors="ignore") as f:
-                # Try to read first few lines
-                for _ in range(3):
-                    line = f.readline()
-                    if line:
-                        json.loads(line.strip())
-                print(f"Detected encoding: {encoding}")
-                return encoding
-        except:
+
+def reduce_trace(df, field_name, field_type, algorithm, max_points):
+    """
+    Reduce one field to its own point budget. Numeric fields use the
+    downsampling algorithm, booleans keep every edge exactly and other
+    states keep their edges up to the budget.
+    """
+    import numpy as np
+    import pandas as pd
+
+    import downsampling
+
+    series = df[["timestamp", field_name]].dropna()
+
+    if field_type == "numeric":
+        keep = downsampling.ALGORITHMS[algorithm](
+            pd.DatetimeIndex(series["timestamp"]).asi8,
+            series[field_name].to_numpy(dtype=np.float64),
+            max_points,
+        )
+    else:
+        keep = downsampling.state_edges(series[field_name].to_numpy())
+        if field_type != "boolean" and len(keep) > max_points:
+            picks = np.linspace(0, len(keep) - 1, max_points).round().astype(int)
+            keep = np.unique(keep[picks])
+
+    reduced = series.iloc[keep]
+    print(f"Reduced {field_name} from {len(series)} to {len(reduced)} points ({algorithm})")
+    return reduced["timestamp"], reduced[field_name]
+
+
+def zoom_traces(df, field_types):
+    """Full resolution NumPy columns of every plotted field for the zoom server"""
+    import numpy as np
+    import pandas as pd
+
+    import zoom_server
+
+    traces = []
+    for field_name, field_type in field_types.items():
+        if field_type == "unknown":
             continue
+        series = df[["timestamp", field_name]].dropna()
+        x = pd.DatetimeIndex(series["timestamp"]).as_unit("ns").asi8
+        labels = None
+        if field_type == "string":
+            codes, uniques = pd.factorize(series[field_name].astype(str))
+            y = codes.astype(np.float64)
+            labels = list(uniques)
+        else:
+            y = series[field_name].to_numpy(dtype=np.float64)
+        traces.append(
+            zoom_server.Trace(
+                field_name, field_type, x, y, labels, secondary_y=field_type != "boolean"
+            )
+        )
+    return traces
+
+
+# Common locations searched for --fields names, in order
+# (message.ActiveCabInfo holds Cab1/Cab2)
+FIELD_LOCATIONS = [
+    "message.MessagePayload",
+    "message.OutsideControlData",
+    "message",
+    "message.ActiveCabInfo",
+]
+
+
+def matches_message_types(msg_type, message_types):
+    """Substring match used by --message-types, no filter means every type matches"""
+    if not message_types:
+        return True
+    return any(mt in msg_type for mt in message_types)
+
+
+def scanned_type(message_type):
+    """
+    messageContentType of a type index or cache entry as the JSONL scan sees
+    it, untyped and null records have the empty type.
+    """
+    import jsonl_index
+
+    if message_type is None or message_type == jsonl_index.UNTYPED:
+        return ""
+    return message_type
+
 
-    # Default fallback
-    print("Could not auto-detect encoding, using utf-8")
-    return "utf-8"
+def compile_fields(field_paths, fields):
+    """
+    Compile --field-paths into FieldPath accessors and --fields into searches
+    over FIELD_LOCATIONS, once per extraction instead of once per record
+    """
+    return (
+        [field_access.FieldPath(field_path) for field_path in field_paths],
+        [field_access.FieldSearch(field_name, FIELD_LOCATIONS) for field_name in fields],
+    )
+
+
+def field_columns(field_paths, fields):
+    """Dot paths of --field-paths and of every --fields candidate location"""
+    return list(field_paths) + [
+        f"{location}.{field_name}"
+        for field_name in fields
+        for location in FIELD_LOCATIONS
+    ]
+
+
+def read_paths(field_paths, fields):
+    """Every dot path the extraction can read from a record, used by the JSON backend"""
+    return ["messageContentType", "timestamp"] + field_columns(field_paths, fields)
+
+
+def extract_record(record, extracted_field_names, msg_type, lookup, probe, paths, searches):
+    """
+    Copy the requested fields into record, lookup(field_path) returns the value
+    of a FieldPath and probe(field_path) the same for a path that is usually missing.
+    """
+    # Extract fields using paths, named after their last part
+    for path in paths:
+        value = lookup(path)
+
+        if value is not None:
+            record[path.name] = value
+            extracted_field_names.add(path.name)
+
+    # Extract simple fields from common locations, in FIELD_LOCATIONS order
+    for search in searches:
+        value = search.get(msg_type, lookup, probe)
+
+        if value is not None:
+            record[search.name] = value
+            extracted_field_names.add(search.name)
 
 
 # ============================================================
-# LOAD JSONL FILE
+# STREAMING EXTRACTION PIPELINE
 # ============================================================
+#
+# Records flow through generators: raw lines -> prefilter -> decode ->
+# message type filter -> field extraction. Decoded objects are dropped as soon
+# as their fields are copied, only the extracted values are kept per timestamp.
+
+
+def select_items(path, start, end, encoding, message_types, stats, lines=None):
+    """
+    Yield (msg_type, timestamp, lookup, probe) for every record of one byte range that
+    passes the message type filter. stats["loaded"] counts the records read.
+    lines=(offsets, lengths) restricts the range to the lines picked by the type index.
+    """
+    # If no message types specified, process all records
+    filter_by_message_type = len(message_types) > 0
+
+    # Message types match as substrings, so the raw line must contain one of them
+    tokens = jsonl_reader.type_tokens(message_types, exact=False)
 
-print(f"Loading JSONL file: {args.jsonl_file}")
-
-# Determine encoding
-if args.encoding == "auto":
-    encoding = auto_detect_encoding(args.jsonl_file)
-else:
-    encoding = args.encoding
-    print(f"Using specified encoding: {encoding}")
-
-# Load data
-data = []
-with open(args.jsonl_file, "r", encoding=encoding, errors="ignore") as f:
-    for line_num, line in enumerate(f, 1):
-        line = line.strip()
-        if not line:  # Skip empty lines
+    for line_num, line in enumerate(jsonl_reader.iter_lines(path, start, end, encoding, lines), 1):
+        if filter_by_message_type and not jsonl_reader.contains_any(line, tokens):
+            stats["loaded"] += 1  # counted as loaded without being decoded
             continue
         try:
-            obj = json.loads(line)
-            data.append(obj)
-        except json.JSONDecodeError as e:
-            if line_num <= 3:  # Show first few errors
-                print(
-                    f"Warning: Skipping invalid JSON on line {line_num}: {str(e)[:80]}"
-                )
+            item = jsonl_reader.loads(line)
+        except ValueError as e:
+            if start == 0 and line_num <= 3:  # Show first few errors
+                print(f"Warning: Skipping invalid JSON on line {line_num}: {str(e)[:80]}")
             continue
+        stats["loaded"] += 1
 
-print(f"Loaded {len(data)} records")
+        msg_type = item.get("messageContentType")
+        if msg_type is None:
+            msg_type = ""
 
-# ============================================================
-# EXTRACT DATA BASED ON PARAMETERS
-# ============================================================
+        # Filter by message type if specified
+        if not matches_message_types(msg_type, message_types):
+            continue
 
-# If no message types specified, process all records
-filter_by_message_type = len(args.message_types) > 0
+        timestamp = item.get("timestamp")
+        if not timestamp:
+            continue
 
-# If no fields specified, try to auto-detect common fields
-if len(args.fields) == 0 and len(args.field_paths) == 0:
-    print(
-        "No fields specified. Please use --fields or --field-paths to specify which data to extract."
-    )
-    exit(1)
+        yield msg_type, timestamp, lambda path, item=item: path.get(item), lambda path, item=item: path.find(item)
 
-records_by_timestamp = defaultdict(dict)
-extracted_field_names = set()
 
-for item in data:
-    msg_type = item.get("messageContentType", "")
+def select_cached(data):
+    """
+    Yield (msg_type, timestamp, lookup, probe) for cached rows. The per-type columns
+    are merged lazily on their file order column, like a scan of the JSONL file.
+    """
+    import telemetry_cache
+
+    def type_rows(msg_type, type_data):
+        for i, order in enumerate(type_data[telemetry_cache.ORDER_COLUMN]):
+            yield order, msg_type, i, type_data
 
-    # Filter by message type if specified
-    if filter_by_message_type:
-        if not any(mt in msg_type for mt in args.message_types):
+    rows = heapq.merge(
+        *(type_rows(scanned_type(msg_type), type_data) for msg_type, type_data in data.items()),
+        key=lambda row: row[0],
+    )
+    for _, msg_type, i, type_data in rows:
+        timestamp = type_data[telemetry_cache.TS_COLUMN][i]
+        if not timestamp:
             continue
+        def lookup(path, i=i, type_data=type_data):
+            return type_data[path.path][i]
 
-    timestamp = item.get("timestamp")
-    if not timestamp:
-        continue
+        yield msg_type, timestamp, lookup, lookup
 
-    # Initialize record
-    if "timestamp" not in records_by_timestamp[timestamp]:
-        records_by_timestamp[timestamp]["timestamp"] = timestamp
-        records_by_timestamp[timestamp]["messageContentType"] = msg_type
 
-    # Extract fields using paths
-    for field_path in args.field_paths:
-        # Get the field name (last part of the path)
-        field_name = field_path.split(".")[-1]
-        value = get_nested_value(item, field_path)
+def collect_records(selected, field_paths, fields):
+    """Consume selected records and keep only the extracted fields per timestamp"""
+    records_by_timestamp = defaultdict(dict)
+    extracted_field_names = set()
+    paths, searches = compile_fields(field_paths, fields)
 
-        if value is not None:
-            records_by_timestamp[timestamp][field_name] = value
-            extracted_field_names.add(field_name)
-
-    # Extract simple fields from common locations
-    for field_name in args.fields:
-        # Try multiple common locations
-        value = None
-
-        # Try message.MessagePayload
-        if value is None:
-            value = get_nested_value(item, f"message.MessagePayload.{field_name}")
-
-        # Try message.OutsideControlData
-        if value is None:
-            value = get_nested_value(item, f"message.OutsideControlData.{field_name}")
-
-        # Try direct in message
-        if value is None:
-            value = get_nested_value(item, f"message.{field_name}")
-        
-        # Try message.ActiveCabInfo (for Cab1/Cab2)
-        if value is None:
-            value = get_nested_value(item, f"message.ActiveCabInfo.{field_name}")
+    for msg_type, timestamp, lookup, probe in selected:
+        # Initialize record
+        record = records_by_timestamp[timestamp]
+        if "timestamp" not in record:
+            record["timestamp"] = timestamp
+            record["messageContentType"] = msg_type
 
-        if value is not None:
-            records_by_timestamp[timestamp][field_name] = value
-            extracted_field_names.add(field_name)
+        extract_record(record, extracted_field_names, msg_type, lookup, probe, paths, searches)
 
-# Convert to list
-records = list(records_by_timestamp.values())
+    return dict(records_by_timestamp), extracted_field_names
 
-print(f"Extracted {len(records)} records with relevant data")
-print(f"Fields found: {', '.join(sorted(extracted_field_names))}")
 
-if len(records) == 0:
-    print("No data extracted. Check your message types and field names.")
-    exit(1)
+def extract_chunk(path, start, end, encoding, message_types, field_paths, fields, lines=None):
+    """
+    Decode one byte range and extract the requested fields per timestamp.
+    Runs in a worker process, only the extracted values are sent back.
+    """
+    stats = {"loaded": 0}
+    records_by_timestamp, extracted_field_names = collect_records(
+        select_items(path, start, end, encoding, message_types, stats, lines),
+        field_paths,
+        fields,
+    )
+    return stats["loaded"], records_by_timestamp, extracted_field_names
 
-# ============================================================
-# CREATE DATAFRAME AND PROCESS
-# ============================================================
 
-df = pd.DataFrame(records)
+def index_lines(type_index, message_types):
+    """Offsets and lengths of the lines whose type matches --message-types"""
+    import jsonl_index
 
-# Convert timestamp to datetime
-df["timestamp"] = pd.to_datetime(df["timestamp"], errors="coerce")
-df = df.sort_values("timestamp")
+    indexed_types = [
+        msg_type
+        for msg_type in type_index["types"]
+        if matches_message_types(scanned_type(msg_type), message_types)
+    ]
+    return jsonl_index.select_lines(type_index, indexed_types)
 
-print(f"Processed {len(df)} relevant records")
-print(f"Time range: {df['timestamp'].min()} to {df['timestamp'].max()}")
 
-# ============================================================
-# DOWNSAMPLE DATA
-# ============================================================
+def extract_cached(manifest, message_types, field_paths, fields):
+    """
+    Same result as extract_chunk over the whole file, read from the columnar
+    cache. Only the columns of the requested paths are loaded.
+    """
+    import telemetry_cache
 
+    cached_types = [
+        entry["messageContentType"]
+        for entry in manifest["types"]
+        if matches_message_types(scanned_type(entry["messageContentType"]), message_types)
+    ]
+    columns = field_columns(field_paths, fields)
+    data = telemetry_cache.load_columns(manifest, cached_types, columns)
 
-def downsample_with_state_changes(df, max_points=3000, value_columns=None):
-    """Downsample data while preserving state changes"""
-    if len(df) <= max_points:
-        return df
+    records_by_timestamp, extracted_field_names = collect_records(
+        select_cached(data), field_paths, fields
+    )
+    return manifest["records"], records_by_timestamp, extracted_field_names
 
-    print(f"Downsampling from {len(df)} to ~{max_points} points...")
 
-    indices_to_keep = set()
-    indices_to_keep.add(0)
-    indices_to_keep.add(len(df) - 1)
+def main():
+    args = parse_args()
+    json_backend.select(args.json_backend)
+    instrumentation.start(args, "plot_data_plotly")
 
-    # Find state changes
-    if value_columns:
-        for col in value_columns:
-            if col in df.columns:
-                for i in range(1, len(df)):
-                    if df.iloc[i - 1][col] != df.iloc[i][col]:
-                        indices_to_keep.add(i - 1)
-                        indices_to_keep.add(i)
+    # ============================================================
+    # LOAD JSONL FILE
+    # ============================================================
 
-    remaining_points = max_points - len(indices_to_keep)
-    if remaining_points > 0:
-        step = len(df) // remaining_points
-        for i in range(0, len(df), step):
-            indices_to_keep.add(i)
+    print(f"Loading JSONL file: {args.jsonl_file}")
 
-    indices_list = sorted(list(indices_to_keep))
-    downsampled = df.iloc[indices_list].copy()
+    # Determine encoding
+    if args.encoding == "auto":
+        # BOM and NUL byte check on the first block of the file
+        encoding = jsonl_reader.detect_encoding(args.jsonl_file)
+        print(f"Detected encoding: {encoding}")
+    else:
+        encoding = args.encoding
+        print(f"Using specified encoding: {encoding}")
 
-    print(f"Downsampled to {len(downsampled)} points")
-    return downsampled
+    # If no fields specified, try to auto-detect common fields
+    if len(args.fields) == 0 and len(args.field_paths) == 0:
+        print(
+            "No fields specified. Please use --fields or --field-paths to specify which data to extract."
+        )
+        exit(1)
+
+    # ============================================================
+    # EXTRACT DATA BASED ON PARAMETERS
+    # ============================================================
+
+    import jsonl_index
+    import telemetry_cache
+
+    # Chunks are decoded and filtered in parallel, then merged in file order
+    records_by_timestamp = {}
+    extracted_field_names = set()
+    loaded = 0
+
+    if args.cache and not telemetry_cache.available():
+        print("pyarrow is not installed, reading the JSONL file without cache")
+        args.cache = False
+
+    if args.index and not jsonl_reader.seekable(args.jsonl_file, encoding):
+        print(f"The type index needs an uncompressed UTF-8 file, reading the {encoding} file without index")
+        args.index = False
+    elif args.index and not args.message_types:
+        print("Without --message-types every line is needed, reading without index")
+        args.index = False
+
+    scan = instrumentation.begin("scan", bytes=os.path.getsize(args.jsonl_file))
+    if args.cache:
+        manifest = telemetry_cache.open_cache(args.jsonl_file, encoding, args.workers)
+        nested = telemetry_cache.object_columns(manifest, field_columns(args.field_paths, args.fields))
+        if nested:
+            # The cache only stores the leaves of nested objects
+            print(f"{', '.join(nested)} hold nested objects, reading the JSONL file without cache")
+            args.cache = False
+
+    if args.cache:
+        chunks = [
+            extract_cached(manifest, args.message_types, args.field_paths, args.fields)
+        ]
+    else:
+        lines = None
+        if args.index:
+            type_index = jsonl_index.open_type_index(args.jsonl_file, args.workers)
+            lines = index_lines(type_index, args.message_types)
+            print(f"Type index selected {len(lines[0])} of {type_index['lines']} lines")
+            # Lines skipped through the index count as loaded, like prefiltered lines
+            loaded = type_index["lines"] - len(lines[0])
+
+        chunks = jsonl_reader.map_chunks(
+            extract_chunk,
+            args.jsonl_file,
+            args.message_types,
+            args.field_paths,
+            args.fields,
+            workers=args.workers,
+            encoding=encoding,
+            lines=lines,
+            paths=read_paths(args.field_paths, args.fields),
+        )
+    # Chunk results are merged as they arrive and released right after
+    for chunk_loaded, chunk_records, chunk_field_names in chunks:
+        loaded += chunk_loaded
+        extracted_field_names.update(chunk_field_names)
+        for timestamp, record in chunk_records.items():
+            existing = records_by_timestamp.get(timestamp)
+            if existing is None:
+                records_by_timestamp[timestamp] = record
+                continue
+            # The first record for a timestamp keeps its messageContentType
+            for key, value in record.items():
+                if key not in ("timestamp", "messageContentType"):
+                    existing[key] = value
+    scan.records = loaded
+    scan.end()
+
+    print(f"Loaded {loaded} records")
+
+    print(f"Extracted {len(records_by_timestamp)} records with relevant data")
+    print(f"Fields found: {', '.join(sorted(extracted_field_names))}")
+
+    if len(records_by_timestamp) == 0:
+        print("No data extracted. Check your message types and field names.")
+        exit(1)
+
+    # ============================================================
+    # CREATE DATAFRAME AND PROCESS
+    # ============================================================
+
+    import pandas as pd
+
+    # The extracted values are only needed until they are in the DataFrame
+    with instrumentation.stage("frame", records=len(records_by_timestamp)):
+        df = pd.DataFrame.from_records(iter(records_by_timestamp.values()))
+    del records_by_timestamp
+
+    # Convert timestamp to datetime
+    with instrumentation.stage("parse", records=len(df)):
+        df["timestamp"] = parse_timestamp_column(df["timestamp"])
+    with instrumentation.stage("sort", records=len(df)):
+        df = df.sort_values("timestamp")
+
+    print(f"Processed {len(df)} relevant records")
+    print(f"Time range: {df['timestamp'].min()} to {df['timestamp'].max()}")
+
+    # ============================================================
+    # DOWNSAMPLE DATA
+    # ============================================================
+
+    # Get list of value columns (excluding timestamp and messageContentType)
+    value_columns = [
+        col
+        for col in df.columns
+        if col not in ["timestamp", "messageContentType", "usecase"]
+    ]
 
+    if args.downsample == "state" and not args.serve:
+        with instrumentation.stage("downsample", records=len(df)):
+            df_plot = downsample_with_state_changes(
+                df, max_points=args.max_points, value_columns=value_columns
+            )
 
-# Get list of value columns (excluding timestamp and messageContentType)
-value_columns = [
-    col
-    for col in df.columns
-    if col not in ["timestamp", "messageContentType", "usecase"]
-]
+            # Forward-fill to show last known state
+            print("Forward-filling values...")
+            for col in value_columns:
+                if col in df_plot.columns:
+                    df_plot[col] = df_plot[col].ffill()
+    else:
+        # Every trace is reduced on its own when the figure is built or served
+        df_plot = df
 
-df_plot = downsample_with_state_changes(
-    df, max_points=args.max_points, value_columns=value_columns
-)
+    # ============================================================
+    # EXPORT CSV FILES
+    # ============================================================
 
-# Forward-fill to show last known state
-print("Forward-filling values...")
-for col in value_columns:
-    if col in df_plot.columns:
-        df_plot[col] = df_plot[col].ffill()
+    if not args.no_csv:
+        print("\nExporting CSV files...")
 
-# ============================================================
-# EXPORT CSV FILES
-# ============================================================
+        base_filename = jsonl_reader.base_name(args.jsonl_file)
+        output_dir = args.output_dir
 
-if not args.no_csv:
-    print("\nExporting CSV files...")
+        # Create output directory if it doesn't exist
+        os.makedirs(output_dir, exist_ok=True)
 
-    base_filename = os.path.splitext(os.path.basename(args.jsonl_file))[0]
-    output_dir = args.output_dir
+        csv_file = os.path.join(output_dir, f"{base_filename}_processed_data.csv")
+        with instrumentation.stage("write", records=len(df)) as stage:
+            df.to_csv(csv_file, index=False)
+            stage.bytes = os.path.getsize(csv_file)
+        print(f"Exported full dataset to {csv_file}")
+
+    # ============================================================
+    # CREATE VISUALIZATIONS
+    # ============================================================
+
+    print("\nGenerating visualizations...")
+    # Per-trace downsampling (lttb, minmax) runs while the figure is built and counts as render
+    render = instrumentation.begin("render", records=len(df_plot))
 
-    # Create output directory if it doesn't exist
+    base_filename = jsonl_reader.base_name(args.jsonl_file)
+    output_dir = args.output_dir
     os.makedirs(output_dir, exist_ok=True)
 
-    csv_file = os.path.join(output_dir, f"{base_filename}_processed_data.csv")
-    df.to_csv(csv_file, index=False)
-    print(f"Exported full dataset to {csv_file}")
+    # Analyze data types for each field
+    field_types = {}
+    for field_name in value_columns:
+        if field_name not in df_plot.columns:
+            continue
 
-# ============================================================
-# CREATE VISUALIZATIONS
-# ============================================================
+        # Get non-null values
+        sample_values = df_plot[field_name].dropna()
 
-print("\nGenerating visualizations...")
-
-base_filename = os.path.splitext(os.path.basename(args.jsonl_file))[0]
-output_dir = args.output_dir
-os.makedirs(output_dir, exist_ok=True)
-
-# Analyze data types for each field
-field_types = {}
-for field_name in value_columns:
-    if field_name not in df_plot.columns:
-        continue
-
-    # Get non-null values
-    sample_values = df_plot[field_name].dropna()
-
-    if len(sample_values) == 0:
-        field_types[field_name] = "unknown"
-        continue
-
-    # Check data type
-    unique_values = set(sample_values.unique())
-
-    # Boolean check - check both actual booleans and numeric 0/1
-    if sample_values.dtype == bool:
-        field_types[field_name] = "boolean"
-    elif unique_values.issubset({True, False}):
-        field_types[field_name] = "boolean"
-    elif unique_values.issubset({0, 1}) and len(unique_values) <= 2:
-        field_types[field_name] = "boolean"
-    elif unique_values.issubset({0.0, 1.0}) and len(unique_values) <= 2:
-        field_types[field_name] = "boolean"
-    # Numeric check
-    elif pd.api.types.is_numeric_dtype(sample_values):
-        field_types[field_name] = "numeric"
-    # String check
-    elif pd.api.types.is_string_dtype(sample_values):
-        field_types[field_name] = "string"
-    else:
-        field_types[field_name] = "unknown"
-
-print(f"Detected field types: {field_types}")
-
-# Separate fields by type
-boolean_fields = [k for k, v in field_types.items() if v == "boolean"]
-numeric_fields = [k for k, v in field_types.items() if v == "numeric"]
-string_fields = [k for k, v in field_types.items() if v == "string"]
-
-# Create figure with secondary y-axis if we have both boolean and numeric fields
-if len(boolean_fields) > 0 and len(numeric_fields) > 0:
-    # Create figure with dual y-axes
-    fig = make_subplots(specs=[[{"secondary_y": True}]])
-else:
-    # Single y-axis is fine
-    fig = go.Figure()
-
-# Plot each field based on its type
-colors = [
-    "red",
-    "blue",
-    "green",
-    "orange",
-    "purple",
-    "brown",
-    "pink",
-    "gray",
-    "olive",
-    "cyan",
-    "magenta",
-    "teal",
-    "navy",
-    "maroon",
-    "lime",
-    "indigo",
-    "coral",
-    "gold",
-    "crimson",
-    "darkgreen",
-]
+        if len(sample_values) == 0:
+            field_types[field_name] = "unknown"
+            continue
 
-idx = 0
+        # Check data type
+        unique_values = set(sample_values.unique())
+
+        # Boolean check - check both actual booleans and numeric 0/1
+        if sample_values.dtype == bool:
+            field_types[field_name] = "boolean"
+        elif unique_values.issubset({True, False}):
+            field_types[field_name] = "boolean"
+        elif unique_values.issubset({0, 1}) and len(unique_values) <= 2:
+            field_types[field_name] = "boolean"
+        elif unique_values.issubset({0.0, 1.0}) and len(unique_values) <= 2:
+            field_types[field_name] = "boolean"
+        # Numeric check
+        elif pd.api.types.is_numeric_dtype(sample_values):
+            field_types[field_name] = "numeric"
+        # String check
+        elif pd.api.types.is_string_dtype(sample_values):
+            field_types[field_name] = "string"
+        else:
+            field_types[field_name] = "unknown"
 
-# Plot boolean fields first (on primary y-axis or left side)
-for field_name in sorted(boolean_fields):
-    if field_name not in df_plot.columns:
-        continue
+    print(f"Detected field types: {field_types}")
 
-    color = colors[idx % len(colors)]
-    idx += 1
+    if args.serve:
+        import zoom_server
 
-    # For boolean fields, convert to 0/1 for plotting
-    y_values = []
-    for val in df_plot[field_name]:
-        if pd.isna(val):
-            y_values.append(None)
-        elif val == True or val == 1 or val == 1.0:
-            y_values.append(1)
-        else:
-            y_values.append(0)
-
-    trace = go.Scatter(
-        x=df_plot["timestamp"],
-        y=y_values,
-        mode="lines",
-        name=f"{field_name} (bool)",
-        line=dict(color=color, width=4),
-        connectgaps=False,
-        hovertemplate="%{x}<br>" + field_name + ": %{y}<extra></extra>",
-    )
+        # The browser asks for the visible range and gets it downsampled
+        store = zoom_server.TraceStore(
+            f"Time Series Data - {base_filename}",
+            zoom_traces(df, field_types),
+            max_points=args.max_points,
+            algorithm="minmax" if args.downsample == "minmax" else "lttb",
+        )
+        render.end()
+        zoom_server.serve(store, port=args.port)
+        return
+
+    import plotly.graph_objects as go
+    from plotly.subplots import make_subplots
+
+    def trace_data(field_name):
+        """Timestamps and values of one trace"""
+        if args.downsample == "state":
+            return df_plot["timestamp"], df_plot[field_name]
+        return reduce_trace(
+            df, field_name, field_types[field_name], args.downsample, args.max_points
+        )
 
+    # Separate fields by type
+    boolean_fields = [k for k, v in field_types.items() if v == "boolean"]
+    numeric_fields = [k for k, v in field_types.items() if v == "numeric"]
+    string_fields = [k for k, v in field_types.items() if v == "string"]
+
+    # Create figure with secondary y-axis if we have both boolean and numeric fields
     if len(boolean_fields) > 0 and len(numeric_fields) > 0:
-        fig.add_trace(trace, secondary_y=False)
+        # Create figure with dual y-axes
+        fig = make_subplots(specs=[[{"secondary_y": True}]])
     else:
-        fig.add_trace(trace)
+        # Single y-axis is fine
+        fig = go.Figure()
+
+    # Plot each field based on its type
+    colors = [
+        "red",
+        "blue",
+        "green",
+        "orange",
+        "purple",
+        "brown",
+        "pink",
+        "gray",
+        "olive",
+        "cyan",
+        "magenta",
+        "teal",
+        "navy",
+        "maroon",
+        "lime",
+        "indigo",
+        "coral",
+        "gold",
+        "crimson",
+        "darkgreen",
+    ]
+
+    idx = 0
 
-# Plot numeric fields (on secondary y-axis or right side if we have boolean fields)
-for field_name in sorted(numeric_fields):
-    if field_name not in df_plot.columns:
-        continue
+    # Plot boolean fields first (on primary y-axis or left side)
+    for field_name in sorted(boolean_fields):
+        if field_name not in df_plot.columns:
+            continue
 
-    color = colors[idx % len(colors)]
-    idx += 1
+        color = colors[idx % len(colors)]
+        idx += 1
+        x_values, field_values = trace_data(field_name)
+
+        # For boolean fields, convert to 0/1 for plotting
+        y_values = []
+        for val in field_values:
+            if pd.isna(val):
+                y_values.append(None)
+            elif val == True or val == 1 or val == 1.0:
+                y_values.append(1)
+            else:
+                y_values.append(0)
 
-    # For numeric fields, show actual values with lines and markers
-    if args.lightweight:
-        # Lightweight mode: no markers
         trace = go.Scatter(
-            x=df_plot["timestamp"],
-            y=df_plot[field_name],
+            x=x_values,
+            y=y_values,
             mode="lines",
-            name=f"{field_name} (num)",
-            line=dict(color=color, width=2),
-            hovertemplate="%{x}<br>" + field_name + ": %{y}<extra></extra>",
-        )
-    else:
-        # Regular mode: with markers
-        trace = go.Scatter(
-            x=df_plot["timestamp"],
-            y=df_plot[field_name],
-            mode="lines+markers",
-            name=f"{field_name} (num)",
-            line=dict(color=color, width=2),
-            marker=dict(size=4, color=color),
+            name=f"{field_name} (bool)",
+            line=dict(color=color, width=4),
+            connectgaps=False,
             hovertemplate="%{x}<br>" + field_name + ": %{y}<extra></extra>",
         )
 
-    if len(boolean_fields) > 0 and len(numeric_fields) > 0:
-        fig.add_trace(trace, secondary_y=True)
-    else:
-        fig.add_trace(trace)
+        if len(boolean_fields) > 0 and len(numeric_fields) > 0:
+            fig.add_trace(trace, secondary_y=False)
+        else:
+            fig.add_trace(trace)
 
-# Plot string fields (convert to categorical on secondary y-axis)
-for field_name in sorted(string_fields):
-    if field_name not in df_plot.columns:
-        continue
+    # Plot numeric fields (on secondary y-axis or right side if we have boolean fields)
+    for field_name in sorted(numeric_fields):
+        if field_name not in df_plot.columns:
+            continue
 
-    color = colors[idx % len(colors)]
-    idx += 1
+        color = colors[idx % len(colors)]
+        idx += 1
+        x_values, field_values = trace_data(field_name)
+
+        # For numeric fields, show actual values with lines and markers
+        if args.lightweight:
+            # Lightweight mode: no markers
+            trace = go.Scatter(
+                x=x_values,
+                y=field_values,
+                mode="lines",
+                name=f"{field_name} (num)",
+                line=dict(color=color, width=2),
+                hovertemplate="%{x}<br>" + field_name + ": %{y}<extra></extra>",
+            )
+        else:
+            # Regular mode: with markers
+            trace = go.Scatter(
+                x=x_values,
+                y=field_values,
+                mode="lines+markers",
+                name=f"{field_name} (num)",
+                line=dict(color=color, width=2),
+                marker=dict(size=4, color=color),
+                hovertemplate="%{x}<br>" + field_name + ": %{y}<extra></extra>",
+            )
 
-    # For string fields, show as categorical (convert to numeric codes)
-    # Get unique values and create a mapping
-    unique_vals = df_plot[field_name].dropna().unique()
-    val_to_num = {val: idx for idx, val in enumerate(unique_vals)}
+        if len(boolean_fields) > 0 and len(numeric_fields) > 0:
+            fig.add_trace(trace, secondary_y=True)
+        else:
+            fig.add_trace(trace)
 
-    y_values = [
-        val_to_num.get(val, None) if pd.notna(val) else None
-        for val in df_plot[field_name]
-    ]
+    # Plot string fields (convert to categorical on secondary y-axis)
+    for field_name in sorted(string_fields):
+        if field_name not in df_plot.columns:
+            continue
 
-    trace = go.Scatter(
-        x=df_plot["timestamp"],
-        y=y_values,
-        mode="lines+markers",
-        name=f"{field_name} (str)",
-        line=dict(color=color, width=2),
-        marker=dict(size=6, color=color),
-        text=[str(val) if pd.notna(val) else "" for val in df_plot[field_name]],
-        hovertemplate="%{x}<br>" + field_name + ": %{text}<extra></extra>",
-    )
+        color = colors[idx % len(colors)]
+        idx += 1
+        x_values, field_values = trace_data(field_name)
 
-    if len(boolean_fields) > 0 and len(numeric_fields) > 0:
-        fig.add_trace(trace, secondary_y=True)
-    else:
-        fig.add_trace(trace)
-
-# Update layout based on mode
-if args.lightweight:
-    # Lightweight mode - smaller file size
-    fig.update_layout(
-        title=f"Telemetry Data: {base_filename}",
-        xaxis_title="Time (UTC)",
-        xaxis=dict(type="date"),
-        hovermode="x unified",
-        showlegend=True,
-        height=700,
-    )
-    
-    # Set y-axis titles and format boolean axis
-    if len(boolean_fields) > 0 and len(numeric_fields) > 0:
-        fig.update_yaxes(
-            title_text="Boolean",
-            tickmode='array',
-            tickvals=[0, 1],
-            ticktext=['False', 'True'],
-            secondary_y=False
+        # For string fields, show as categorical (convert to numeric codes)
+        # Get unique values and create a mapping
+        unique_vals = field_values.dropna().unique()
+        val_to_num = {val: idx for idx, val in enumerate(unique_vals)}
+
+        y_values = [
+            val_to_num.get(val, None) if pd.notna(val) else None
+            for val in field_values
+        ]
+
+        trace = go.Scatter(
+            x=x_values,
+            y=y_values,
+            mode="lines+markers",
+            name=f"{field_name} (str)",
+            line=dict(color=color, width=2),
+            marker=dict(size=6, color=color),
+            text=[str(val) if pd.notna(val) else "" for val in field_values],
+            hovertemplate="%{x}<br>" + field_name + ": %{text}<extra></extra>",
         )
-        fig.update_yaxes(title_text="Numeric Values", secondary_y=True)
-    elif len(boolean_fields) > 0:
+
+        if len(boolean_fields) > 0 and len(numeric_fields) > 0:
+            fig.add_trace(trace, secondary_y=True)
+        else:
+            fig.add_trace(trace)
+
+    # Update layout based on mode
+    if args.lightweight:
+        # Lightweight mode - smaller file size
         fig.update_layout(
-            yaxis=dict(
-                title="Boolean",
+            title=f"Telemetry Data: {base_filename}",
+            xaxis_title="Time (UTC)",
+            xaxis=dict(type="date"),
+            hovermode="x unified",
+            showlegend=True,
+            height=700,
+        )
+
+        # Set y-axis titles and format boolean axis
+        if len(boolean_fields) > 0 and len(numeric_fields) > 0:
+            fig.update_yaxes(
+                title_text="Boolean",
                 tickmode='array',
                 tickvals=[0, 1],
-                ticktext=['False', 'True']
+                ticktext=['False', 'True'],
+                secondary_y=False
             )
+            fig.update_yaxes(title_text="Numeric Values", secondary_y=True)
+        elif len(boolean_fields) > 0:
+            fig.update_layout(
+                yaxis=dict(
+                    title="Boolean",
+                    tickmode='array',
+                    tickvals=[0, 1],
+                    ticktext=['False', 'True']
+                )
+            )
+        elif len(numeric_fields) > 0:
+            fig.update_layout(yaxis_title="Numeric Values")
+        else:
+            fig.update_layout(yaxis_title="Values")
+
+        # Write with CDN mode for smaller file size
+        config = {"displayModeBar": True, "displaylogo": False}
+        fig.write_html(
+            os.path.join(output_dir, f"{base_filename}_timeseries.html"),
+            config=config,
+            include_plotlyjs="cdn",
         )
-    elif len(numeric_fields) > 0:
-        fig.update_layout(yaxis_title="Numeric Values")
+        print(f"Graph saved as {os.path.join(output_dir, f'{base_filename}_timeseries.html')}")
     else:
-        fig.update_layout(yaxis_title="Values")
-    
-    # Write with CDN mode for smaller file size
-    config = {"displayModeBar": True, "displaylogo": False}
-    fig.write_html(
-        os.path.join(output_dir, f"{base_filename}_timeseries.html"),
-        config=config,
-        include_plotlyjs="cdn",
-    )
-    print(f"Graph saved as {os.path.join(output_dir, f'{base_filename}_timeseries.html')}")
-else:
-    # Regular mode - full features
-    fig.update_layout(
-        title=f"Telemetry Data: {base_filename}",
-        xaxis_title="Time (UTC)",
-        xaxis=dict(
-            type="date",
-            rangeslider=dict(visible=True),
-            rangeselector=dict(
-                buttons=list(
-                    [
-                        dict(count=1, label="1m", step="minute", stepmode="backward"),
-                        dict(count=5, label="5m", step="minute", stepmode="backward"),
-                        dict(count=15, label="15m", step="minute", stepmode="backward"),
-                        dict(count=1, label="1h", step="hour", stepmode="backward"),
-                        dict(step="all", label="All"),
-                    ]
-                )
+        # Regular mode - full features
+        fig.update_layout(
+            title=f"Telemetry Data: {base_filename}",
+            xaxis_title="Time (UTC)",
+            xaxis=dict(
+                type="date",
+                rangeslider=dict(visible=True),
+                rangeselector=dict(
+                    buttons=list(
+                        [
+                            dict(count=1, label="1m", step="minute", stepmode="backward"),
+                            dict(count=5, label="5m", step="minute", stepmode="backward"),
+                            dict(count=15, label="15m", step="minute", stepmode="backward"),
+                            dict(count=1, label="1h", step="hour", stepmode="backward"),
+                            dict(step="all", label="All"),
+                        ]
+                    )
+                ),
             ),
-        ),
-        hovermode="x unified",
-        showlegend=True,
-        height=700,
-    )
-    
-    # Set y-axis titles and format boolean axis
-    if len(boolean_fields) > 0 and len(numeric_fields) > 0:
-        fig.update_yaxes(
-            title_text="Boolean",
-            tickmode='array',
-            tickvals=[0, 1],
-            ticktext=['False', 'True'],
-            secondary_y=False
+            hovermode="x unified",
+            showlegend=True,
+            height=700,
         )
-        fig.update_yaxes(title_text="Numeric Values", secondary_y=True)
-    elif len(boolean_fields) > 0:
-        fig.update_layout(
-            yaxis=dict(
-                title="Boolean",
+
+        # Set y-axis titles and format boolean axis
+        if len(boolean_fields) > 0 and len(numeric_fields) > 0:
+            fig.update_yaxes(
+                title_text="Boolean",
                 tickmode='array',
                 tickvals=[0, 1],
-                ticktext=['False', 'True']
+                ticktext=['False', 'True'],
+                secondary_y=False
             )
-        )
-    elif len(numeric_fields) > 0:
-        fig.update_layout(yaxis_title="Numeric Values")
-    else:
-        fig.update_layout(yaxis_title="Values")
-    
-    # Save HTML
-    output_file_html = os.path.join(output_dir, f"{base_filename}_timeseries.html")
-    fig.write_html(output_file_html)
-    print(f"Graph saved as {output_file_html}")
-
-# Save PNG if requested
-if args.png:
-    output_file_png = os.path.join(output_dir, f"{base_filename}_timeseries.png")
-    try:
-        import kaleido
-
-        print(f"Kaleido version: {kaleido.__version__}")
-        print(f"Attempting to save PNG to: {output_file_png}")
-
-        # Make sure the figure has data
-        if len(fig.data) == 0:
-            print("Warning: Figure has no data traces. Skipping PNG export.")
+            fig.update_yaxes(title_text="Numeric Values", secondary_y=True)
+        elif len(boolean_fields) > 0:
+            fig.update_layout(
+                yaxis=dict(
+                    title="Boolean",
+                    tickmode='array',
+                    tickvals=[0, 1],
+                    ticktext=['False', 'True']
+                )
+            )
+        elif len(numeric_fields) > 0:
+            fig.update_layout(yaxis_title="Numeric Values")
         else:
-            fig.write_image(output_file_png, width=1920, height=1080, format="png")
+            fig.update_layout(yaxis_title="Values")
+
+        # Save HTML
+        output_file_html = os.path.join(output_dir, f"{base_filename}_timeseries.html")
+        fig.write_html(output_file_html)
+        print(f"Graph saved as {output_file_html}")
 
-            # Check if file was created
-            if os.path.exists(output_file_png):
-                file_size = os.path.getsize(output_file_png)
-                print(f"Graph saved as {output_file_png} ({file_size} bytes)")
+    # Save PNG if requested
+    if args.png:
+        output_file_png = os.path.join(output_dir, f"{base_filename}_timeseries.png")
+        try:
+            import kaleido
+
+            print(f"Kaleido version: {kaleido.__version__}")
+            print(f"Attempting to save PNG to: {output_file_png}")
+
+            # Make sure the figure has data
+            if len(fig.data) == 0:
+                print("Warning: Figure has no data traces. Skipping PNG export.")
             else:
-                print(f"PNG file was not created at {output_file_png}")
-
-    except ImportError as e:
-        print(f"Kaleido import error: {e}")
-        print(f"Install with: pip install -U kaleido")
-    except Exception as e:
-        print(f"Could not save PNG. Error details:")
-        print(f"  Error type: {type(e).__name__}")
-        print(f"  Error message: {str(e)}")
-
-print("\n=== Analysis Complete ===")
-print(f"Total records processed: {len(df)}")
-print(f"Records used for visualization: {len(df_plot)}")
-print(f"Fields extracted: {', '.join(sorted(value_columns))}")
-print(f"Field types: {field_types}")
\ No newline at end of file
+                fig.write_image(output_file_png, width=1920, height=1080, format="png")
+
+                # Check if file was created
+                if os.path.exists(output_file_png):
+                    file_size = os.path.getsize(output_file_png)
+                    print(f"Graph saved as {output_file_png} ({file_size} bytes)")
+                else:
+                    print(f"PNG file was not created at {output_file_png}")
+
+        except ImportError as e:
+            print(f"Kaleido import error: {e}")
+            print(f"Install with: pip install -U kaleido")
+        except Exception as e:
+            print(f"Could not save PNG. Error details:")
+            print(f"  Error type: {type(e).__name__}")
+            print(f"  Error message: {str(e)}")
+
+    render.end()
+
+    print("\n=== Analysis Complete ===")
+    print(f"Total records processed: {len(df)}")
+    if args.downsample == "state":
+        print(f"Records used for visualization: {len(df_plot)}")
+    else:
+        print(f"Points used for visualization: {sum(len(trace.x) for trace in fig.data)}")
+    print(f"Fields extracted: {', '.join(sorted(value_columns))}")
+    print(f"Field types: {field_types}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,220 @@
+import array
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+
+import timestamps
+
+# ============================================================
+# TYPED ARRAY SERIES
+# ============================================================
+#
+# One point costs 8 bytes of UTC nanoseconds, 2 bytes of UTC offset and 1-8
+# bytes of value instead of a datetime and a Python value in two lists
+# (~150 bytes). The columns grow as array.array while records are read, which
+# also keeps the worker results small to send, and become NumPy arrays once
+# the chunks are joined.
+
+# UTC offset of naive timestamps, as in jsonl_index
+NO_OFFSET = np.iinfo(np.int16).min
+
+# Value column typecode per Python type, everything else is stored as
+# category codes ("c") into a list of the distinct values
+TYPECODES = {bool: "b", int: "q", float: "d"}
+DTYPES = {"b": np.int8, "q": np.int64, "d": np.float64, "c": np.int32}
+
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+
+def utc_offset(dt):
+    """UTC offset of a datetime in minutes, NO_OFFSET when it is naive"""
+    offset = dt.utcoffset()
+    if offset is None:
+        return NO_OFFSET
+    return int(offset.total_seconds()) // 60
+
+
+def category_key(value):
+    """Key of a category value, the type keeps 1, 1.0 and True apart"""
+    try:
+        hash(value)
+    except TypeError:
+        return type(value), repr(value)
+    return type(value), value
+
+
+class Series:
+    """
+    Timestamps and values of one field. append() while reading, join() the
+    chunk results, sort() them, select with window() and changes(), then read
+    them back with x(), y() and rows().
+    """
+
+    __slots__ = ("ns", "offsets", "values", "kind", "codes", "labels")
+
+    def __init__(self):
+        self.ns = array.array("q")
+        self.offsets = array.array("h")
+        self.values = None
+        self.kind = None
+        self.codes = {}
+        self.labels = []
+
+    def __len__(self):
+        return len(self.ns)
+
+    def append(self, dt, value):
+        kind = TYPECODES.get(type(value), "c")
+        if kind != self.kind:
+            self._convert(kind)
+
+        if self.kind == "c":
+            self.values.append(self._code(value))
+        else:
+            try:
+                self.values.append(value)
+            except OverflowError:  # int beyond 64 bits
+                self._convert("c")
+                self.values.append(self._code(value))
+
+        self.ns.append(timestamps.datetime_ns(dt))
+        self.offsets.append(utc_offset(dt))
+
+    def _code(self, value):
+        key = category_key(value)
+        code = self.codes.get(key)
+        if code is None:
+            code = self.codes[key] = len(self.labels)
+            self.labels.append(value)
+        return code
+
+    def _convert(self, kind):
+        """Start the value column, or switch to categories when a second type shows up"""
+        if self.kind is None:
+            self.kind = kind
+            self.values = array.array("i" if kind == "c" else kind)
+        elif self.kind != "c":
+            values = self.values.tolist()
+            if self.kind == "b":
+                values = [bool(v) for v in values]
+            self.kind = "c"
+            self.values = array.array("i", [self._code(v) for v in values])
+
+    def _category_values(self):
+        """Values as category codes, for joining series of different kinds"""
+        if self.kind == "c":
+            return self.labels, np.asarray(self.values, dtype=np.int32)
+        categories = Series()
+        codes = [categories._code(value) for value in self.value_array().tolist()]
+        return categories.labels, np.asarray(codes, dtype=np.int32)
+
+    def value_array(self):
+        """Value column as NumPy array, bool values as bool"""
+        values = np.asarray(self.values, dtype=DTYPES[self.kind])
+        if self.kind == "b":
+            return values.astype(bool)
+        return values
+
+    @classmethod
+    def join(cls, parts):
+        """One series of the parts in order, category codes are merged"""
+        parts = [part for part in parts if len(part)]
+        joined = cls()
+        if not parts:
+            return joined
+
+        joined.ns = np.concatenate([np.asarray(part.ns, dtype=np.int64) for part in parts])
+        joined.offsets = np.concatenate([np.asarray(part.offsets, dtype=np.int16) for part in parts])
+
+        kinds = {part.kind for part in parts}
+        if len(kinds) == 1 and "c" not in kinds:
+            joined.kind = kinds.pop()
+            joined.values = np.concatenate([np.asarray(part.values, dtype=DTYPES[joined.kind]) for part in parts])
+            return joined
+
+        joined.kind = "c"
+        values = []
+        for part in parts:
+            labels, codes = part._category_values()
+            remap = np.array([joined._code(label) for label in labels], dtype=np.int32)
+            values.append(remap[codes])
+        joined.values = np.concatenate(values)
+        return joined
+
+    def take(self, index):
+        """Points at index, a slice, a boolean mask or positions"""
+        taken = Series()
+        taken.ns = np.asarray(self.ns)[index]
+        taken.offsets = np.asarray(self.offsets)[index]
+        taken.values = np.asarray(self.values)[index]
+        taken.kind = self.kind
+        taken.codes = self.codes
+        taken.labels = self.labels
+        return taken
+
+    def changes(self):
+        """Mask of the points whose value differs from the previous point"""
+        values = np.asarray(self.values)
+        keep = np.ones(len(values), dtype=bool)
+        if self.kind == "c":
+            # Python equality across types, e.g. 1 == 1.0 == True
+            decoded = [self.labels[code] for code in values.tolist()]
+            keep[1:] = [not (a == b) for a, b in zip(decoded[1:], decoded)]
+        elif self.kind == "d":
+            # NaN != NaN keeps every NaN, like comparing Python floats
+            keep[1:] = ~(values[1:] == values[:-1])
+        else:
+            keep[1:] = values[1:] != values[:-1]
+        return keep
+
+    def between(self, start=None, end=None):
+        """Mask of the points from start to end (datetimes, both included), None is open"""
+        ns = np.asarray(self.ns, dtype=np.int64)
+        keep = np.ones(len(ns), dtype=bool)
+        if start is not None:
+            keep &= ns >= timestamps.datetime_ns(start)
+        if end is not None:
+            keep &= ns <= timestamps.datetime_ns(end)
+        return keep
+
+    def sort(self):
+        """Points in time order, points with the same time keep their order"""
+        return self.take(np.argsort(np.asarray(self.ns), kind="stable"))
+
+    def window(self, start=None, end=None):
+        """
+        Points of a sorted series from start to end (datetimes, both included),
+        None is open. The points are a view, not a copy, so one sorted series
+        can be sliced for many windows.
+        """
+        ns = np.asarray(self.ns, dtype=np.int64)
+        first = 0 if start is None else int(np.searchsorted(ns, timestamps.datetime_ns(start), "left"))
+        last = len(ns) if end is None else int(np.searchsorted(ns, timestamps.datetime_ns(end), "right"))
+        return self.take(slice(first, max(first, last)))
+
+    def x(self):
+        """Timestamps as UTC datetime64, for plotting"""
+        return np.asarray(self.ns, dtype=np.int64).view("datetime64[ns]")
+
+    def y(self):
+        """Values as NumPy array, categories are decoded"""
+        if self.kind == "c":
+            labels = np.empty(len(self.labels), dtype=object)
+            labels[:] = self.labels
+            return labels[np.asarray(self.values)]
+        return self.value_array()
+
+    def rows(self):
+        """(datetime, value) pairs with the original UTC offsets"""
+        if self.kind == "c":
+            values = [self.labels[code] for code in np.asarray(self.values).tolist()]
+        else:
+            values = self.value_array().tolist()
+
+        for ns, minutes, value in zip(np.asarray(self.ns).tolist(), np.asarray(self.offsets).tolist(), values):
+            dt = EPOCH + timedelta(microseconds=ns // 1000)
+            if minutes == NO_OFFSET:
+                dt = dt.replace(tzinfo=None)
+            else:
+                dt = dt.astimezone(timestamps.fixed_zone(minutes))
+            yield dt, value
@@ -0,0 +1,275 @@
+import hashlib
+import json
+import os
+import shutil
+
+import jsonl_index
+import jsonl_reader
+
+# pyarrow is imported by available(), only when the cache is used
+pa = None
+pq = None
+
+# ============================================================
+# COLUMNAR CACHE OF PARSED JSONL EXPORTS
+# ============================================================
+#
+# <export>.jsonl.cache/<fingerprint>/
+#     manifest.json              line/record counts and the cached message types
+#     <type key>/<part>.parquet  one directory per messageContentType
+#
+# Each part holds the raw timestamp string, the messageContentType, an _order
+# column restoring file order across types and one column per flattened payload
+# leaf ("message.ExpirationTime.Nanos"). The types are keyed by
+# jsonl_index.type_key(), like the type index. The fingerprint covers path,
+# size and mtime, so a changed export is parsed again and old fingerprints are
+# removed. Every process builds into its own <fingerprint>.<pid>.tmp directory,
+# so concurrent builds do not remove each other's parts.
+#
+# Nested objects are only stored as their leaves. The manifest lists the
+# paths that held an object in some record, readers asking for one of them
+# need the JSONL file, see object_columns().
+
+CACHE_SUFFIX = ".cache"
+CACHE_VERSION = 3
+TMP_SUFFIX = ".tmp"
+MANIFEST_FILE = "manifest.json"
+
+TS_COLUMN = "timestamp"
+TYPE_COLUMN = "messageContentType"
+ORDER_COLUMN = "_order"
+
+# Rows per type buffered in a worker before a part is written
+BATCH_ROWS = 50_000
+
+# Schema metadata key listing columns stored as JSON text (lists, objects, mixed types)
+JSON_COLUMNS_KEY = b"json_columns"
+
+
+def available():
+    """True when pyarrow is installed and the cache can be used"""
+    global pa, pq
+    if pa is None:
+        try:
+            import pyarrow  # type: ignore
+            import pyarrow.parquet  # type: ignore
+        except Exception:
+            return False
+        pa, pq = pyarrow, pyarrow.parquet
+    return True
+
+
+def fingerprint(path):
+    """Cache key of a source file from its path, size and modification time"""
+    stat = os.stat(path)
+    key = f"{os.path.abspath(path)}|{stat.st_size}|{stat.st_mtime_ns}|{CACHE_VERSION}"
+    return hashlib.sha1(key.encode("utf-8")).hexdigest()[:16]
+
+
+def type_key(message_type):
+    """Directory name of a message type inside the cache"""
+    if message_type is None:
+        return "untyped"
+    return hashlib.sha1(str(message_type).encode("utf-8")).hexdigest()[:16]
+
+
+def flatten(obj, prefix="", out=None, objects=None):
+    """
+    Flatten nested objects into dot separated leaf columns, the paths of the
+    flattened objects are added to objects when given.
+    """
+    if out is None:
+        out = {}
+    for key, value in obj.items():
+        name = f"{prefix}{key}"
+        if isinstance(value, dict) and value:
+            if objects is not None:
+                objects.add(name)
+            flatten(value, name + ".", out, objects)
+        else:
+            out[name] = value
+    return out
+
+
+def _to_table(rows):
+    """Build an Arrow table from row dicts, storing unsupported columns as JSON text"""
+    names = {}
+    for row in rows:
+        for name in row:
+            names.setdefault(name, None)
+
+    arrays = {}
+    json_columns = []
+    for name in names:
+        values = [row.get(name) for row in rows]
+        # Mixed Python types (1 and 1.5, True and 1) would be coerced by Arrow,
+        # JSON text gives back exactly what json.loads produced
+        kinds = {type(v) for v in values if v is not None}
+        try:
+            if len(kinds) > 1 or kinds & {dict, list}:
+                raise TypeError("mixed or nested values")
+            arrays[name] = pa.array(values)
+        except (TypeError, ValueError, pa.ArrowException):
+            arrays[name] = pa.array(
+                [None if v is None else json.dumps(v) for v in values], pa.string()
+            )
+            json_columns.append(name)
+
+    table = pa.table(arrays)
+    return table.replace_schema_metadata(
+        {JSON_COLUMNS_KEY: json.dumps(json_columns).encode("utf-8")}
+    )
+
+
+def build_chunk(path, start, end, encoding, target_dir, lines=None):
+    """Parse one byte range and write its records as per-type parquet parts"""
+    available()  # workers that were spawned rather than forked import the module again
+    batches = {}
+    parts = {}
+    objects = set()
+    count = 0
+
+    def flush(message_type):
+        rows = batches.pop(message_type)
+        type_dir = os.path.join(target_dir, type_key(message_type))
+        os.makedirs(type_dir, exist_ok=True)
+        entry = parts.setdefault(message_type, {"rows": 0, "parts": 0})
+        part_file = os.path.join(type_dir, f"{start:016d}-{entry['parts']:06d}.parquet")
+        pq.write_table(_to_table(rows), part_file)
+        entry["rows"] += len(rows)
+        entry["parts"] += 1
+
+    for line in jsonl_reader.iter_lines(path, start, end, encoding, lines):
+        # Byte offset of the chunk plus the line index is unique and keeps file order
+        order = start + count
+        count += 1
+        try:
+            obj = jsonl_reader.loads(line)
+        except ValueError:
+            continue
+        if not isinstance(obj, dict):
+            continue
+
+        message_type = jsonl_index.type_key(obj)
+        row = flatten(obj, objects=objects)
+        row[TYPE_COLUMN] = message_type
+        row[ORDER_COLUMN] = order
+
+        batch = batches.setdefault(message_type, [])
+        batch.append(row)
+        if len(batch) >= BATCH_ROWS:
+            flush(message_type)
+
+    for message_type in list(batches):
+        flush(message_type)
+
+    return count, parts, objects
+
+
+def open_cache(path, encoding="utf-8", workers=None):
+    """
+    Return the manifest of the cache for path, parsing the JSONL file first
+    if there is no cache for its current fingerprint.
+    """
+    root = path + CACHE_SUFFIX
+    key = fingerprint(path)
+    cache_path = os.path.join(root, key)
+    manifest_file = os.path.join(cache_path, MANIFEST_FILE)
+
+    if os.path.exists(manifest_file):
+        with open(manifest_file, "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+        print(f"Using columnar cache {cache_path}")
+        manifest["path"] = cache_path
+        return manifest
+
+    print(f"Building columnar cache {cache_path}")
+    tmp_path = f"{cache_path}.{os.getpid()}{TMP_SUFFIX}"
+    shutil.rmtree(tmp_path, ignore_errors=True)
+    os.makedirs(tmp_path)
+
+    lines = 0
+    types = {}
+    objects = set()
+    for chunk_lines, chunk_parts, chunk_objects in jsonl_reader.map_chunks(
+        build_chunk, path, tmp_path, workers=workers, encoding=encoding
+    ):
+        lines += chunk_lines
+        objects.update(chunk_objects)
+        for message_type, entry in chunk_parts.items():
+            types[message_type] = types.get(message_type, 0) + entry["rows"]
+
+    manifest = {
+        "version": CACHE_VERSION,
+        "source": os.path.abspath(path),
+        "lines": lines,
+        "records": sum(types.values()),
+        "types": [
+            {"messageContentType": t, "dir": type_key(t), "rows": rows}
+            for t, rows in types.items()
+        ],
+        "objects": sorted(objects),
+    }
+    with open(os.path.join(tmp_path, MANIFEST_FILE), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=1)
+
+    # Drop the finished caches of older versions of the file, then publish
+    # the new one. Builds of other processes are left alone
+    for entry in os.listdir(root):
+        if entry != key and not entry.endswith(TMP_SUFFIX):
+            shutil.rmtree(os.path.join(root, entry), ignore_errors=True)
+    try:
+        os.replace(tmp_path, cache_path)
+    except OSError:
+        if not os.path.exists(manifest_file):
+            raise
+        # Another process published the same fingerprint first
+        shutil.rmtree(tmp_path, ignore_errors=True)
+
+    manifest["path"] = cache_path
+    return manifest
+
+
+def object_columns(manifest, columns):
+    """Requested columns that hold a nested object in some record, the cache only has their leaves"""
+    objects = set(manifest["objects"])
+    return [column for column in columns if column in objects]
+
+
+def load_columns(manifest, message_types, columns):
+    """
+    Load only the requested columns of the requested message types.
+    Returns {messageContentType: {column: [values in file order]}}, columns
+    missing from a part are filled with None.
+    """
+    wanted = list(dict.fromkeys([TS_COLUMN, ORDER_COLUMN] + list(columns)))
+    result = {}
+
+    for entry in manifest["types"]:
+        message_type = entry["messageContentType"]
+        if message_type not in message_types:
+            continue
+
+        data = {name: [] for name in wanted}
+        type_dir = os.path.join(manifest["path"], entry["dir"])
+        for part in sorted(os.listdir(type_dir)):
+            part_file = os.path.join(type_dir, part)
+            schema = pq.read_schema(part_file)
+            present = [name for name in wanted if name in schema.names]
+            table = pq.read_table(part_file, columns=present)
+            json_columns = json.loads((schema.metadata or {}).get(JSON_COLUMNS_KEY, b"[]"))
+
+            for name in wanted:
+                if name not in present:
+                    data[name].extend([None] * table.num_rows)
+                elif name in json_columns:
+                    data[name].extend(
+                        None if v is None else json.loads(v)
+                        for v in table.column(name).to_pylist()
+                    )
+                else:
+                    data[name].extend(table.column(name).to_pylist())
+
+        result[message_type] = data
+
+    return result
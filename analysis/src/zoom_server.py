@@ -0,0 +1,246 @@
+import html
+import json
+import math
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import numpy as np
+
+import downsampling
+
+# ============================================================
+# DYNAMIC ZOOM SERVER
+# ============================================================
+#
+# The full extracted columns stay in memory as NumPy arrays. The browser asks
+# /data for the visible time range on every zoom or pan and gets back only
+# that window, downsampled to the point budget, so any zoom level shows full
+# resolution without shipping every sample to the browser.
+
+NS_PER_MS = 1_000_000
+
+# Largest start/end in ms whose nanoseconds still fit the int64 timestamps
+MAX_MS = np.iinfo(np.int64).max // NS_PER_MS
+
+
+class Trace:
+    """One plotted field: sorted int64 nanosecond timestamps and float values"""
+
+    def __init__(self, name, kind, x, y, labels=None, secondary_y=False):
+        self.name = name
+        self.kind = kind  # "boolean", "numeric" or "string"
+        self.x = x
+        self.y = y
+        self.labels = labels  # category names for string traces, y holds the codes
+        self.secondary_y = secondary_y
+
+    def window(self, start_ns, end_ns, max_points, algorithm):
+        """Points of the visible range, one point outside on each side keeps lines continuous"""
+        lo = max(0, int(np.searchsorted(self.x, start_ns, "left")) - 1)
+        hi = min(len(self.x), int(np.searchsorted(self.x, end_ns, "right")) + 1)
+        x = self.x[lo:hi]
+        y = self.y[lo:hi]
+
+        if self.kind == "numeric":
+            keep = downsampling.ALGORITHMS[algorithm](x, y, max_points)
+        else:
+            keep = downsampling.state_edges(y)
+            if self.kind != "boolean" and len(keep) > max_points:
+                picks = np.linspace(0, len(keep) - 1, max_points).round().astype(int)
+                keep = np.unique(keep[picks])
+
+        data = {
+            "name": self.name,
+            "kind": self.kind,
+            "secondary_y": self.secondary_y,
+            "total": len(x),
+            "x": (x[keep] // NS_PER_MS).tolist(),
+            "y": y[keep].tolist(),
+        }
+        if self.labels is not None:
+            data["text"] = [self.labels[int(code)] for code in y[keep]]
+        return data
+
+
+class TraceStore:
+    """All traces of one export plus the downsampling settings of the server"""
+
+    def __init__(self, title, traces, max_points=1000, algorithm="lttb"):
+        self.title = title
+        self.traces = traces
+        self.max_points = max_points
+        self.algorithm = algorithm
+
+    def bounds(self):
+        starts = [t.x[0] for t in self.traces if len(t.x)]
+        ends = [t.x[-1] for t in self.traces if len(t.x)]
+        if not starts:
+            return 0, 0
+        return int(min(starts)), int(max(ends))
+
+    def query(self, start_ns=None, end_ns=None, max_points=None):
+        first, last = self.bounds()
+        start_ns = first if start_ns is None else start_ns
+        end_ns = last if end_ns is None else end_ns
+        max_points = max_points or self.max_points
+        return {
+            "range": [start_ns // NS_PER_MS, end_ns // NS_PER_MS],
+            "traces": [
+                t.window(start_ns, end_ns, max_points, self.algorithm)
+                for t in self.traces
+            ],
+        }
+
+
+PAGE = """<!DOCTYPE html>
+<html>
+<head>
+<meta charset="utf-8">
+<title>{title}</title>
+<script src="/plotly.js"></script>
+</head>
+<body style="margin:0">
+<div id="plot" style="width:100%;height:95vh"></div>
+<div id="status" style="font:12px sans-serif;padding:2px 8px"></div>
+<script>
+const plot = document.getElementById("plot");
+const status = document.getElementById("status");
+const title = {title_json};
+let pending = null;
+
+function toMs(value) {{
+  return typeof value === "number" ? value : Date.parse(value.replace(" ", "T") + "Z");
+}}
+
+function render(data, range) {{
+  const secondary = data.traces.some(t => t.secondary_y) && data.traces.some(t => !t.secondary_y);
+  const traces = data.traces.map(t => ({{
+    name: t.name + " (" + t.kind.slice(0, 4) + ")",
+    x: t.x,
+    y: t.y,
+    text: t.text,
+    mode: t.kind === "boolean" ? "lines" : "lines+markers",
+    line: {{shape: t.kind === "numeric" ? "linear" : "hv", width: t.kind === "boolean" ? 4 : 2}},
+    marker: {{size: 4}},
+    yaxis: secondary && t.secondary_y ? "y2" : "y",
+    hovertemplate: "%{{x}}<br>" + t.name + ": " + (t.text ? "%{{text}}" : "%{{y}}") + "<extra></extra>",
+  }}));
+  const layout = {{
+    title: title,
+    uirevision: "zoom",
+    hovermode: "x unified",
+    xaxis: {{title: "Time (UTC)", type: "date", range: range}},
+    yaxis: {{title: secondary ? "Boolean" : "Values"}},
+  }};
+  if (secondary) {{
+    layout.yaxis2 = {{title: "Numeric Values", overlaying: "y", side: "right"}};
+  }}
+  Plotly.react(plot, traces, layout, {{displaylogo: false}});
+  if (!plot.dataset.bound) {{
+    plot.dataset.bound = "1";
+    plot.on("plotly_relayout", onRelayout);
+  }}
+  const shown = data.traces.reduce((n, t) => n + t.x.length, 0);
+  const total = data.traces.reduce((n, t) => n + t.total, 0);
+  status.textContent = shown + " of " + total + " points in view";
+}}
+
+function load(start, end) {{
+  const points = Math.max(200, Math.round(plot.clientWidth));
+  let url = "/data?points=" + points;
+  if (start !== undefined) url += "&start=" + Math.floor(start) + "&end=" + Math.ceil(end);
+  if (pending) pending.abort();
+  pending = new AbortController();
+  fetch(url, {{signal: pending.signal}})
+    .then(r => r.json())
+    .then(data => render(data, start !== undefined ? [start, end] : data.range))
+    .catch(() => {{}});
+}}
+
+function onRelayout(ev) {{
+  if (ev["xaxis.autorange"]) {{
+    load();
+  }} else if (ev["xaxis.range[0]"] !== undefined) {{
+    load(toMs(ev["xaxis.range[0]"]), toMs(ev["xaxis.range[1]"]));
+  }} else if (ev["xaxis.range"]) {{
+    load(toMs(ev["xaxis.range"][0]), toMs(ev["xaxis.range"][1]));
+  }}
+}}
+
+load();
+</script>
+</body>
+</html>
+"""
+
+
+def query_number(query, name):
+    """Integer of a query parameter, None when it is missing, ValueError when it is no finite number in range"""
+    if name not in query:
+        return None
+    value = float(query[name][0])
+    if not math.isfinite(value) or abs(value) > MAX_MS:
+        raise ValueError(f"{name} is out of range")
+    return int(value)
+
+
+def render_page(title):
+    """The page with the title escaped for HTML and for the script block"""
+    title_json = json.dumps(title).replace("</", "<\\/")
+    return PAGE.format(title=html.escape(title), title_json=title_json)
+
+
+def make_handler(store, plotly_js):
+    """Request handler bound to one TraceStore"""
+
+    class ZoomHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            url = urlparse(self.path)
+            if url.path == "/":
+                self.send_body(render_page(store.title).encode("utf-8"), "text/html; charset=utf-8")
+            elif url.path == "/plotly.js":
+                self.send_body(plotly_js, "application/javascript")
+            elif url.path == "/data":
+                query = parse_qs(url.query)
+                try:
+                    start_ms = query_number(query, "start")
+                    end_ms = query_number(query, "end")
+                    points = query_number(query, "points")
+                except ValueError as e:
+                    self.send_error(400, str(e))
+                    return
+
+                data = store.query(
+                    None if start_ms is None else start_ms * NS_PER_MS,
+                    None if end_ms is None else end_ms * NS_PER_MS,
+                    None if points is None else max(1, points),
+                )
+                self.send_body(json.dumps(data).encode("utf-8"), "application/json")
+            else:
+                self.send_error(404)
+
+        def send_body(self, body, content_type):
+            self.send_response(200)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass  # keep the console for the analysis output
+
+    return ZoomHandler
+
+
+def serve(store, host="127.0.0.1", port=8050):
+    """Serve the zoomable plot until interrupted"""
+    from plotly.offline import get_plotlyjs
+
+    server = ThreadingHTTPServer((host, port), make_handler(store, get_plotlyjs().encode("utf-8")))
+    print(f"Serving zoomable plot on http://{host}:{server.server_port}/ (Ctrl+C to stop)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\nServer stopped")
+    finally:
+        server.server_close()
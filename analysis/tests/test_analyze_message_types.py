@@ -0,0 +1,142 @@
+import io
+import json
+import os
+import statistics
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+SRC_DIR = os.path.normpath(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+sys.path.insert(0, SRC_DIR)
+
+import analyze_message_types  # noqa: E402
+import jsonl_reader  # noqa: E402
+
+try:
+    import pandas as pd
+except ImportError:
+    pd = None
+
+
+def percentile(values, q):
+    """Linear interpolation between the closest ranks, like np.percentile"""
+    values = sorted(values)
+    rank = (len(values) - 1) * q / 100
+    low = int(rank)
+    high = min(low + 1, len(values) - 1)
+    return values[low] + (values[high] - values[low]) * (rank - low)
+
+
+@unittest.skipIf(pd is None, "pandas is not installed")
+class IntervalTest(unittest.TestCase):
+    def test_statistics_match_the_python_loop(self):
+        seconds = [0, 1, 1.5, 1.5, 4, 10, 10.25, 11, 30, 31]
+        strings = [f"2026-01-26T07:00:{s:09.6f}+01:00" for s in reversed(seconds)]
+        parsed = analyze_message_types.parse_timestamps(strings)
+        intervals, stats = analyze_message_types.interval_statistics(parsed)
+
+        expected = [b - a for a, b in zip(seconds, seconds[1:])]
+        self.assertEqual(intervals.tolist(), expected)
+        self.assertAlmostEqual(stats["avg"], statistics.mean(expected))
+        self.assertEqual((stats["min"], stats["max"]), (0.0, 19.0))
+        self.assertAlmostEqual(stats["median"], statistics.median(expected))
+        self.assertAlmostEqual(stats["p95"], percentile(expected, 95))
+        self.assertAlmostEqual(stats["p99"], percentile(expected, 99))
+        self.assertAlmostEqual(stats["std"], statistics.pstdev(expected))
+
+    def test_mixed_utc_offsets_are_compared_in_utc(self):
+        parsed = analyze_message_types.parse_timestamps(
+            ["2026-01-26T07:00:10+01:00", "2026-01-26T06:00:00+00:00", "2026-01-26T08:00:05+02:00"]
+        )
+        intervals, _ = analyze_message_types.interval_statistics(parsed)
+        self.assertEqual(intervals.tolist(), [5.0, 5.0])
+
+    def test_single_and_invalid_timestamps(self):
+        parsed = analyze_message_types.parse_timestamps(["2026-01-26T07:00:00+01:00", "not a time"])
+        self.assertEqual(len(parsed), 1)
+        intervals, stats = analyze_message_types.interval_statistics(parsed)
+        self.assertEqual((len(intervals), stats), (0, {}))
+
+
+def export_lines(start, count):
+    lines = []
+    for i in range(start, start + count):
+        record = {"messageContentType": ["A", "B", "C"][i % 3], "timestamp": f"2026-01-26T07:{i // 60 % 60:02d}:{i % 60:02d}+01:00"}
+        if i % 10 == 9:
+            del record["messageContentType"]
+        lines.append(json.dumps(record) + "\n")
+    return "".join(lines)
+
+
+@unittest.skipIf(pd is None, "pandas is not installed")
+class IncrementalTest(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.path = os.path.join(tmp.name, "export.jsonl")
+        self.append(export_lines(0, 200))
+
+        patcher = mock.patch("sys.stdout", io.StringIO())
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def append(self, text, mode="a"):
+        with open(self.path, mode, encoding="utf-8") as f:
+            f.write(text)
+
+    def full_count(self):
+        lines, records, types = analyze_message_types.count_chunk(self.path, 0, os.path.getsize(self.path), "utf-8")
+        return lines, records, {
+            msg_type: (data["count"], analyze_message_types.parse_timestamps(data["timestamps"]).tolist())
+            for msg_type, data in types.items()
+        }
+
+    def incremental_count(self):
+        with mock.patch.object(jsonl_reader, "map_chunks", wraps=jsonl_reader.map_chunks) as scan:
+            lines, records, types = analyze_message_types.count_incremental(self.path, workers=1)
+        self.read_from = [call.kwargs["start"] for call in scan.call_args_list]
+        return lines, records, {
+            msg_type: (data["count"], data["timestamps"].tolist())
+            for msg_type, data in types.items()
+        }
+
+    def checkpoint_offset(self):
+        return analyze_message_types.load_checkpoint(self.path)["offset"]
+
+    def test_appended_records_are_added(self):
+        self.assertEqual(self.incremental_count(), self.full_count())
+        self.assertEqual(self.read_from, [0])
+        first_size = os.path.getsize(self.path)
+        self.assertEqual(self.checkpoint_offset(), first_size)
+
+        self.append(export_lines(200, 150))
+        self.assertEqual(self.incremental_count(), self.full_count())
+        # Only the appended bytes are decoded
+        self.assertEqual(self.read_from, [first_size])
+        self.assertEqual(self.checkpoint_offset(), os.path.getsize(self.path))
+
+    def test_partial_trailing_line_is_read_again(self):
+        self.incremental_count()
+        complete = os.path.getsize(self.path)
+        line = export_lines(200, 1)
+        self.append(line[:25])
+
+        # The unfinished line counts as a line of this run, but stays out of the checkpoint
+        self.assertEqual(self.incremental_count(), self.full_count())
+        self.assertEqual(self.checkpoint_offset(), complete)
+
+        self.append(line[25:] + export_lines(201, 20))
+        self.assertEqual(self.incremental_count(), self.full_count())
+        self.assertEqual(self.read_from, [complete])
+        self.assertEqual(self.checkpoint_offset(), os.path.getsize(self.path))
+
+    def test_rewritten_file_is_read_from_the_start(self):
+        self.incremental_count()
+        self.append(export_lines(1000, 250), mode="w")
+        self.assertEqual(self.incremental_count(), self.full_count())
+        self.assertEqual(self.read_from, [0])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,100 @@
+import contextlib
+import csv
+import io
+import json
+import os
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+SRC_DIR = os.path.normpath(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+sys.path.insert(0, SRC_DIR)
+
+with contextlib.redirect_stdout(io.StringIO()):
+    import batch_plots  # noqa: E402
+    import generic_values  # noqa: E402
+import jsonl_reader  # noqa: E402
+
+RECORDS = 200
+
+
+def export_lines(offset=0):
+    lines = []
+    for i in range(RECORDS):
+        record = {
+            "timestamp": f"2026-01-26T07:{i // 60:02d}:{i % 60:02d}+01:00",
+            "messageContentType": "AB"[i % 2],
+            "message": {"Speed": i * 0.5 + offset} if i % 2 == 0 else {"Count": i + offset},
+        }
+        lines.append(json.dumps(record) + "\n")
+    return "".join(lines)
+
+
+def axis(sourceFile, messageContentType, fieldPath, **options):
+    return dict(sourceFile=sourceFile, messageContentType=messageContentType, fieldPath=fieldPath, datatype="float", **options)
+
+
+class BatchPlotsTest(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.dir = tmp.name + os.sep
+        self.output = os.path.join(tmp.name, "plots")
+        for name, offset in (("export.jsonl", 0), ("other.jsonl", 1000)):
+            with open(self.dir + name, "w", encoding="utf-8") as f:
+                f.write(export_lines(offset))
+
+        self.write_config("speed.json", [axis("export.jsonl", "A", "message.Speed", csvFileName="speed.csv")])
+        self.write_config("both.json", [
+            axis("export.jsonl", "B", "message.Count", csvFileName="count.csv"),
+            axis("export.jsonl", "A", "message.Speed", datetimeFrom="2026-01-26T07:02:00+01:00", csvFileName="late.csv"),
+        ])
+
+        for patcher in (
+            mock.patch.object(generic_values, "DATA_PATH", self.dir),
+            mock.patch("sys.stdout", io.StringIO()),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def write_config(self, name, axes):
+        with open(self.dir + name, "w", encoding="utf-8") as f:
+            json.dump({"rows": len(axes), "columns": 1, "title": name, "axes": axes}, f)
+
+    def run_batch(self, configFiles, sources=None):
+        with mock.patch.object(jsonl_reader, "map_chunks", wraps=jsonl_reader.map_chunks) as scan:
+            written, failed = batch_plots.run(configFiles, sources, self.output, ["png"], workers=1, renderWorkers=1)
+        self.scanned = [call.args[1] for call in scan.call_args_list]
+        return sorted(os.path.relpath(path, self.output) for path in written), failed
+
+    def column(self, *parts):
+        with open(os.path.join(self.output, *parts), newline="") as f:
+            return [float(row[1]) for row in list(csv.reader(f))[1:]]
+
+    def test_configs_share_one_scan(self):
+        written, failed = self.run_batch(["speed.json", "both.json"])
+        self.assertEqual(self.scanned, [self.dir + "export.jsonl"])
+        self.assertEqual(written, [os.path.join("both", "both.png"), os.path.join("speed", "speed.png")])
+        self.assertEqual(failed, [])
+
+        # Each axis applies its own window to the shared field
+        self.assertEqual(self.column("speed", "speed.csv"), [i * 0.5 for i in range(0, RECORDS, 2)])
+        self.assertEqual(self.column("both", "late.csv"), [i * 0.5 for i in range(120, RECORDS, 2)])
+        self.assertEqual(self.column("both", "count.csv"), list(range(1, RECORDS, 2)))
+
+    def test_sources_replace_the_source_file(self):
+        written, failed = self.run_batch(["speed.json", "both.json"], ["export.jsonl", "other.jsonl"])
+        self.assertEqual(sorted(self.scanned), [self.dir + "export.jsonl", self.dir + "other.jsonl"])
+        self.assertEqual(len(written), 4)
+        self.assertEqual(self.column("speed", "other", "speed.csv"), [i * 0.5 + 1000 for i in range(0, RECORDS, 2)])
+
+    def test_missing_source_fails_only_its_configs(self):
+        self.write_config("missing.json", [axis("missing.jsonl", "A", "message.Speed")])
+        written, failed = self.run_batch(["missing.json", "speed.json", "invalid.json"])
+        self.assertEqual(written, [os.path.join("speed", "speed.png")])
+        self.assertEqual(sorted(failed), ["invalid.json", "missing.json"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,77 @@
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import unittest
+import xml.etree.ElementTree as ElementTree
+from datetime import datetime, timedelta, timezone
+
+SRC_DIR = os.path.normpath(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+sys.path.insert(0, SRC_DIR)
+
+import batch_render  # noqa: E402
+with contextlib.redirect_stdout(io.StringIO()):
+    import generic_values  # noqa: E402
+
+SVG = "{http://www.w3.org/2000/svg}svg"
+
+
+def subplots(count):
+    """Axes with their points extracted already, every third one boolean"""
+    start = datetime(2026, 1, 26, 7, tzinfo=timezone.utc)
+    result = []
+    for i in range(count):
+        axis = dict(sourceFile="export.jsonl", messageContentType="A", fieldPath=f"message.Value{i}", datatype="boolean" if i % 3 == 2 else "float")
+        subplot = generic_values.PlotData(axis, i)
+        x = [start + timedelta(seconds=s) for s in range(50)]
+        y = [s % 2 == 0 for s in range(50)] if subplot.datatype == "boolean" else [s * (i + 1) * 0.5 for s in range(50)]
+        subplot.data = {"x": x, "y": y}
+        result.append(subplot)
+    return result
+
+
+def config(rows, columns, title="Test"):
+    return {"rows": rows, "columns": columns, "title": title, "xlabel": "Time"}
+
+
+class RenderPoolTest(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.dir = tmp.name
+
+    def pixels(self, path):
+        import matplotlib.image
+
+        return matplotlib.image.imread(path).shape[:2]
+
+    def test_whole_and_tiled_figures(self):
+        small, large = config(2, 1), config(2, 2, title=None)
+        with batch_render.RenderPool(workers=2, tile_axes=3) as pool:
+            pool.submit(subplots(2), small, os.path.join(self.dir, "small"), ("png", "svg"))
+            pool.submit(subplots(3), large, os.path.join(self.dir, "large"), ("png", "svg"))
+        self.assertEqual(sorted(pool.written), sorted(os.path.join(self.dir, name) for name in (
+            "small.png", "small.svg", "large.png", "large.svg",
+        )))
+
+        for name, grid in (("small", small), ("large", large)):
+            width, height = batch_render.figure_size(grid)
+            self.assertEqual(self.pixels(os.path.join(self.dir, name + ".png")), (round(height * batch_render.DPI), round(width * batch_render.DPI)))
+
+        # The tiled SVG nests the title, the three tiles and the x label in one document
+        root = ElementTree.parse(os.path.join(self.dir, "large.svg")).getroot()
+        nested = root.findall(SVG)
+        self.assertEqual(len(nested), 5)
+        width, height = batch_render.figure_size(large)
+        self.assertEqual((float(root.get("width")[:-2]), float(root.get("height")[:-2])), (width * 72, height * 72))
+        self.assertEqual([float(svg.get("x")) for svg in nested[1:4]], [0.0, batch_render.CELL_SIZE[0] * 72, 0.0])
+
+    def test_render_figure_in_this_process(self):
+        path = os.path.join(self.dir, "figure.png")
+        self.assertEqual(batch_render.render_figure(subplots(1), config(1, 2), [path]), [path])
+        self.assertEqual(self.pixels(path), (round(batch_render.figure_size(config(1, 2))[1] * batch_render.DPI), 1280))
+
+
+if __name__ == "__main__":
+    unittest.main()
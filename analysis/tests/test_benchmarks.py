@@ -0,0 +1,117 @@
+import contextlib
+import io
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+
+BENCH_DIR = os.path.normpath(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "bench"))
+SRC_DIR = os.path.normpath(os.path.join(BENCH_DIR, "..", "src"))
+sys.path.insert(0, BENCH_DIR)
+
+import generate_telemetry  # noqa: E402
+import run_benchmarks  # noqa: E402
+
+
+class GeneratorTest(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.dir = tmp.name
+
+    def generate(self, name, size, seed=0):
+        path = os.path.join(self.dir, name)
+        lines = generate_telemetry.generate(path, size, seed)
+        with open(path, "rb") as f:
+            return lines, f.read()
+
+    def test_parse_size(self):
+        self.assertEqual(generate_telemetry.parse_size("10MB"), 10 * 1024 ** 2)
+        self.assertEqual(generate_telemetry.parse_size("1.5 kb"), 1536)
+        self.assertEqual(generate_telemetry.parse_size("1GB"), 1024 ** 3)
+        self.assertEqual(generate_telemetry.parse_size("2048"), 2048)
+        with self.assertRaises(ValueError):
+            generate_telemetry.parse_size("10 lines")
+
+    def test_same_seed_same_file(self):
+        lines, data = self.generate("a.jsonl", 200_000)
+        self.assertEqual(self.generate("b.jsonl", 200_000), (lines, data))
+        self.assertNotEqual(self.generate("c.jsonl", 200_000, seed=1)[1], data)
+
+    def test_records_are_valid_and_in_time_order(self):
+        lines, data = self.generate("export.jsonl", 100_000)
+        # The last line only crosses the size
+        self.assertGreaterEqual(len(data), 100_000)
+        self.assertLess(len(data) - len(data.rstrip(b"\n").rsplit(b"\n", 1)[0]), 1000)
+
+        records = [json.loads(line) for line in data.splitlines()]
+        self.assertEqual(len(records), lines)
+        self.assertEqual([record["_id"] for record in records], [str(i) for i in range(lines)])
+        self.assertEqual({record["messageContentType"] for record in records}, set(generate_telemetry.MIX))
+        timestamps = [record["timestamp"] for record in records]
+        self.assertEqual(timestamps, sorted(timestamps))
+        self.assertTrue(all(ts.endswith(generate_telemetry.UTC_OFFSET) for ts in timestamps))
+
+        speeds = [
+            record["message"]["MessagePayload"]["Speed"] for record in records
+            if record["messageContentType"] == generate_telemetry.REMOTE_TRAIN_CONTROL
+        ]
+        self.assertTrue(speeds and all(0 <= speed < 100 for speed in speeds))
+
+
+class ResultsTest(unittest.TestCase):
+    def run_result(self, total, **stages):
+        return {"total": total, "stages": stages, "peak_rss_mb": total * 100, "peak_worker_rss_mb": 0.0}
+
+    def test_best_of_takes_the_fastest_stage(self):
+        best = run_benchmarks.best_of([self.run_result(2.0, scan=1.5, render=0.5), self.run_result(1.8, scan=1.6)])
+        self.assertEqual(best["total"], 1.8)
+        self.assertEqual(best["stages"], {"render": 0.0, "scan": 1.5})
+        self.assertEqual(best["peak_rss_mb"], 200.0)
+
+    def test_compare_prints_the_changes(self):
+        old = {"version": run_benchmarks.RESULT_VERSION, "startup": {"generic_values": 0.2},
+               "runs": [{"script": "generic_values", "size": "10MB", **self.run_result(2.0, scan=1.0)}]}
+        new = {"version": run_benchmarks.RESULT_VERSION, "startup": {"generic_values": 0.1},
+               "runs": [{"script": "generic_values", "size": "10MB", **self.run_result(1.5, scan=0.5, render=0.2)},
+                        {"script": "boolean_values", "size": "10MB", **self.run_result(1.0)}]}
+
+        out = io.StringIO()
+        with contextlib.redirect_stdout(out):
+            run_benchmarks.compare(old, new)
+        report = out.getvalue()
+        self.assertIn("generic_values 10MB", report)
+        self.assertNotIn("boolean_values", report)
+        self.assertRegex(report, r"total +2\.000s +1\.500s +-25\.0%")
+        self.assertRegex(report, r"scan +1\.000s +0\.500s +-50\.0%")
+        self.assertRegex(report, r"render +0\.000s +0\.200s +n/a")
+        self.assertRegex(report, r"generic_values +0\.200s +0\.100s +-50\.0%")
+
+
+class StartupTest(unittest.TestCase):
+    def test_scripts_start_within_the_budget(self):
+        result = subprocess.run(
+            [sys.executable, os.path.join(BENCH_DIR, "run_benchmarks.py"), "--startup", "--repeat", "2"],
+            capture_output=True, text=True,
+        )
+        self.assertEqual(result.returncode, 0, result.stdout + result.stderr)
+        for script in run_benchmarks.SCRIPTS:
+            self.assertIn(script, result.stdout)
+        self.assertNotIn("over budget", result.stdout)
+
+    def test_imports_leave_out_the_heavy_libraries(self):
+        code = (
+            "import contextlib, io, sys\n"
+            "with contextlib.redirect_stdout(io.StringIO()):\n"
+            f"    import {', '.join(run_benchmarks.SCRIPTS)}\n"
+            "print(' '.join(sorted(name for name in ('numpy', 'pandas', 'matplotlib', 'plotly') if name in sys.modules)))\n"
+        )
+        env = dict(os.environ, MPLBACKEND="Agg")
+        result = subprocess.run([sys.executable, "-c", code], cwd=SRC_DIR, env=env, capture_output=True, text=True, check=True)
+        self.assertEqual(result.stdout.strip(), "")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,98 @@
+import contextlib
+import csv
+import io
+import json
+import os
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+SRC_DIR = os.path.normpath(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+sys.path.insert(0, SRC_DIR)
+
+with contextlib.redirect_stdout(io.StringIO()):
+    import boolean_values  # noqa: E402
+import jsonl_index  # noqa: E402
+import jsonl_reader  # noqa: E402
+
+RECORDS = 300
+
+
+def export_records():
+    """
+    Records of two types, the flag of type A is given in blocks of 20 seconds
+    that were exported out of time order, some records miss the flag
+    """
+    records = []
+    for block in (3, 0, 4, 1, 2):
+        for s in range(block * 20, block * 20 + RECORDS // 5):
+            i = len(records)
+            record = {"timestamp": f"2026-01-26T07:{s // 60:02d}:{s % 60:02d}+01:00", "messageContentType": "AB"[i % 2], "message": {}}
+            if i % 2 == 0 and i % 17:
+                record["message"]["Flag"] = s // 7 % 2 == 0
+            records.append(record)
+    return records
+
+
+class BooleanValuesTest(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.dir = tmp.name + os.sep
+        self.records = export_records()
+        with open(self.dir + "export.jsonl", "w", encoding="utf-8") as f:
+            f.write("".join(json.dumps(record) + "\n" for record in self.records))
+
+        for patcher in (
+            mock.patch.object(boolean_values, "DATA_PATH", self.dir),
+            mock.patch.object(jsonl_reader, "MIN_CHUNK_SIZE", 1024),
+            mock.patch.object(jsonl_index, "BLOCK_LINES", 16),
+            mock.patch("sys.stdout", io.StringIO()),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def expected(self, onChangeOnly):
+        """CSV rows of the records in file order, like the original row loop"""
+        rows = []
+        previous = None
+        for record in self.records:
+            if record["messageContentType"] != "A" or "Flag" not in record["message"]:
+                continue
+            flag = record["message"]["Flag"]
+            if onChangeOnly and previous is not None and flag == previous:
+                continue
+            previous = flag
+            rows.append([boolean_values.parse_ts(record["timestamp"]).isoformat(), str(flag)])
+        return rows
+
+    def run_main(self, onChangeOnly, workers=1, index=False):
+        output = self.dir + "flag.png"
+        boolean_values.main("export.jsonl", "message.Flag", "A", onChangeOnly, workers, index, output=output)
+        self.assertTrue(os.path.getsize(output) > 0)
+        with open(self.dir + "export_Flag.csv", newline="", encoding="utf-8") as f:
+            rows = list(csv.reader(f))
+        self.assertEqual(rows[0], ["timestamp", "Flag"])
+        return rows[1:]
+
+    def test_csv_keeps_the_file_order(self):
+        self.assertGreater(len(jsonl_reader.chunk_ranges(self.dir + "export.jsonl", 4)), 1)
+        rows = self.run_main(False)
+        self.assertEqual(rows, self.expected(False))
+        self.assertNotEqual(rows, sorted(rows))
+
+    def test_on_change_only_compares_in_file_order(self):
+        expected = self.expected(True)
+        # Dropping the repeated values in time order would keep other points
+        flags = [row[1] for row in sorted(self.expected(False))]
+        inTimeOrder = [flag for i, flag in enumerate(flags) if i == 0 or flag != flags[i - 1]]
+        self.assertNotEqual(sorted(row[1] for row in expected), sorted(inTimeOrder))
+        for workers in (1, 3):
+            with self.subTest(workers=workers):
+                self.assertEqual(self.run_main(True, workers), expected)
+        self.assertEqual(self.run_main(True, index=True), expected)
+
+
+if __name__ == "__main__":
+    unittest.main()
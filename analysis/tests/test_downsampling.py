@@ -0,0 +1,168 @@
+import contextlib
+import io
+import os
+import sys
+import unittest
+
+import numpy as np
+
+SRC_DIR = os.path.normpath(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+sys.path.insert(0, SRC_DIR)
+
+import downsampling  # noqa: E402
+
+try:
+    import pandas as pd
+except ImportError:
+    pd = None
+
+BUDGETS = (0, 1, 2, 3, 4, 5, 10, 99, 999, 1000, 5000)
+
+
+def trace(n, seed=0):
+    rng = np.random.default_rng(seed)
+    x = np.cumsum(rng.integers(1, 1000, n)).astype(np.int64)
+    y = np.cumsum(rng.normal(size=n))
+    return x, y
+
+
+class BudgetTest(unittest.TestCase):
+    def check_indices(self, kept, n, max_points):
+        kept = np.asarray(kept)
+        self.assertLessEqual(len(kept), max(1, max_points))
+        self.assertGreaterEqual(len(kept), min(n, 1))
+        self.assertTrue(np.all(np.diff(kept) > 0), "indices are sorted and unique")
+        if n:
+            self.assertEqual(kept[0], 0)
+            self.assertTrue(kept.min() >= 0 and kept.max() < n)
+            if max_points >= 2:
+                self.assertEqual(kept[-1], n - 1)
+
+    def test_budgets(self):
+        for algorithm in downsampling.ALGORITHMS.values():
+            for n in (0, 1, 2, 3, 7, 1000):
+                x, y = trace(n)
+                for max_points in BUDGETS:
+                    with self.subTest(algorithm=algorithm.__name__, n=n, max_points=max_points):
+                        kept = algorithm(x, y, max_points)
+                        self.check_indices(kept, n, max_points)
+                        if max_points >= n:
+                            self.assertEqual(list(kept), list(range(n)))
+
+    def test_lttb_uses_the_whole_budget(self):
+        x, y = trace(1000)
+        self.assertEqual(len(downsampling.lttb(x, y, 100)), 100)
+
+    def test_lttb_keeps_a_spike(self):
+        x = np.arange(10_000, dtype=np.int64)
+        y = np.zeros(10_000)
+        y[4321] = 50.0
+        self.assertIn(4321, downsampling.lttb(x, y, 50).tolist())
+
+    def test_minmax_keeps_every_extreme(self):
+        x, y = trace(10_000, seed=3)
+        kept = downsampling.minmax(x, y, 101)
+        self.assertIn(int(y.argmin()), kept.tolist())
+        self.assertIn(int(y.argmax()), kept.tolist())
+        # Every bucket contributes its minimum and maximum
+        edges = np.linspace(0, len(y), (101 - 2) // 2 + 1).astype(np.int64)
+        for start, end in zip(edges[:-1], edges[1:]):
+            self.assertIn(start + int(y[start:end].argmin()), kept.tolist())
+            self.assertIn(start + int(y[start:end].argmax()), kept.tolist())
+
+
+class StateEdgesTest(unittest.TestCase):
+    def test_edges(self):
+        self.assertEqual(downsampling.state_edges([0, 0, 1, 1, 1, 0, 0]).tolist(), [0, 1, 2, 4, 5, 6])
+        self.assertEqual(downsampling.state_edges(np.array(["a", "a", "a", "b"])).tolist(), [0, 2, 3])
+        self.assertEqual(downsampling.state_edges([5] * 100).tolist(), [0, 99])
+
+    def test_every_change_is_kept(self):
+        rng = np.random.default_rng(1)
+        values = rng.integers(0, 2, 500)
+        kept = downsampling.state_edges(values)
+        steps = values[kept]
+        # Drawing the kept points as steps gives the same state at every original point
+        for i in range(len(values)):
+            position = np.searchsorted(kept, i, side="right") - 1
+            self.assertEqual(steps[position], values[i])
+
+    def test_short_traces(self):
+        for n in (0, 1, 2):
+            self.assertEqual(downsampling.state_edges(np.zeros(n)).tolist(), list(range(n)))
+
+
+@unittest.skipIf(pd is None, "pandas is not installed")
+class PlotBudgetTest(unittest.TestCase):
+    """Point budgets of plot_data_plotly's downsampling steps"""
+
+    def setUp(self):
+        import plot_data_plotly
+
+        self.plot = plot_data_plotly
+        n = 20_000
+        rng = np.random.default_rng(2)
+        self.df = pd.DataFrame({
+            "timestamp": pd.date_range("2026-01-26", periods=n, freq="ms"),
+            "Speed": np.cumsum(rng.normal(size=n)),
+            "Flapping": rng.integers(0, 2, n).astype(bool),
+            "Door": np.repeat([False, True, False, True], n // 4),
+            "State": np.repeat(["a", "b", "c", "d", "e"] * 40, n // 200),
+        })
+
+    def run_quietly(self, function, *args, **kwargs):
+        with contextlib.redirect_stdout(io.StringIO()):
+            return function(*args, **kwargs)
+
+    def test_state_changes_within_the_budget(self):
+        for columns, max_points in ((["Door"], 500), (["Flapping"], 500), (["Door", "State"], 1000), (None, 7)):
+            with self.subTest(columns=columns, max_points=max_points):
+                result = self.run_quietly(self.plot.downsample_with_state_changes, self.df, max_points, columns)
+                self.assertLessEqual(len(result), max_points)
+                self.assertGreater(len(result), max_points // 2)
+                self.assertEqual(result.index[0], 0)
+                self.assertEqual(result.index[-1], len(self.df) - 1)
+
+    def test_state_changes_are_kept_when_they_fit(self):
+        result = self.run_quietly(self.plot.downsample_with_state_changes, self.df, 300, ["Door"])
+        for change in (5000, 10_000, 15_000):
+            self.assertIn(change - 1, result.index)
+            self.assertIn(change, result.index)
+
+    def test_changes_match_the_row_loop(self):
+        # Sparse columns like the merged records, missing values count as changes
+        rng = np.random.default_rng(4)
+        n = 3000
+        df = pd.DataFrame({
+            "Door": np.repeat(rng.integers(0, 2, n // 100).astype(bool), 100),
+            "Level": np.where(rng.random(n) < 0.01, np.nan, np.repeat(rng.integers(0, 3, n // 150), 150)),
+        })
+        changes = {0, n - 1}
+        for column in df.columns:
+            values = df[column].tolist()
+            for i in range(1, n):
+                if values[i - 1] != values[i]:
+                    changes.update((i - 1, i))
+
+        result = self.run_quietly(self.plot.downsample_with_state_changes, df, len(changes) + 50, ["Door", "Level"])
+        self.assertLessEqual(len(result), len(changes) + 50)
+        self.assertTrue(changes <= set(result.index))
+        self.assertTrue(result.index.is_monotonic_increasing)
+
+    def test_small_frames_are_not_touched(self):
+        result = self.run_quietly(self.plot.downsample_with_state_changes, self.df.head(10), 10, ["Door"])
+        self.assertEqual(len(result), 10)
+
+    def test_trace_budgets(self):
+        for field, kind in (("Speed", "numeric"), ("State", "string")):
+            for algorithm in ("lttb", "minmax"):
+                x, y = self.run_quietly(self.plot.reduce_trace, self.df, field, kind, algorithm, 150)
+                self.assertLessEqual(len(x), 150)
+                self.assertEqual(len(x), len(y))
+        # Boolean traces keep every edge, whatever the budget
+        x, _ = self.run_quietly(self.plot.reduce_trace, self.df, "Door", "boolean", "lttb", 3)
+        self.assertEqual(len(x), 8)
+
+
+if __name__ == "__main__":
+    unittest.main()
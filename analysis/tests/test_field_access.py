@@ -0,0 +1,122 @@
+import os
+import sys
+import unittest
+
+SRC_DIR = os.path.normpath(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+sys.path.insert(0, SRC_DIR)
+
+from field_access import FieldPath, FieldSearch  # noqa: E402
+
+RECORD = {
+    "messageContentType": "Status",
+    "message": {
+        "ExpirationTime": {"Nanos": 0, "Seconds": 12},
+        "Speed": None,
+        "Doors": [{"Open": True}],
+        "Label": "text",
+        "Flag": False,
+    },
+    "payload": {"Speed": 4.5, "Flag": True},
+    "Speed": 9,
+}
+
+
+class FieldPathTest(unittest.TestCase):
+    def test_values(self):
+        self.assertEqual(FieldPath("message.ExpirationTime.Seconds").get(RECORD), 12)
+        self.assertEqual(FieldPath("messageContentType").get(RECORD), "Status")
+        self.assertEqual(FieldPath("message.Doors").get(RECORD), [{"Open": True}])
+        self.assertEqual(FieldPath("message.ExpirationTime").get(RECORD), {"Nanos": 0, "Seconds": 12})
+
+    def test_falsy_values_are_found(self):
+        self.assertEqual(FieldPath("message.ExpirationTime.Nanos").get(RECORD), 0)
+        self.assertIs(FieldPath("message.Flag").get(RECORD), False)
+
+    def test_missing_paths(self):
+        for path in (
+            "missing",
+            "message.missing.Nanos",
+            "message.Speed.Value",  # null on the way
+            "message.Doors.Open",  # list on the way
+            "message.Label.length",  # string on the way
+            "message.ExpirationTime.Nanos.deeper",  # number on the way
+        ):
+            self.assertIsNone(FieldPath(path).get(RECORD), path)
+        self.assertIsNone(FieldPath("a").get(None))
+        self.assertIsNone(FieldPath("a").get([1, 2]))
+
+    def test_find_matches_get(self):
+        for path in (
+            "message.ExpirationTime.Seconds",
+            "message.Flag",
+            "message.ExpirationTime",
+            "missing",
+            "message.Speed.Value",
+            "message.Doors.Open",
+            "message.Label.length",
+        ):
+            self.assertEqual(FieldPath(path).find(RECORD), FieldPath(path).get(RECORD), path)
+        self.assertIsNone(FieldPath("a").find(None))
+
+    def test_name(self):
+        path = FieldPath("message.ExpirationTime.Nanos")
+        self.assertEqual(path.keys, ("message", "ExpirationTime", "Nanos"))
+        self.assertEqual(path.name, "Nanos")
+        self.assertEqual(FieldPath("Speed").name, "Speed")
+
+
+class FieldSearchTest(unittest.TestCase):
+    def search(self, name, locations):
+        return FieldSearch(name, locations).get("Status", lambda path: path.get(RECORD))
+
+    def test_first_location_with_a_value_wins(self):
+        # message.Speed is null, so payload.Speed is used
+        self.assertEqual(self.search("Speed", ["message", "payload"]), 4.5)
+        self.assertEqual(self.search("Flag", ["payload", "message"]), True)
+        self.assertIs(self.search("Flag", ["message", "payload"]), False)
+
+    def test_nested_locations(self):
+        self.assertEqual(self.search("Nanos", ["payload", "message.ExpirationTime"]), 0)
+
+    def test_not_found(self):
+        self.assertIsNone(self.search("Missing", ["message", "payload"]))
+        self.assertIsNone(self.search("Speed", []))
+
+    def test_lookup_gets_the_candidate_paths(self):
+        asked = []
+        FieldSearch("Speed", ["message", "payload"]).get("Status", lambda path: asked.append(path.path))
+        self.assertEqual(asked, ["message.Speed", "payload.Speed"])
+
+    def test_learned_location_keeps_priority_order(self):
+        search = FieldSearch("Speed", ["high", "mid", "low"])
+        records = [{"low": {"Speed": 1}}, {"low": {"Speed": 2}}, {"high": {"Speed": 3}, "low": {"Speed": 4}}]
+        found = [search.get("Status", lambda path, r=r: path.get(r), lambda path, r=r: path.find(r)) for r in records]
+        # The third record has a higher priority location than the learned one
+        self.assertEqual(found, [1, 2, 3])
+        self.assertEqual(search.learned, {"Status": 2})
+
+    def test_learned_per_message_type(self):
+        search = FieldSearch("Speed", ["high", "low"])
+        lookups, probes = [], []
+
+        def get(message_type, record):
+            return search.get(
+                message_type,
+                lambda path: lookups.append(path.path) or path.get(record),
+                lambda path: probes.append(path.path) or path.find(record),
+            )
+
+        self.assertEqual(get("A", {"low": {"Speed": 1}}), 1)
+        self.assertEqual(get("B", {"high": {"Speed": 2}}), 2)
+        del lookups[:], probes[:]
+        self.assertEqual(get("A", {"low": {"Speed": 3}}), 3)
+        self.assertEqual((lookups, probes), (["low.Speed"], ["high.Speed"]))
+        del lookups[:], probes[:]
+        self.assertEqual(get("B", {"high": {"Speed": 4}}), 4)
+        self.assertEqual((lookups, probes), (["high.Speed"], []))
+        # Unhashable types, like an object as messageContentType, still search
+        self.assertEqual(get({"kind": "C"}, {"low": {"Speed": 5}}), 5)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,138 @@
+import contextlib
+import io
+import json
+import os
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+SRC_DIR = os.path.normpath(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+sys.path.insert(0, SRC_DIR)
+
+with contextlib.redirect_stdout(io.StringIO()):
+    import generic_values  # noqa: E402
+import jsonl_index  # noqa: E402
+import jsonl_reader  # noqa: E402
+
+RECORDS = 400
+
+
+def export_line(i):
+    """Record i of the test export, types A and B take turns and A.message.Flag flips every 10 records"""
+    record = {
+        "timestamp": f"2026-01-26T07:{i // 60:02d}:{i % 60:02d}+01:00",
+        "messageContentType": "AB"[i % 2],
+        "message": {"Speed": i * 0.5, "Flag": i // 10 % 2 == 0} if i % 2 == 0 else {"Count": i},
+    }
+    return json.dumps(record)
+
+
+def axis(messageContentType, fieldPath, **options):
+    return dict(sourceFile="export.jsonl", messageContentType=messageContentType, fieldPath=fieldPath, datatype="float", **options)
+
+
+class GenericValuesTest(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.dir = tmp.name + os.sep
+        self.write([export_line(i) for i in range(RECORDS)])
+
+        for patcher in (
+            mock.patch.object(generic_values, "DATA_PATH", self.dir),
+            mock.patch.object(jsonl_reader, "MIN_CHUNK_SIZE", 2048),
+            mock.patch("sys.stdout", io.StringIO()),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def write(self, lines):
+        with open(self.dir + "export.jsonl", "w", encoding="utf-8") as f:
+            f.write("\n".join(lines) + "\n")
+
+    def extract(self, axes, workers=1, **options):
+        subplots = [generic_values.PlotData(a, i) for i, a in enumerate(axes)]
+        generic_values.extract(subplots, workers, **options)
+        return [(subplot.data["x"].tolist(), subplot.data["y"].tolist()) for subplot in subplots]
+
+
+class SharedScanTest(GenericValuesTest):
+    def test_one_scan_for_all_axes(self):
+        axes = [axis("A", "message.Speed"), axis("B", "message.Count"), axis("A", "message.Speed", ylabel="again")]
+        subplots = [generic_values.PlotData(a, i) for i, a in enumerate(axes)]
+        plan = generic_values.plan_scans(subplots)
+        self.assertEqual(list(plan), ["export.jsonl"])
+        # Axes with the same type and path share one field
+        self.assertEqual([len(field.subplots) for field in plan["export.jsonl"]], [2, 1])
+
+        with mock.patch.object(jsonl_reader, "map_chunks", wraps=jsonl_reader.map_chunks) as scan:
+            speed, count, again = self.extract(axes)
+        self.assertEqual(scan.call_count, 1)
+        self.assertEqual(speed[1], [i * 0.5 for i in range(0, RECORDS, 2)])
+        self.assertEqual(count[1], list(range(1, RECORDS, 2)))
+        self.assertEqual(again, speed)
+
+    def test_parallel_chunks_are_merged_in_order(self):
+        axes = [axis("A", "message.Speed"), axis("B", "message.Count"), axis("A", "message.Flag", onChangeOnly=True)]
+        self.assertGreater(len(jsonl_reader.chunk_ranges(self.dir + "export.jsonl", 4)), 1)
+        single = self.extract(axes, workers=1)
+        self.assertEqual(single[2][1], [True, False] * (RECORDS // 20))
+        for workers in (2, 4):
+            with self.subTest(workers=workers):
+                self.assertEqual(self.extract(axes, workers=workers), single)
+
+
+class TimeOrderTest(GenericValuesTest):
+    def test_windows_and_changes_follow_the_timestamps(self):
+        # Blocks of 50 records exported out of time order
+        blocks = [range(start, start + 50) for start in range(0, RECORDS, 50)]
+        self.write([export_line(i) for block in blocks[::-1] for i in block])
+        window = {"datetimeFrom": "2026-01-26T07:01:00+01:00", "datetimeTo": "2026-01-26T07:05:59+01:00"}
+        speed, flag = self.extract([axis("A", "message.Speed", **window), axis("A", "message.Flag", onChangeOnly=True)])
+
+        self.assertEqual(speed[1], [i * 0.5 for i in range(60, 360, 2)])
+        self.assertEqual(speed[0], sorted(speed[0]))
+        # One point per flip of the flag in time, not per block boundary of the file
+        self.assertEqual(flag[1], [True, False] * (RECORDS // 20))
+        self.assertEqual(len(flag[0]), RECORDS // 10)
+
+
+class WindowIndexTest(GenericValuesTest):
+    def setUp(self):
+        super().setUp()
+        patcher = mock.patch.object(jsonl_index, "BLOCK_LINES", 16)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_index_reads_only_the_window(self):
+        window = {"datetimeFrom": "2026-01-26T07:02:00+01:00", "datetimeTo": "2026-01-26T07:02:59+01:00"}
+        axes = [axis("A", "message.Speed", **window), axis("B", "message.Count", datetimeFrom="2026-01-26T07:06:00+01:00")]
+        scanned = self.extract(axes)
+        self.assertEqual(scanned[0][1], [i * 0.5 for i in range(120, 180, 2)])
+        self.assertEqual(scanned[1][1], list(range(361, RECORDS, 2)))
+
+        read = []
+        iter_lines = jsonl_reader.iter_lines
+
+        def counting_iter_lines(*args, **kwargs):
+            for line in iter_lines(*args, **kwargs):
+                read.append(line)
+                yield line
+
+        with mock.patch.object(jsonl_reader, "iter_lines", counting_iter_lines):
+            self.assertEqual(self.extract(axes, index=True), scanned)
+        # Only the lines of the two windows are read, rounded to index blocks
+        self.assertTrue(0 < len(read) < RECORDS // 2)
+        self.assertTrue(os.path.exists(self.dir + "export.jsonl" + jsonl_index.TS_INDEX_SUFFIX))
+
+    def test_axis_without_window_needs_the_whole_file(self):
+        fields = generic_values.plan_scans([
+            generic_values.PlotData(axis("A", "message.Speed", datetimeFrom="2026-01-26T07:02:00+01:00"), 0),
+            generic_values.PlotData(axis("B", "message.Count"), 1),
+        ])["export.jsonl"]
+        self.assertIsNone(generic_values.window_ranges("export.jsonl", fields))
+
+
+if __name__ == "__main__":
+    unittest.main()
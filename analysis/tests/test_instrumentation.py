@@ -0,0 +1,88 @@
+import json
+import os
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+SRC_DIR = os.path.normpath(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+sys.path.insert(0, SRC_DIR)
+
+import instrumentation  # noqa: E402
+import jsonl_reader  # noqa: E402
+
+LINES = 300
+
+
+def count_type(path, start, end, encoding, tokens, lines=None):
+    """map_chunks worker counting the records of the token's type"""
+    count = 0
+    for line in jsonl_reader.iter_lines(path, start, end, encoding, lines):
+        if jsonl_reader.contains_any(line, tokens):
+            if jsonl_reader.loads(line).get("messageContentType") == "A":
+                count += 1
+    return count
+
+
+class ChunkStageTest(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.path = os.path.join(tmp.name, "export.jsonl")
+        with open(self.path, "w", encoding="utf-8") as f:
+            for i in range(LINES):
+                f.write(json.dumps({"messageContentType": "AB"[i % 3 == 0], "n": i}) + "\n")
+        patcher = mock.patch.object(jsonl_reader, "MIN_CHUNK_SIZE", 1024)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.tokens = jsonl_reader.type_tokens(["A"])
+
+    def scan(self, workers):
+        return sum(jsonl_reader.map_chunks(count_type, self.path, self.tokens, workers=workers))
+
+    def test_chunks_report_the_line_stages(self):
+        wanted = self.scan(1)
+        for workers in (1, 2):
+            with self.subTest(workers=workers):
+                instrumentation.open_session("test")
+                try:
+                    self.assertEqual(self.scan(workers), wanted)
+                finally:
+                    summary = instrumentation.close_session()
+
+                stages = summary["stages"]
+                self.assertEqual(stages["read"]["records"], LINES)
+                self.assertEqual(stages["read"]["bytes"], os.path.getsize(self.path))
+                self.assertEqual(stages["filter"]["records"], LINES)
+                self.assertEqual(stages["decode"]["records"], wanted)
+                self.assertIn("extract", stages)
+                self.assertEqual(list(stages)[-1], "other")
+
+    def test_timing_points_are_off_without_a_session(self):
+        instrumentation.open_session("test")
+        self.scan(1)
+        instrumentation.close_session()
+
+        self.scan(1)
+        self.assertFalse(instrumentation.enabled)
+        before = instrumentation.line_stages["read"].calls
+        list(jsonl_reader.iter_lines(self.path, 0, os.path.getsize(self.path)))
+        self.assertEqual(instrumentation.line_stages["read"].calls, before)
+
+    def test_stages_and_other_add_up_to_the_run(self):
+        instrumentation.open_session("test")
+        with instrumentation.stage("scan"):
+            self.scan(1)
+        with instrumentation.stage("write", records=5):
+            pass
+        summary = instrumentation.close_session()
+
+        stages = summary["stages"]
+        self.assertEqual(stages["write"]["records"], 5)
+        main = stages["scan"]["wall_seconds"] + stages["write"]["wall_seconds"] + stages["other"]["wall_seconds"]
+        self.assertAlmostEqual(main, summary["wall_seconds"], delta=1e-3)
+        self.assertIsNone(instrumentation.session)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,89 @@
+import io
+import json
+import os
+import sys
+import unittest
+from unittest import mock
+
+SRC_DIR = os.path.normpath(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+sys.path.insert(0, SRC_DIR)
+
+import json_backend  # noqa: E402
+from field_access import FieldPath  # noqa: E402
+
+LINES = [
+    b'{"messageContentType": "A", "timestamp": "2026-01-26T07:00:00+01:00", "message": {"Speed": 1.5, "Doors": [1, 2], "Deep": {"Flag": true}}}',
+    b'{"messageContentType": "B", "message": {"Speed": null, "Label": "caf\xc3\xa9"}}',
+    b'{"messageContentType": "C", "message": {"Speed": NaN}}',
+    b'{"messageContentType": "D", "message": {"Label": "bad \xff byte"}}',
+    b'{"messageContentType": "E", "message": {"Big": 123456789012345678901234567890}}',
+    b'[1, 2, 3]',
+    '{"messageContentType": "F", "message": {"Speed": 7}}',
+]
+
+PATHS = ["messageContentType", "timestamp", "message.Speed", "message.Deep"]
+
+
+def same(a, b):
+    """Equal JSON values, NaN included"""
+    return json.dumps(a, sort_keys=True) == json.dumps(b, sort_keys=True)
+
+
+class ResolveTest(unittest.TestCase):
+    def test_auto_prefers_orjson_then_simdjson(self):
+        for orjson, simdjson, expected in (
+            (object(), object(), "orjson"),
+            (None, object(), "simdjson"),
+            (None, None, "stdlib"),
+        ):
+            with mock.patch.object(json_backend, "orjson", orjson), mock.patch.object(json_backend, "simdjson", simdjson):
+                self.assertEqual(json_backend.resolve("auto"), expected)
+
+    def test_missing_backend_falls_back_to_stdlib(self):
+        with mock.patch.object(json_backend, "orjson", None), mock.patch("sys.stdout", io.StringIO()):
+            self.assertEqual(json_backend.resolve("orjson"), "stdlib")
+            json_backend.select("orjson")
+            self.assertEqual(json_backend.preferred, "stdlib")
+        json_backend.select("auto")
+
+
+class DecodeTest(unittest.TestCase):
+    def expected(self, line):
+        return json_backend.stdlib_loads(line)
+
+    def test_full_records_like_json_loads(self):
+        for name in json_backend.installed():
+            loads = json_backend.make_decoder(name)
+            for line in LINES:
+                if name == "orjson" and line is LINES[4]:
+                    continue  # orjson gives integers beyond 64 bits as floats
+                with self.subTest(backend=name, line=line[:40]):
+                    self.assertTrue(same(loads(line), self.expected(line)))
+
+    def test_invalid_lines_raise_value_error(self):
+        for name in json_backend.installed():
+            with self.subTest(backend=name), self.assertRaises(ValueError):
+                json_backend.make_decoder(name, PATHS)(b'{"broken')
+
+    @unittest.skipIf(json_backend.simdjson is None, "pysimdjson is not installed")
+    def test_on_demand_decoder_copies_only_the_paths(self):
+        loads = json_backend.make_decoder("simdjson", PATHS)
+        decoded = loads(LINES[0])
+        self.assertEqual(decoded, {
+            "messageContentType": "A",
+            "timestamp": "2026-01-26T07:00:00+01:00",
+            "message": {"Speed": 1.5, "Deep": {"Flag": True}},
+        })
+        self.assertIs(type(decoded["message"]["Deep"]), dict)
+        for line in LINES:
+            with self.subTest(line=line[:40]):
+                record, expected = loads(line), self.expected(line)
+                if not isinstance(expected, dict):
+                    self.assertEqual(record, expected)
+                    continue
+                for path in PATHS:
+                    self.assertTrue(same(FieldPath(path).get(record), FieldPath(path).get(expected)), path)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,152 @@
+import io
+import json
+import os
+import sys
+import tempfile
+import unittest
+from datetime import datetime, timedelta, timezone
+from unittest import mock
+
+SRC_DIR = os.path.normpath(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+sys.path.insert(0, SRC_DIR)
+
+import jsonl_index  # noqa: E402
+import jsonl_reader  # noqa: E402
+
+START = datetime(2026, 1, 26, 7, 0, tzinfo=timezone(timedelta(hours=1)))
+
+# messageContentType of the records in turn, MISSING leaves the field out
+MISSING = object()
+TYPES = ["A", "B", "A", None, "", {"kind": "C"}, MISSING]
+
+
+def export_lines(count):
+    """Records one minute apart, every 10th without timestamp, plus a broken line"""
+    lines = []
+    for i in range(count):
+        record = {"n": i}
+        message_type = TYPES[i % len(TYPES)]
+        if message_type is not MISSING:
+            record["messageContentType"] = message_type
+        if i % 10 != 9:
+            record["timestamp"] = (START + timedelta(minutes=i)).isoformat()
+        lines.append(json.dumps(record))
+        if i == 20:
+            lines.append("{broken")
+    return lines
+
+
+class TypeKeyTest(unittest.TestCase):
+    def test_keys(self):
+        self.assertEqual(jsonl_index.type_key({"messageContentType": "A"}), "A")
+        self.assertEqual(jsonl_index.type_key({}), jsonl_index.UNTYPED)
+        self.assertIsNone(jsonl_index.type_key({"messageContentType": None}))
+        self.assertEqual(jsonl_index.type_key({"messageContentType": ""}), "")
+        self.assertEqual(jsonl_index.type_key({"messageContentType": {"kind": "C"}}), '{"kind": "C"}')
+        self.assertEqual(jsonl_index.type_key({"messageContentType": [1, 2]}), "[1, 2]")
+        self.assertEqual(jsonl_index.type_key({"messageContentType": 7}), "7")
+
+    def test_ts_ns(self):
+        self.assertEqual(jsonl_index.ts_ns("1970-01-01T00:00:01Z"), 1_000_000_000)
+        self.assertEqual(jsonl_index.ts_ns("1970-01-01T01:00:01+01:00"), 1_000_000_000)
+        self.assertEqual(jsonl_index.ts_ns("1970-01-01T00:00:01"), 1_000_000_000)
+        self.assertIsNone(jsonl_index.ts_ns("not a time"))
+        self.assertIsNone(jsonl_index.ts_ns(None))
+
+
+class IndexTest(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.lines = export_lines(200)
+        self.path = os.path.join(tmp.name, "export.jsonl")
+        with open(self.path, "w", encoding="utf-8") as f:
+            f.write("\n".join(self.lines) + "\n")
+
+        for name, value in (("BLOCK_LINES", 8), ("MAX_RANGE_SIZE", 1024)):
+            patcher = mock.patch.object(jsonl_index, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        for patcher in (mock.patch.object(jsonl_reader, "MIN_CHUNK_SIZE", 2048), mock.patch("sys.stdout", io.StringIO())):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def lines_at(self, offsets, lengths):
+        with open(self.path, "rb") as f:
+            data = f.read()
+        return [json.loads(data[offset:offset + length]) for offset, length in zip(offsets.tolist(), lengths.tolist())]
+
+    def test_type_index(self):
+        index = jsonl_index.open_type_index(self.path, workers=1)
+        self.assertEqual(index["lines"], len(self.lines))
+        self.assertEqual(index["records"], len(self.lines) - 1)
+
+        records = [json.loads(line) for line in self.lines if line != "{broken"]
+        counts = {}
+        for record in records:
+            key = jsonl_index.type_key(record)
+            counts[key] = counts.get(key, 0) + 1
+        self.assertEqual({t: len(entry["offsets"]) for t, entry in index["types"].items()}, counts)
+
+        for message_type, entry in index["types"].items():
+            found = self.lines_at(entry["offsets"], entry["lengths"])
+            self.assertEqual(found, [r for r in records if jsonl_index.type_key(r) == message_type])
+            for record, ns, minutes in zip(found, entry["timestamps"].tolist(), entry["utc_offsets"].tolist()):
+                if "timestamp" in record:
+                    self.assertEqual(ns, jsonl_index.ts_ns(record["timestamp"]))
+                    self.assertEqual(minutes, 60)
+                else:
+                    self.assertEqual(ns, jsonl_index.NO_TIMESTAMP)
+                    self.assertEqual(minutes, jsonl_index.NO_OFFSET)
+
+    def test_index_is_reused_until_the_file_changes(self):
+        with mock.patch.object(jsonl_index, "build_indexes", wraps=jsonl_index.build_indexes) as build:
+            jsonl_index.open_index(self.path, workers=1)
+            jsonl_index.open_type_index(self.path, workers=1)
+            jsonl_index.open_index(self.path, workers=1)
+            self.assertEqual(build.call_count, 1)
+
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(json.dumps({"messageContentType": "D", "timestamp": START.isoformat()}) + "\n")
+            index = jsonl_index.open_type_index(self.path, workers=1)
+            self.assertEqual(build.call_count, 2)
+            self.assertIn("D", index["types"])
+
+    def test_window_ranges_hold_every_line_of_the_window(self):
+        index = jsonl_index.open_index(self.path, workers=1)
+        window = (START + timedelta(minutes=50), START + timedelta(minutes=80))
+        ranges = jsonl_index.window_ranges(index, [window])
+        self.assertLess(sum(end - start for start, end in ranges), os.path.getsize(self.path) // 2)
+
+        found = [line for start, end in ranges for line in jsonl_reader.iter_lines(self.path, start, end)]
+        wanted = [
+            line.encode("utf-8") for line in self.lines
+            if "timestamp" in line and window[0] <= datetime.fromisoformat(json.loads(line)["timestamp"]) <= window[1]
+        ]
+        self.assertTrue(wanted)
+        for line in wanted:
+            self.assertIn(line, found)
+
+        open_ended = jsonl_index.window_ranges(index, [(None, None)])
+        self.assertEqual(open_ended[0][0], 0)
+        self.assertEqual(open_ended[-1][1], os.path.getsize(self.path))
+
+    def test_select_lines(self):
+        index = jsonl_index.open_type_index(self.path, workers=1)
+        offsets, lengths = jsonl_index.select_lines(index, ["A", "B", "missing"])
+        self.assertEqual(offsets.tolist(), sorted(offsets.tolist()))
+        self.assertEqual(
+            self.lines_at(offsets, lengths),
+            [json.loads(line) for line in self.lines if line != "{broken" and json.loads(line).get("messageContentType") in ("A", "B")],
+        )
+
+        start, end = int(offsets[3]), int(offsets[6])
+        inside, _ = jsonl_index.select_lines(index, ["A", "B"], [(start, end)])
+        self.assertEqual(inside.tolist(), offsets[3:6].tolist())
+
+        empty = jsonl_index.select_lines(index, ["missing"])
+        self.assertEqual([len(column) for column in empty], [0, 0])
+
+
+if __name__ == "__main__":
+    unittest.main()
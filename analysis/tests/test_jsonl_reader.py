@@ -0,0 +1,251 @@
+import codecs
+import gzip
+import json
+import os
+import queue
+import sys
+import tempfile
+import threading
+import time
+import unittest
+from unittest import mock
+
+import numpy as np
+
+SRC_DIR = os.path.normpath(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+sys.path.insert(0, SRC_DIR)
+
+import jsonl_reader  # noqa: E402
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+def collect_lines(path, start, end, encoding, lines=None):
+    """map_chunks worker returning the lines of its chunk"""
+    return list(jsonl_reader.iter_lines(path, start, end, encoding, lines))
+
+
+def records(count):
+    """Lines of different lengths, some of them empty or padded with spaces"""
+    lines = []
+    for i in range(count):
+        record = {"messageContentType": f"Type{i % 3}", "timestamp": f"2026-01-26T07:47:{i % 60:02d}+01:00", "n": "x" * (i % 17)}
+        line = json.dumps(record)
+        if i % 7 == 0:
+            line = "  " + line + " "
+        lines.append(line)
+        if i % 11 == 0:
+            lines.append("")
+    return lines
+
+
+def expected(lines):
+    return [line.strip().encode("utf-8") for line in lines if line.strip()]
+
+
+class ReaderTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+
+    def write(self, name, text, opener=open):
+        path = os.path.join(self.tmp.name, name)
+        with opener(path, "wb") as f:
+            f.write(text.encode("utf-8") if isinstance(text, str) else text)
+        return path
+
+
+class ChunkTest(ReaderTest):
+    def test_ranges_cover_the_file_on_line_boundaries(self):
+        lines = records(500)
+        path = self.write("export.jsonl", "\n".join(lines) + "\n")
+        with open(path, "rb") as f:
+            data = f.read()
+
+        with mock.patch.object(jsonl_reader, "MIN_CHUNK_SIZE", 100):
+            for chunks in (1, 2, 3, 7, 50, 1000):
+                ranges = jsonl_reader.chunk_ranges(path, chunks)
+                self.assertEqual(ranges[0][0], 0)
+                self.assertEqual(ranges[-1][1], len(data))
+                for (_, end), (start, _) in zip(ranges, ranges[1:]):
+                    self.assertEqual(end, start)
+                    self.assertEqual(data[end - 1:end], b"\n")
+
+                found = [line for start, end in ranges for line in jsonl_reader.iter_lines(path, start, end)]
+                self.assertEqual(found, expected(lines))
+
+    def test_ranges_of_a_part_of_the_file(self):
+        lines = records(200)
+        path = self.write("export.jsonl", "\n".join(lines) + "\n")
+        with open(path, "rb") as f:
+            data = f.read()
+        start = data.index(b"\n", 1000) + 1
+        end = data.index(b"\n", 5000) + 1
+
+        with mock.patch.object(jsonl_reader, "MIN_CHUNK_SIZE", 100):
+            ranges = jsonl_reader.chunk_ranges(path, 8, start, end)
+        self.assertEqual((ranges[0][0], ranges[-1][1]), (start, end))
+        found = [line for a, b in ranges for line in jsonl_reader.iter_lines(path, a, b)]
+        self.assertEqual(found, [line.strip() for line in data[start:end].split(b"\n") if line.strip()])
+
+    def test_last_line_without_newline_and_bom(self):
+        lines = records(50)
+        path = self.write("export.jsonl", codecs.BOM_UTF8 + "\n".join(lines).encode("utf-8"))
+        with mock.patch.object(jsonl_reader, "MIN_CHUNK_SIZE", 64):
+            ranges = jsonl_reader.chunk_ranges(path, 5)
+        found = [line for start, end in ranges for line in jsonl_reader.iter_lines(path, start, end)]
+        self.assertEqual(found, expected(lines))
+
+    def test_empty_file(self):
+        path = self.write("empty.jsonl", "")
+        self.assertEqual(jsonl_reader.chunk_ranges(path, 4), [])
+        self.assertEqual(list(jsonl_reader.iter_lines(path, 0, 0)), [])
+        self.assertEqual(list(jsonl_reader.map_chunks(collect_lines, path, workers=1)), [])
+
+    def test_map_chunks_keeps_file_order(self):
+        lines = records(400)
+        path = self.write("export.jsonl", "\n".join(lines) + "\n")
+        with mock.patch.object(jsonl_reader, "MIN_CHUNK_SIZE", 256):
+            for workers in (1, 3):
+                chunks = list(jsonl_reader.map_chunks(collect_lines, path, workers=workers))
+                self.assertGreater(len(chunks), 1)
+                self.assertEqual([line for chunk in chunks for line in chunk], expected(lines))
+
+    def test_selected_lines(self):
+        lines = records(100)
+        path = self.write("export.jsonl", "\n".join(lines) + "\n")
+        offsets, lengths, wanted = [], [], []
+        for offset, length, line in jsonl_reader.iter_offsets(path, 0, os.path.getsize(path)):
+            if b'"Type1"' in line:
+                offsets.append(offset)
+                lengths.append(length)
+                wanted.append(line)
+
+        selected = (np.array(offsets, dtype=np.uint64), np.array(lengths, dtype=np.uint32))
+        chunks = jsonl_reader.map_chunks(collect_lines, path, workers=1, lines=selected)
+        self.assertEqual([line for chunk in chunks for line in chunk], wanted)
+
+
+class EncodingTest(ReaderTest):
+    def test_utf16_is_detected_and_streamed(self):
+        lines = records(30)
+        path = self.write("export.jsonl", "\r\n".join(lines).encode("utf-16"))
+        encoding = jsonl_reader.detect_encoding(path)
+        self.assertEqual(encoding, "utf-16")
+        self.assertFalse(jsonl_reader.seekable(path, encoding))
+        chunks = jsonl_reader.map_chunks(collect_lines, path, workers=1, encoding=encoding)
+        self.assertEqual([line for chunk in chunks for line in chunk], expected(lines))
+
+    def test_detect_encoding(self):
+        text = "\n".join(records(20))
+        for data, encoding in (
+            (text.encode("utf-8"), "utf-8"),
+            (codecs.BOM_UTF8 + text.encode("utf-8"), "utf-8-sig"),
+            (text.encode("utf-16"), "utf-16"),
+            (text.encode("utf-16-le"), "utf-16-le"),
+            (text.encode("utf-16-be"), "utf-16-be"),
+            (b"", "utf-8"),
+        ):
+            with self.subTest(encoding=encoding):
+                self.assertEqual(jsonl_reader.detect_encoding(self.write("export.jsonl", data)), encoding)
+
+    def test_utf8_bom_is_read_from_the_memory_map(self):
+        lines = records(40)
+        path = self.write("export.jsonl", codecs.BOM_UTF8 + "\n".join(lines).encode("utf-8"))
+        self.assertTrue(jsonl_reader.seekable(path, "utf-8-sig"))
+        self.assertEqual(list(jsonl_reader.iter_lines(path, 0, os.path.getsize(path), "utf-8-sig")), expected(lines))
+
+        offsets, lengths, _ = zip(*jsonl_reader.iter_offsets(path, 0, os.path.getsize(path)))
+        selected = (np.array(offsets[:3], dtype=np.uint64), np.array(lengths[:3], dtype=np.uint32))
+        self.assertEqual(list(jsonl_reader.iter_lines(path, 0, 0, "utf-8-sig", selected)), expected(lines)[:3])
+
+    def test_characters_cut_by_the_stream_blocks(self):
+        lines = [json.dumps({"text": "é€😀" * (i % 5), "n": i}, ensure_ascii=False) for i in range(50)]
+        path = self.write("export.jsonl", "\n".join(lines).encode("utf-16-le"))
+        with mock.patch.object(jsonl_reader, "STREAM_BLOCK_SIZE", 7):
+            found = list(jsonl_reader.iter_lines(path, 0, 0, "utf-16-le"))
+        self.assertEqual(found, expected(lines))
+
+    def test_gzip(self):
+        lines = records(300)
+        path = self.write("export.jsonl.gz", "\n".join(lines) + "\n", gzip.open)
+        self.assertEqual(jsonl_reader.base_name(path), "export")
+        self.assertEqual(jsonl_reader.detect_encoding(path), "utf-8")
+        self.assertEqual(list(jsonl_reader.iter_lines(path, 0, 0)), expected(lines))
+
+        with mock.patch.object(jsonl_reader, "STREAM_BLOCK_SIZE", 512):
+            chunks = list(jsonl_reader.map_chunks(collect_lines, path, workers=1))
+        self.assertGreater(len(chunks), 1)
+        self.assertEqual([line for chunk in chunks for line in chunk], expected(lines))
+
+    @unittest.skipIf(zstandard is None, "zstandard is not installed")
+    def test_zstd(self):
+        lines = records(300)
+        data = zstandard.ZstdCompressor().compress(("\n".join(lines) + "\n").encode("utf-8"))
+        path = self.write("export.jsonl.zst", data)
+        with mock.patch.object(jsonl_reader, "STREAM_BLOCK_SIZE", 512):
+            chunks = list(jsonl_reader.map_chunks(collect_lines, path, workers=2))
+        self.assertEqual([line for chunk in chunks for line in chunk], expected(lines))
+
+
+class FollowTest(ReaderTest):
+    """follow() runs on a thread like in the live dashboard, its batches arrive on a queue"""
+
+    def setUp(self):
+        super().setUp()
+        patcher = mock.patch.object(jsonl_reader, "FOLLOW_INTERVAL", 0.01)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.stop = threading.Event()
+        self.batches = queue.Queue()
+
+    def follow(self, path, from_start=False):
+        def run():
+            for batch in jsonl_reader.follow(path, self.stop, from_start):
+                self.batches.put(batch)
+            self.batches.put(None)
+
+        thread = threading.Thread(target=run, daemon=True)
+        thread.start()
+        self.addCleanup(thread.join)
+        self.addCleanup(self.stop.set)
+        # Let the reader open the file and move to where it starts
+        time.sleep(0.1)
+
+    def next_batch(self):
+        return self.batches.get(timeout=5)
+
+    def append(self, path, text):
+        with open(path, "ab") as f:
+            f.write(text.encode("utf-8"))
+
+    def test_unfinished_line_is_held_back(self):
+        path = self.write("live.jsonl", "a\nb\npar")
+        self.follow(path, from_start=True)
+        self.assertEqual(self.next_batch(), [b"a", b"b"])
+        self.append(path, "tial\nc\n")
+        self.assertEqual(self.next_batch(), [b"partial", b"c"])
+        self.stop.set()
+        self.assertIsNone(self.next_batch())
+
+    def test_starts_at_the_end_after_the_current_line(self):
+        path = self.write("live.jsonl", "old\npart")
+        self.follow(path)
+        self.append(path, "ial\nnew\n")
+        self.assertEqual(self.next_batch(), [b"new"])
+
+    def test_replaced_file_is_read_from_its_start(self):
+        path = self.write("live.jsonl", "a\nb\n")
+        self.follow(path, from_start=True)
+        self.assertEqual(self.next_batch(), [b"a", b"b"])
+
+        replacement = self.write("next.jsonl", codecs.BOM_UTF8 + b"c\n")
+        os.replace(replacement, path)
+        self.assertEqual(self.next_batch(), [b"c"])
+
+
+if __name__ == "__main__":
+    unittest.main()
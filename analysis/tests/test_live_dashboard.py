@@ -0,0 +1,129 @@
+import contextlib
+import io
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+import unittest
+from unittest import mock
+
+import numpy as np
+
+SRC_DIR = os.path.normpath(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+sys.path.insert(0, SRC_DIR)
+
+with contextlib.redirect_stdout(io.StringIO()):
+    import generic_values  # noqa: E402
+import jsonl_reader  # noqa: E402
+import live_dashboard  # noqa: E402
+
+live_dashboard.load()
+
+
+def export_line(i, messageContentType="A", **message):
+    record = {"timestamp": f"2026-01-26T07:00:{i:02d}+01:00", "messageContentType": messageContentType, "message": message}
+    return json.dumps(record) + "\n"
+
+
+def live_axis(messageContentType, fieldPath, capacity=100, **options):
+    axis = dict(sourceFile="live.jsonl", messageContentType=messageContentType, fieldPath=fieldPath, datatype="float", **options)
+    return live_dashboard.LiveAxis(generic_values.PlotData(axis, 0), capacity)
+
+
+def ns(i):
+    return np.datetime64(f"2026-01-26T06:00:{i:02d}", "ns").astype(np.int64)
+
+
+class RingBufferTest(unittest.TestCase):
+    def test_oldest_points_are_overwritten(self):
+        buffer = live_dashboard.RingBuffer(5)
+        buffer.extend([1, 2, 3], [10, 20, 30])
+        self.assertEqual([a.tolist() for a in buffer.snapshot()[:2]], [[1, 2, 3], [10, 20, 30]])
+
+        buffer.extend([4, 5, 6, 7], [40, 50, 60, 70])
+        found_ns, values, written = buffer.snapshot()
+        self.assertEqual((found_ns.tolist(), values.tolist(), written, len(buffer)), ([3, 4, 5, 6, 7], [30, 40, 50, 60, 70], 7, 5))
+
+        # A batch longer than the buffer keeps its newest points
+        buffer.extend(range(100, 112), range(12))
+        self.assertEqual(buffer.snapshot()[0].tolist(), list(range(107, 112)))
+
+
+class ScanTest(unittest.TestCase):
+    """The scanner thread tails a growing export like in the dashboard, without a window"""
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.path = os.path.join(tmp.name, "live.jsonl")
+        patcher = mock.patch.object(jsonl_reader, "FOLLOW_INTERVAL", 0.01)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.stop = threading.Event()
+        self.stats = {"path": self.path, "lines": 0, "invalid": 0, "done": False, "error": None}
+
+    def append(self, text):
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(text)
+
+    def start(self, axes):
+        thread = threading.Thread(target=live_dashboard.scan, args=(self.path, axes, self.stop, self.stats, True), daemon=True)
+        thread.start()
+        self.addCleanup(thread.join, 5)
+        self.addCleanup(self.stop.set)
+        return thread
+
+    def wait_for_lines(self, lines):
+        deadline = time.monotonic() + 5
+        while self.stats["lines"] < lines and time.monotonic() < deadline:
+            time.sleep(0.01)
+        self.assertEqual(self.stats["lines"], lines)
+
+    def test_appended_records_reach_the_ring_buffers(self):
+        self.append("".join(export_line(i, Speed=i * 1.5) for i in range(5)))
+        speed = live_axis("A", "message.Speed")
+        state = live_axis("B", "message.State", onChangeOnly=True)
+        thread = self.start([speed, state])
+        self.wait_for_lines(5)
+
+        self.append(
+            export_line(5, "B", State="idle")
+            + "{\"messageContentType\": \"A\", broken\n"
+            + export_line(6, "B", State="idle")
+            + export_line(7, "B", State="moving")
+            + export_line(8, Speed=12.0)
+            + export_line(9, "C", Speed=99.0)
+        )
+        self.wait_for_lines(11)
+        self.stop.set()
+        thread.join(5)
+
+        self.assertTrue(self.stats["done"])
+        self.assertIsNone(self.stats["error"])
+        self.assertEqual(self.stats["invalid"], 1)
+
+        found_ns, values, _ = speed.buffer.snapshot()
+        self.assertEqual(found_ns.tolist(), [ns(i) for i in (0, 1, 2, 3, 4, 8)])
+        self.assertEqual(values.tolist(), [0.0, 1.5, 3.0, 4.5, 6.0, 12.0])
+
+        # Strings are drawn as category codes, the repeated state is dropped
+        found_ns, values, _ = state.buffer.snapshot()
+        self.assertEqual(found_ns.tolist(), [ns(5), ns(7)])
+        self.assertEqual(values.tolist(), [0.0, 1.0])
+        self.assertEqual(state.labels, {"idle": 0, "moving": 1})
+
+    def test_window_and_missing_values(self):
+        axis = live_axis("A", "message.Speed", datetimeFrom="2026-01-26T07:00:02+01:00", datetimeTo="2026-01-26T07:00:04+01:00")
+        self.append("".join(export_line(i, Speed=float(i)) for i in range(7)) + export_line(3, Other=1))
+        thread = self.start([axis])
+        self.wait_for_lines(8)
+        self.stop.set()
+        thread.join(5)
+        self.assertEqual(axis.buffer.snapshot()[1].tolist(), [2.0, 3.0, 4.0])
+        self.assertEqual((axis.matched, axis.missing), (8, 1))
+
+
+if __name__ == "__main__":
+    unittest.main()
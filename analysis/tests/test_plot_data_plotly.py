@@ -0,0 +1,157 @@
+import gzip
+import io
+import json
+import os
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+SRC_DIR = os.path.normpath(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+sys.path.insert(0, SRC_DIR)
+
+import jsonl_reader  # noqa: E402
+import plot_data_plotly  # noqa: E402
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+LINES = [
+    {"timestamp": "2026-01-26T07:00:00+01:00", "messageContentType": "Remote.Status", "message": {"Speed": 1, "MessagePayload": {"Door": True}}},
+    {"timestamp": "2026-01-26T07:00:00+01:00", "messageContentType": "Remote.Command", "message": {"MessagePayload": {"Horn": False}}},
+    "{broken",
+    {"timestamp": "2026-01-26T07:00:01+01:00", "messageContentType": "Other", "message": {"Speed": 99}},
+    {"messageContentType": "Remote.Status", "message": {"Speed": 3}},
+    {"timestamp": "2026-01-26T07:00:02+01:00", "messageContentType": "Remote.Status", "message": {"Speed": 2, "MessagePayload": {"Door": False}}},
+]
+
+
+class ExtractionTest(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.path = os.path.join(tmp.name, "export.jsonl")
+        with open(self.path, "w", encoding="utf-8") as f:
+            for line in LINES:
+                f.write((line if isinstance(line, str) else json.dumps(line)) + "\n")
+
+        patcher = mock.patch("sys.stdout", io.StringIO())
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def extract(self, message_types, field_paths=(), fields=()):
+        return plot_data_plotly.extract_chunk(
+            self.path, 0, os.path.getsize(self.path), "utf-8", message_types, list(field_paths), list(fields)
+        )
+
+    def test_records_are_merged_per_timestamp(self):
+        loaded, records, names = self.extract(["Remote"], ["message.Speed"], ["Door", "Horn"])
+        # Lines prefiltered without decoding count as loaded, the broken one too
+        self.assertEqual(loaded, 6)
+        self.assertEqual(names, {"Speed", "Door", "Horn"})
+        self.assertEqual(records, {
+            "2026-01-26T07:00:00+01:00": {
+                "timestamp": "2026-01-26T07:00:00+01:00",
+                # The first record of a timestamp keeps its type
+                "messageContentType": "Remote.Status",
+                "Speed": 1,
+                "Door": True,
+                "Horn": False,
+            },
+            "2026-01-26T07:00:02+01:00": {
+                "timestamp": "2026-01-26T07:00:02+01:00",
+                "messageContentType": "Remote.Status",
+                "Speed": 2,
+                "Door": False,
+            },
+        })
+
+    def test_records_are_decoded_as_they_are_consumed(self):
+        decoded = []
+        loads = jsonl_reader.loads
+
+        def counting_loads(line):
+            decoded.append(line)
+            return loads(line)
+
+        stats = {"loaded": 0}
+        with mock.patch.object(jsonl_reader, "loads", counting_loads):
+            selected = plot_data_plotly.select_items(self.path, 0, os.path.getsize(self.path), "utf-8", ["Status"], stats)
+            self.assertEqual(decoded, [])
+            msg_type, timestamp, lookup, probe = next(selected)
+            self.assertEqual(len(decoded), 1)
+            self.assertEqual((msg_type, timestamp), ("Remote.Status", "2026-01-26T07:00:00+01:00"))
+            self.assertEqual(lookup(plot_data_plotly.field_access.FieldPath("message.Speed")), 1)
+            self.assertEqual([item[1] for item in selected], ["2026-01-26T07:00:02+01:00"])
+        self.assertEqual(stats["loaded"], 6)
+
+    def test_no_message_types_selects_every_record(self):
+        loaded, records, names = self.extract([], ["message.Speed"])
+        # Every line is decoded, the broken one is skipped
+        self.assertEqual(loaded, 5)
+        self.assertEqual(len(records), 3)
+        self.assertEqual(records["2026-01-26T07:00:01+01:00"]["Speed"], 99)
+
+
+class CompressedExportTest(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.dir = tmp.name
+        self.data = "".join(
+            json.dumps({
+                "timestamp": f"2026-01-26T07:{i // 60:02d}:{i % 60:02d}+01:00",
+                "messageContentType": ["Remote.Status", "Other"][i % 2],
+                "message": {"Speed": i, "MessagePayload": {"Door": i % 3 == 0}},
+            }) + "\n"
+            for i in range(600)
+        ).encode("utf-8")
+
+        for patcher in (
+            mock.patch.object(jsonl_reader, "MIN_CHUNK_SIZE", 2048),
+            mock.patch.object(jsonl_reader, "STREAM_BLOCK_SIZE", 1000),
+            mock.patch("sys.stdout", io.StringIO()),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def write(self, name, data):
+        path = os.path.join(self.dir, name)
+        with open(path, "wb") as f:
+            f.write(data)
+        return path
+
+    def extract(self, path):
+        records = {}
+        loaded = 0
+        for chunk_loaded, chunk_records, _ in jsonl_reader.map_chunks(
+            plot_data_plotly.extract_chunk, path, ["Status"], ["message.Speed"], ["Door"], workers=2,
+            encoding=jsonl_reader.detect_encoding(path),
+        ):
+            loaded += chunk_loaded
+            records.update(chunk_records)
+        return loaded, records
+
+    def test_same_records_as_the_plain_file(self):
+        plain = self.extract(self.write("export.jsonl", self.data))
+        self.assertEqual(len(plain[1]), 300)
+
+        compressed = [self.write("export.jsonl.gz", gzip.compress(self.data))]
+        if zstandard is not None:
+            compressed.append(self.write("export.jsonl.zst", zstandard.ZstdCompressor().compress(self.data)))
+        for path in compressed:
+            with self.subTest(path=os.path.basename(path)):
+                self.assertFalse(jsonl_reader.seekable(path))
+                self.assertEqual(self.extract(path), plain)
+
+    def test_zstd_without_zstandard(self):
+        path = self.write("export.jsonl.zst", b"")
+        with mock.patch.object(jsonl_reader, "zstandard", None):
+            with self.assertRaisesRegex(ImportError, "zstandard"):
+                jsonl_reader.detect_encoding(path)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,119 @@
+import math
+import os
+import sys
+import unittest
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+
+SRC_DIR = os.path.normpath(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+sys.path.insert(0, SRC_DIR)
+
+from series import Series  # noqa: E402
+
+CET = timezone(timedelta(hours=1))
+START = datetime(2026, 1, 26, 7, 0, tzinfo=CET)
+
+
+def at(seconds, tz=CET):
+    return (START + timedelta(seconds=seconds)).astimezone(tz)
+
+
+def build(values, times=None):
+    series = Series()
+    for i, value in enumerate(values):
+        series.append(at(i) if times is None else times[i], value)
+    return series
+
+
+class AppendTest(unittest.TestCase):
+    def test_typed_columns(self):
+        self.assertEqual(build([1, 2, 3]).kind, "q")
+        self.assertEqual(build([1.5, 2.0]).kind, "d")
+        self.assertEqual(build([True, False]).kind, "b")
+        self.assertEqual(build(["on", "off"]).kind, "c")
+        self.assertEqual(build([True, False]).y().dtype, bool)
+
+    def test_mixed_types_become_categories(self):
+        values = [1, 1.0, True, "1", None, {"a": 1}, [1], 2 ** 70]
+        series = build(values)
+        self.assertEqual(series.kind, "c")
+        y = series.y().tolist()
+        self.assertEqual(y, values)
+        self.assertEqual([type(v) for v in y], [type(v) for v in values])
+
+    def test_bool_column_switching_to_categories_keeps_bools(self):
+        series = build([True, False, "x"])
+        self.assertEqual(series.y().tolist(), [True, False, "x"])
+        self.assertIs(series.y()[0], True)
+
+    def test_rows_keep_the_utc_offsets(self):
+        times = [at(0), at(1, timezone.utc), at(2).replace(tzinfo=None), at(3, timezone(timedelta(hours=-5)))]
+        rows = list(build([1, 2, 3, 4], times).rows())
+        self.assertEqual([dt for dt, _ in rows], times)
+        self.assertEqual([dt.utcoffset() for dt, _ in rows], [dt.utcoffset() for dt in times])
+        self.assertEqual([value for _, value in rows], [1, 2, 3, 4])
+
+    def test_x_is_utc(self):
+        x = build([1], [at(0)]).x()
+        self.assertEqual(x.dtype, np.dtype("datetime64[ns]"))
+        self.assertEqual(x[0], np.datetime64("2026-01-26T06:00:00"))
+
+
+class JoinTest(unittest.TestCase):
+    def test_same_kinds(self):
+        joined = Series.join([build([1, 2]), Series(), build([3])])
+        self.assertEqual(joined.kind, "q")
+        self.assertEqual(joined.y().tolist(), [1, 2, 3])
+
+    def test_categories_are_merged(self):
+        parts = [build(["a", "b"]), build([1, 2]), build(["b", "c", 1]), build([True])]
+        joined = Series.join(parts)
+        self.assertEqual(joined.kind, "c")
+        self.assertEqual(joined.y().tolist(), ["a", "b", 1, 2, "b", "c", 1, True])
+        self.assertEqual(len(joined.labels), len(set(map(repr, joined.labels))))
+
+    def test_nothing_to_join(self):
+        self.assertEqual(len(Series.join([])), 0)
+        self.assertEqual(len(Series.join([Series(), Series()])), 0)
+
+
+class SelectTest(unittest.TestCase):
+    def test_sort_is_stable(self):
+        times = [at(2), at(0), at(2), at(1), at(0)]
+        ordered = build(["a", "b", "c", "d", "e"], times).sort()
+        self.assertEqual(ordered.y().tolist(), ["b", "e", "d", "a", "c"])
+
+    def test_window_includes_both_ends(self):
+        series = build(list(range(10)))
+        self.assertEqual(series.window(at(3), at(6)).y().tolist(), [3, 4, 5, 6])
+        self.assertEqual(series.window(None, at(1)).y().tolist(), [0, 1])
+        self.assertEqual(series.window(at(8)).y().tolist(), [8, 9])
+        self.assertEqual(len(series.window(at(6), at(3))), 0)
+        # Other offsets and naive bounds (taken as UTC) give the same instants
+        self.assertEqual(series.window(at(3, timezone.utc), at(6).astimezone(timezone.utc)).y().tolist(), [3, 4, 5, 6])
+        naive = at(3, timezone.utc).replace(tzinfo=None)
+        self.assertEqual(series.window(naive).y().tolist()[0], 3)
+
+    def test_between_matches_window(self):
+        series = build(list(range(10)))
+        mask = series.between(at(2), at(4))
+        self.assertEqual(series.take(mask).y().tolist(), series.window(at(2), at(4)).y().tolist())
+
+    def test_changes(self):
+        self.assertEqual(build([1, 1, 2, 2, 1]).changes().tolist(), [True, False, True, False, True])
+        self.assertEqual(build([True, True, False]).changes().tolist(), [True, False, True])
+        # Python equality across types, like comparing the decoded values
+        self.assertEqual(build([1, 1.0, True, "1", "1"]).changes().tolist(), [True, False, False, True, False])
+        nan = float("nan")
+        changes = build([nan, nan, 1.0, 1.0]).changes().tolist()
+        self.assertEqual(changes, [True, True, True, False])
+        self.assertTrue(math.isnan(build([nan]).y()[0]))
+
+    def test_take_keeps_the_labels(self):
+        series = build(["a", "b", "a"])
+        self.assertEqual(series.take([2, 1]).y().tolist(), ["a", "b"])
+
+
+if __name__ == "__main__":
+    unittest.main()
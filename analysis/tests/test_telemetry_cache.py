@@ -0,0 +1,214 @@
+import io
+import json
+import os
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+SRC_DIR = os.path.normpath(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+sys.path.insert(0, SRC_DIR)
+
+import jsonl_index  # noqa: E402
+import jsonl_reader  # noqa: E402
+import telemetry_cache  # noqa: E402
+
+try:
+    import plot_data_plotly
+except ImportError:
+    plot_data_plotly = None
+
+# messageContentType of the records in turn, MISSING leaves the field out
+MISSING = object()
+TYPES = ["A", "B", None, "", {"kind": "C"}, MISSING]
+
+# Values of the "value" field in turn: mixed numbers and bools, lists, empty
+# objects (non-empty ones become leaf columns) and missing values
+VALUES = [1, 1.5, True, "text", [1, 2], {}, None, 2 ** 40, MISSING]
+
+
+def export_records(count):
+    records = []
+    for i in range(count):
+        record = {"timestamp": f"2026-01-26T07:{i // 60 % 60:02d}:{i % 60:02d}+01:00", "message": {"Nanos": i, "Deep": {"Flag": i % 2 == 0}}}
+        message_type = TYPES[i % len(TYPES)]
+        if message_type is not MISSING:
+            record["messageContentType"] = message_type
+        value = VALUES[i % len(VALUES)]
+        if value is not MISSING:
+            record["value"] = value
+        records.append(record)
+    return records
+
+
+@unittest.skipUnless(telemetry_cache.available(), "pyarrow is not installed")
+class CacheTest(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.records = export_records(300)
+        self.path = os.path.join(tmp.name, "export.jsonl")
+        self.write(self.records)
+
+        for patcher in (
+            mock.patch.object(telemetry_cache, "BATCH_ROWS", 7),
+            mock.patch.object(jsonl_reader, "MIN_CHUNK_SIZE", 4096),
+            mock.patch("sys.stdout", io.StringIO()),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def write(self, records, extra=""):
+        with open(self.path, "w", encoding="utf-8") as f:
+            f.write("\n".join(json.dumps(record) for record in records) + "\n" + extra)
+
+    def expected(self, message_type, column):
+        values = []
+        for record in self.records:
+            if jsonl_index.type_key(record) == message_type:
+                value = record
+                for key in column.split("."):
+                    value = value.get(key) if isinstance(value, dict) else None
+                values.append(value)
+        return values
+
+    def test_columns_round_trip_in_file_order(self):
+        manifest = telemetry_cache.open_cache(self.path, workers=1)
+        self.assertEqual(manifest["lines"], len(self.records))
+        self.assertEqual(manifest["records"], len(self.records))
+
+        types = [jsonl_index.type_key(record) for record in self.records[:len(TYPES)]]
+        self.assertEqual(types, ["A", "B", None, "", '{"kind": "C"}', jsonl_index.UNTYPED])
+        self.assertEqual({entry["messageContentType"] for entry in manifest["types"]}, set(types))
+
+        columns = ["value", "message.Nanos", "message.Deep.Flag", "not.there"]
+        data = telemetry_cache.load_columns(manifest, types, columns)
+        self.assertEqual(set(data), set(types))
+        for message_type in types:
+            for column in ["timestamp"] + columns:
+                found = data[message_type][column]
+                wanted = self.expected(message_type, column)
+                self.assertEqual(found, wanted, (message_type, column))
+                self.assertEqual([type(v) for v in found], [type(v) for v in wanted], (message_type, column))
+            order = data[message_type][telemetry_cache.ORDER_COLUMN]
+            self.assertEqual(order, sorted(order))
+
+    def test_nested_objects_are_listed(self):
+        manifest = telemetry_cache.open_cache(self.path, workers=1)
+        # One of the types is an object too
+        self.assertEqual(manifest["objects"], ["message", "message.Deep", "messageContentType"])
+        self.assertEqual(
+            telemetry_cache.object_columns(manifest, ["message.Deep", "message.Deep.Flag", "value"]),
+            ["message.Deep"],
+        )
+
+    def test_cache_is_reused_until_the_file_changes(self):
+        with mock.patch.object(jsonl_reader, "map_chunks", wraps=jsonl_reader.map_chunks) as scan:
+            first = telemetry_cache.open_cache(self.path, workers=1)
+            second = telemetry_cache.open_cache(self.path, workers=1)
+            self.assertEqual(scan.call_count, 1)
+            self.assertEqual(first["path"], second["path"])
+
+            self.records.append({"messageContentType": "D", "timestamp": "2026-01-26T08:00:00+01:00"})
+            self.write(self.records)
+            changed = telemetry_cache.open_cache(self.path, workers=1)
+            self.assertEqual(scan.call_count, 2)
+
+        self.assertNotEqual(changed["path"], first["path"])
+        self.assertFalse(os.path.exists(first["path"]))
+        self.assertIn("D", {entry["messageContentType"] for entry in changed["types"]})
+
+    def test_builds_of_other_processes_are_left_alone(self):
+        root = self.path + telemetry_cache.CACHE_SUFFIX
+        key = telemetry_cache.fingerprint(self.path)
+        other = os.path.join(root, f"{key}.{os.getpid() + 1}{telemetry_cache.TMP_SUFFIX}")
+        os.makedirs(other)
+
+        manifest = telemetry_cache.open_cache(self.path, workers=1)
+        self.assertTrue(os.path.isdir(other))
+        self.assertEqual(manifest["path"], os.path.join(root, key))
+        self.assertFalse(any(
+            entry.endswith(telemetry_cache.TMP_SUFFIX) and entry != os.path.basename(other)
+            for entry in os.listdir(root)
+        ))
+
+    def test_cache_published_by_another_process_first(self):
+        root = self.path + telemetry_cache.CACHE_SUFFIX
+        key = telemetry_cache.fingerprint(self.path)
+        replace = os.replace
+
+        def publish_first(source, target):
+            # Another build finished while this one was running
+            if target == os.path.join(root, key) and not os.path.exists(target):
+                os.makedirs(target)
+                with open(os.path.join(target, telemetry_cache.MANIFEST_FILE), "w") as f:
+                    f.write("{}")
+                raise OSError("directory not empty")
+            replace(source, target)
+
+        with mock.patch("os.replace", publish_first):
+            manifest = telemetry_cache.open_cache(self.path, workers=1)
+        self.assertEqual(manifest["path"], os.path.join(root, key))
+        self.assertEqual(os.listdir(root), [key])
+
+    def test_broken_lines_are_counted_but_not_cached(self):
+        self.write(self.records, extra="{broken\n[1, 2]\n")
+        manifest = telemetry_cache.open_cache(self.path, workers=1)
+        self.assertEqual(manifest["lines"], len(self.records) + 2)
+        self.assertEqual(manifest["records"], len(self.records))
+
+
+@unittest.skipUnless(telemetry_cache.available(), "pyarrow is not installed")
+@unittest.skipIf(plot_data_plotly is None, "pandas is not installed")
+class PlotExtractionTest(unittest.TestCase):
+    """plot_data_plotly reads the same records with and without the cache"""
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.path = os.path.join(tmp.name, "export.jsonl")
+        with open(self.path, "w", encoding="utf-8") as f:
+            for i in range(120):
+                record = {
+                    "timestamp": f"2026-01-26T07:00:{i // 2:02d}.{i % 2}+01:00",
+                    "message": {"Speed": i, "MessagePayload": {"Speed": -i} if i % 4 == 0 else {}},
+                }
+                message_type = ["Status", "UNKNOWN-ish", None, MISSING, "StatusReport"][i % 5]
+                if message_type is not MISSING:
+                    record["messageContentType"] = message_type
+                f.write(json.dumps(record) + "\n")
+
+        patcher = mock.patch("sys.stdout", io.StringIO())
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def extract(self, message_types, field_paths, fields):
+        scanned = plot_data_plotly.extract_chunk(
+            self.path, 0, os.path.getsize(self.path), "utf-8", message_types, field_paths, fields
+        )
+        manifest = telemetry_cache.open_cache(self.path, workers=1)
+        cached = plot_data_plotly.extract_cached(manifest, message_types, field_paths, fields)
+        return scanned, cached
+
+    def test_same_records(self):
+        for message_types in ([], ["Status"], ["UNK"], ["Report", "ish"]):
+            with self.subTest(message_types=message_types):
+                scanned, cached = self.extract(message_types, ["message.Speed"], ["Speed"])
+                self.assertEqual(cached[1], scanned[1])
+                self.assertEqual(cached[2], scanned[2])
+                self.assertTrue(scanned[1])
+
+        # Untyped and null records have the empty type in both
+        for _, records, _ in self.extract([], [], ["Speed"]):
+            types = [record["messageContentType"] for record in records.values()]
+            self.assertEqual(types.count(""), 48)
+            self.assertNotIn(jsonl_index.UNTYPED, types)
+
+    def test_nested_objects_need_the_jsonl_file(self):
+        manifest = telemetry_cache.open_cache(self.path, workers=1)
+        columns = plot_data_plotly.field_columns(["message"], ["Speed"])
+        self.assertEqual(telemetry_cache.object_columns(manifest, columns), ["message"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,84 @@
+import os
+import sys
+import unittest
+from datetime import datetime, timedelta, timezone
+
+SRC_DIR = os.path.normpath(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+sys.path.insert(0, SRC_DIR)
+
+import timestamps  # noqa: E402
+
+
+def reference_ns(s):
+    return timestamps.datetime_ns(datetime.fromisoformat(s))
+
+
+class ParseNsTest(unittest.TestCase):
+    def check(self, strings, minutes):
+        result = timestamps.parse_ns(strings)
+        self.assertIsNotNone(result)
+        ns, offset = result
+        self.assertEqual(ns.dtype.name, "int64")
+        self.assertEqual(ns.tolist(), [reference_ns(s) for s in strings])
+        self.assertEqual(offset, minutes)
+
+    def test_offsets(self):
+        self.check(["2026-01-26T07:47:26.123+01:00", "2026-01-26T07:47:27.456+01:00"], 60)
+        self.check(["2026-01-26T07:47:26-05:30", "2026-01-27T00:00:00-05:30"], -330)
+        self.check(["2026-01-26T07:47:26.123456Z", "1969-12-31T23:59:59.000001Z"], 0)
+
+    def test_naive(self):
+        self.check(["2026-01-26T07:47:26.5", "2026-01-26T07:47:27.0"], None)
+
+    def test_day_and_year_boundaries(self):
+        self.check(["2025-12-31T23:30:00+01:00", "2024-02-29T00:15:00+01:00"], 60)
+
+    def test_batches_for_the_general_parser(self):
+        self.assertIsNone(timestamps.parse_ns([]))
+        self.assertIsNone(timestamps.parse_ns([None, "2026-01-26T07:47:26Z"]))
+        # Mixed offsets, fraction lengths and suffixes
+        self.assertIsNone(timestamps.parse_ns(["2026-01-26T07:47:26+01:00", "2026-01-26T07:47:26+02:00"]))
+        self.assertIsNone(timestamps.parse_ns(["2026-01-26T07:47:26.1Z", "2026-01-26T07:47:26.12Z"]))
+        self.assertIsNone(timestamps.parse_ns(["2026-01-26T07:47:26Z", "2026-01-26T07:47:26+00"]))
+        self.assertIsNone(timestamps.parse_ns(["2026-01-26T07:47:26Z", 5]))
+        # Not the export format, or not a date at all
+        self.assertIsNone(timestamps.parse_ns(["2026-01-26 07:47:26Z"]))
+        self.assertIsNone(timestamps.parse_ns(["2026-13-26T07:47:26Z"]))
+
+
+class TimestampParserTest(unittest.TestCase):
+    def test_fast_path_matches_the_general_parser(self):
+        parse = timestamps.TimestampParser()
+        for s in ("2026-01-26T07:47:26.123+01:00", "2026-01-26T07:47:26Z", "2026-01-26T07:47:26"):
+            self.assertEqual(parse(s), timestamps.slow_parse(s))
+            self.assertEqual(parse(s).utcoffset(), timestamps.slow_parse(s).utcoffset())
+        self.assertTrue(parse.fast)
+        self.assertEqual(parse.fallbacks, 0)
+
+    def test_other_format_uses_the_general_parser(self):
+        parse = timestamps.TimestampParser()
+        self.assertEqual(parse("2026-01-26 07:47:26+01:00"), datetime(2026, 1, 26, 6, 47, 26, tzinfo=timezone.utc))
+        self.assertFalse(parse.fast)
+
+    def test_invalid_value_raises(self):
+        parse = timestamps.TimestampParser()
+        parse("2026-01-26T07:47:26Z")
+        with self.assertRaises(ValueError):
+            parse("not a timestamp")
+        self.assertEqual(parse.fallbacks, 1)
+
+
+class ConversionTest(unittest.TestCase):
+    def test_datetime_ns(self):
+        self.assertEqual(timestamps.datetime_ns(datetime(1970, 1, 1, 0, 0, 1, 5)), 1_000_005_000)
+        aware = datetime(1970, 1, 1, 1, 0, 1, tzinfo=timezone(timedelta(hours=1)))
+        self.assertEqual(timestamps.datetime_ns(aware), 1_000_000_000)
+        self.assertEqual(timestamps.datetime_ns(datetime(1969, 12, 31, 23, 59, 59)), -1_000_000_000)
+
+    def test_fixed_zone(self):
+        self.assertIs(timestamps.fixed_zone(0), timezone.utc)
+        self.assertEqual(timestamps.fixed_zone(-90).utcoffset(None), timedelta(minutes=-90))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,134 @@
+import json
+import os
+import sys
+import threading
+import unittest
+import urllib.error
+import urllib.request
+from http.server import ThreadingHTTPServer
+
+import numpy as np
+
+SRC_DIR = os.path.normpath(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+sys.path.insert(0, SRC_DIR)
+
+import zoom_server  # noqa: E402
+from zoom_server import NS_PER_MS, Trace, TraceStore  # noqa: E402
+
+N = 10_000
+
+
+def make_store(max_points=100, algorithm="lttb"):
+    x = np.arange(N, dtype=np.int64) * NS_PER_MS
+    rng = np.random.default_rng(0)
+    traces = [
+        Trace("Speed", "numeric", x, np.cumsum(rng.normal(size=N))),
+        Trace("Door", "boolean", x, np.repeat([0.0, 1.0, 0.0, 1.0], N // 4), secondary_y=True),
+        Trace("State", "string", x, np.repeat(np.arange(500) % 3, N // 500).astype(np.float64), labels=["a", "b", "c"]),
+    ]
+    return TraceStore("Export </script><b>&", traces, max_points=max_points, algorithm=algorithm)
+
+
+class QueryTest(unittest.TestCase):
+    def test_whole_range(self):
+        data = make_store().query()
+        self.assertEqual(data["range"], [0, N - 1])
+        speed, door, state = data["traces"]
+        self.assertEqual(speed["total"], N)
+        self.assertLessEqual(len(speed["x"]), 100)
+        self.assertEqual((speed["x"][0], speed["x"][-1]), (0, N - 1))
+        # Boolean traces keep every edge, other states are cut to the budget
+        self.assertEqual(door["x"], [0, 2499, 2500, 4999, 5000, 7499, 7500, 9999])
+        self.assertTrue(door["secondary_y"])
+        self.assertLessEqual(len(state["x"]), 100)
+        self.assertEqual(state["text"], [["a", "b", "c"][int(y)] for y in state["y"]])
+
+    def test_window_keeps_one_point_outside_each_side(self):
+        data = make_store().query(1000 * NS_PER_MS, 1010 * NS_PER_MS)
+        speed = data["traces"][0]
+        self.assertEqual(data["range"], [1000, 1010])
+        self.assertEqual(speed["x"], list(range(999, 1012)))
+        self.assertEqual(speed["total"], 13)
+
+    def test_point_budgets(self):
+        for algorithm in ("lttb", "minmax"):
+            store = make_store(algorithm=algorithm)
+            for max_points in (1, 2, 3, 50, 5000, 20_000):
+                with self.subTest(algorithm=algorithm, max_points=max_points):
+                    speed = store.query(max_points=max_points)["traces"][0]
+                    self.assertLessEqual(len(speed["x"]), max_points)
+                    self.assertEqual(len(speed["x"]), len(speed["y"]))
+
+    def test_empty_store(self):
+        store = TraceStore("empty", [Trace("Speed", "numeric", np.array([], dtype=np.int64), np.array([]))])
+        data = store.query()
+        self.assertEqual(data["range"], [0, 0])
+        self.assertEqual(data["traces"][0]["x"], [])
+
+
+class RequestTest(unittest.TestCase):
+    def test_query_number(self):
+        self.assertIsNone(zoom_server.query_number({}, "start"))
+        self.assertEqual(zoom_server.query_number({"start": ["12.7"]}, "start"), 12)
+        self.assertEqual(zoom_server.query_number({"start": ["-5"]}, "start"), -5)
+        for value in ("abc", "inf", "-inf", "nan", "1e300", str(zoom_server.MAX_MS + 1)):
+            with self.assertRaises(ValueError, msg=value):
+                zoom_server.query_number({"start": [value]}, "start")
+
+    def test_title_is_escaped(self):
+        page = zoom_server.render_page("Export </script><b>&")
+        self.assertIn("<title>Export &lt;/script&gt;&lt;b&gt;&amp;</title>", page)
+        self.assertIn('const title = "Export <\\/script><b>&";', page)
+        self.assertEqual(page.count("</script>"), 2)
+
+
+class ServerTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        handler = zoom_server.make_handler(make_store(), b"// plotly")
+        cls.server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+        cls.thread = threading.Thread(target=cls.server.serve_forever, daemon=True)
+        cls.thread.start()
+        cls.url = f"http://127.0.0.1:{cls.server.server_port}"
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+        cls.thread.join()
+
+    def get(self, path):
+        with urllib.request.urlopen(self.url + path, timeout=5) as response:
+            return response.status, response.headers["Content-Type"], response.read()
+
+    def status(self, path):
+        try:
+            return self.get(path)[0]
+        except urllib.error.HTTPError as e:
+            return e.code
+
+    def test_page_and_script(self):
+        status, content_type, body = self.get("/")
+        self.assertEqual((status, content_type), (200, "text/html; charset=utf-8"))
+        self.assertIn(b"&lt;/script&gt;", body)
+        self.assertEqual(self.get("/plotly.js")[2], b"// plotly")
+        self.assertEqual(self.status("/missing"), 404)
+
+    def test_data(self):
+        status, content_type, body = self.get("/data?points=20&start=100&end=5000")
+        self.assertEqual((status, content_type), (200, "application/json"))
+        data = json.loads(body)
+        self.assertEqual(data["range"], [100, 5000])
+        self.assertLessEqual(len(data["traces"][0]["x"]), 20)
+
+    def test_bad_queries(self):
+        for query in ("start=abc", "end=inf", "start=nan", "points=1e300", "start=1e300&end=1"):
+            self.assertEqual(self.status(f"/data?{query}"), 400, query)
+        # No points or negative points are clamped to one per trace
+        for points in (0, -5):
+            data = json.loads(self.get(f"/data?points={points}")[2])
+            self.assertEqual(len(data["traces"][0]["x"]), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()